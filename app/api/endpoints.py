@@ -1,39 +1,105 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from datetime import datetime, timedelta
+import codecs
+import hmac
+import json
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.metrics import LOGIN_ATTEMPTS, LOGIN_LOCKOUTS
 from app.schemas import (
     RegisterRequest,
     LoginRequest,
+    RefreshRequest,
     TokenResponse,
     ChangeUsernameRequest,
     ChangePasswordRequest,
     DeleteUserRequest,
     ShowUsersRequest,
     MessageResponse,
-    ShowUsersResponse
+    ShowUsersResponse,
+    ImportUsersResponse,
+    IntrospectRequest,
+    IntrospectResponse,
+    AuditEvent,
+    AuditEventsResponse,
+    AuditQueryRequest,
+    SetRolesRequest,
 )
-from app.services.user_service import (
-    activate_session,
+from app.services.audit import (
+    CHANGE_PASSWORD,
+    CHANGE_USERNAME,
+    DELETE_USER,
+    IMPORT_USERS,
+    LOGIN,
+    LOGOUT,
+    REFRESH,
+    REGISTER,
+    REVOKE_SESSIONS,
+    SET_ROLES,
+    audit_log,
+    query_audit_events,
+)
+from app.services.async_user_service import (
+    bump_session_epoch,
     deactivate_session,
     delete_user_by_username,
     find_user_by_username,
-    list_usernames,
-    register_failed_login,
-    reset_login_state,
+    list_usernames_page,
+    login_attempt,
+    refresh_session,
     update_password,
+    update_roles,
     update_username,
-    validate_pass,
-    validate_username,
     create_user,
+    export_chunk,
+    import_batch,
     username_exists,
+    username_might_exist,
+)
+from app.services.user_transfer import (
+    EXPORT_BATCH_SIZE,
+    IMPORT_BATCH_SIZE,
+    ImportReport,
+    RecordParser,
+    export_header,
+)
+from app.services.user_service import (
+    LOGIN_ACTIVE_SESSION,
+    LOGIN_BLOCKED,
+    LOGIN_FAILED,
+    LOGIN_LOCKED_OUT,
+    LOGIN_NOT_FOUND,
+    LOGIN_RATE_LIMITED,
+    LOGIN_SUCCESS,
+    REFRESH_REUSED,
+    REFRESH_SUCCESS,
+    ROLE_ADMIN,
+    validate_pass,
+    validate_username,
 )
-from app.security.jwt import create_access_token, get_current_username
-from app.security.password import hash_password, verify_password
+from app.security.jwt import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    INTROSPECTION_MAX_TOKENS,
+    INTROSPECTION_SECRET,
+    CurrentUser,
+    create_access_token,
+    get_current_username,
+    hash_refresh_token,
+    introspect_tokens,
+    keyring,
+    new_refresh_token,
+    require_role,
+)
+from app.security.keys import JWKS_MAX_AGE
+from app.security.hashing import hashing_service
+from app.security.limiter import LOCKOUT_SECONDS, MAX_FAILED_LOGINS, call_limiter, login_limiter
+
+SHOW_USERS_STREAM_BATCH = 1000
 
 router = APIRouter()
 
 @router.post("/register", response_model=MessageResponse)
-def register(data: RegisterRequest):
+async def register(data: RegisterRequest, request: Request):
     username = data.username
     password = data.password
 
@@ -42,7 +108,7 @@ def register(data: RegisterRequest):
     if not username_ok:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
     
-    if username_exists(username):
+    if await username_exists(username):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Username already in use.",
@@ -52,76 +118,187 @@ def register(data: RegisterRequest):
     if not password_ok:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
 
-    hashed = hash_password(password)
-    create_user(username, hashed)
+    hashed = await hashing_service.hash(password)
+    await create_user(username, hashed)
+    audit_log.record(REGISTER, username=username, ip=_client_ip(request))
     return MessageResponse(status="success", message=f"{username} registered successfully.")
 
 @router.post("/login", response_model=TokenResponse | MessageResponse)
-def login(data: LoginRequest):
+async def login(data: LoginRequest, request: Request):
     username = data.username
     password = data.password
 
-    user = find_user_by_username(username)
+    # limites e bloqueios ficam no limiter: nada de banco ou hash para quem já foi barrado
+    client_ip = _client_ip(request)
+    retry_after = await call_limiter(login_limiter.hit_ip, client_ip)
+    if retry_after:
+        _login_outcome(LOGIN_RATE_LIMITED, username, client_ip)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many login attempts. Try again after {retry_after} seconds.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    retry_after = await call_limiter(login_limiter.blocked_for, username)
+    if retry_after:
+        _login_outcome(LOGIN_BLOCKED, username, client_ip)
+        raise _blocked_error(retry_after)
+
+    # nomes que o filtro garante não existir nem chegam ao banco; usuário
+    # inexistente paga um hash fictício e recebe a mesma resposta de senha errada
+    user = None
+    if await username_might_exist(username):
+        user = await find_user_by_username(username)
 
     if user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+        await hashing_service.verify_dummy(password)
+        raise await _failed_login(username, LOGIN_NOT_FOUND, client_ip)
+
+    # a senha é conferida antes de qualquer estado da conta: sessão ativa (409)
+    # e bloqueio antigo no banco (429) só aparecem para quem acertou a senha,
+    # senão a resposta diferente revelaria que o usuário existe. login_attempt
+    # confere os dois na transação. Hash fora da política atual (esquema ou
+    # custo) é refeito junto com o login
+    password_ok, new_hash = await hashing_service.verify_and_update(password, user["password"])
+
+    if not password_ok:
+        raise await _failed_login(username, LOGIN_FAILED, client_ip)
+
+    refresh_token, refresh_token_hash = new_refresh_token()
+    result = await login_attempt(username, new_hash, refresh_token_hash)
+    if result.status == LOGIN_NOT_FOUND:
+        raise await _failed_login(username, LOGIN_NOT_FOUND, client_ip)
+
+    _login_outcome(result.status, username, client_ip)
+    if result.status == LOGIN_SUCCESS:
+        await call_limiter(login_limiter.reset, username)
+        return _token_response(username, result, refresh_token)
+
+    if result.status == LOGIN_ACTIVE_SESSION:
+        raise _active_session_error()
+
+    raise _blocked_error(result.retry_after)
 
-    if int(user["session_active"]) == 1:
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(data: RefreshRequest, request: Request):
+    refresh_token, refresh_token_hash = new_refresh_token()
+    result = await refresh_session(hash_refresh_token(data.refresh_token), refresh_token_hash)
+
+    if result.status == REFRESH_REUSED:
+        audit_log.record(REFRESH, REFRESH_REUSED, username=result.username, ip=_client_ip(request))
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="This user already has an active session. Please logout first.",
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token was already used. Session closed, please login again.",
         )
 
-    if user["blocked_until"] is not None:
-        blocked_until = datetime.fromisoformat(user["blocked_until"])
-        if datetime.now() < blocked_until:
-            remaining = blocked_until - datetime.now()
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"This user is temporarily blocked. Try again after {int(remaining.total_seconds())} seconds.",
-            )
-        reset_login_state(username)
-
-    if verify_password(password, user["password"]):
-        reset_login_state(username)
-        session_version = activate_session(username)
-        if session_version is None:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Could not start user session.",
-            )
-
-        token = create_access_token(subject=username, session_version=session_version)
-        return TokenResponse(access_token=token, token_type="bearer")
-
-    attempts_left, blocked = register_failed_login(username)
-    if blocked:
-        raise HTTPException(
+    if result.status != REFRESH_SUCCESS:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token.")
+
+    return _token_response(result.username, result, refresh_token)
+
+
+def _token_response(username: str, result, refresh_token: str) -> TokenResponse:
+    # result: LoginResult ou RefreshResult do repositório
+    return TokenResponse(
+        access_token=create_access_token(
+            subject=username,
+            session_version=result.session_version,
+            session_epoch=result.session_epoch,
+            roles=result.roles,
+        ),
+        token_type="bearer",
+        expires_in=int(ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+        refresh_token=refresh_token,
+    )
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _login_outcome(outcome: str, username: str, client_ip: str):
+    LOGIN_ATTEMPTS.inc(outcome)
+    audit_log.record(LOGIN, outcome, username=username, ip=client_ip)
+
+
+async def _failed_login(username: str, outcome: str, client_ip: str) -> HTTPException:
+    attempts_left, retry_after = await call_limiter(login_limiter.record_failure, username)
+    if retry_after:
+        _login_outcome(LOGIN_LOCKED_OUT, username, client_ip)
+        LOGIN_LOCKOUTS.inc()
+        return HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="You have reached 3 attempts. Try again after 3 minutes.",
+            detail=f"You have reached {MAX_FAILED_LOGINS} attempts. Try again after {LOCKOUT_SECONDS // 60} minutes.",
         )
-
-    raise HTTPException(
+    _login_outcome(outcome, username, client_ip)
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail=f"Incorrect password. Attempts left: {attempts_left}",
+        detail=f"Incorrect username or password. Attempts left: {attempts_left}",
     )
 
 
+def _active_session_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="This user already has an active session. Please logout first.",
+    )
+
+
+def _blocked_error(remaining_seconds: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"This user is temporarily blocked. Try again after {remaining_seconds} seconds.",
+    )
+
+
+@router.get("/.well-known/jwks.json")
+async def jwks(request: Request):
+    # chaves públicas para outros serviços validarem tokens sem chamar a API
+    keys, etag = keyring.jwks()
+    headers = {"Cache-Control": f"public, max-age={JWKS_MAX_AGE}"}
+    if etag is not None:
+        headers["ETag"] = etag
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(keys, headers=headers)
+
 @router.get("/me", response_model=MessageResponse)
-def me(current_username: str = Depends(get_current_username)):
+async def me(current_username: str = Depends(get_current_username)):
     return MessageResponse(status="success", message=f"Authenticated as {current_username}.")
 
+@router.post("/introspect", response_model=IntrospectResponse)
+async def introspect(data: IntrospectRequest, x_introspection_secret: str | None = Header(default=None)):
+    # para o gateway validar vários tokens por chamada, numa conexão keep-alive;
+    # resultados na mesma ordem dos tokens, só com os campos preenchidos
+    if not INTROSPECTION_SECRET:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_introspection_secret is None or not hmac.compare_digest(x_introspection_secret, INTROSPECTION_SECRET):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid introspection secret.",
+        )
+    if len(data.tokens) > INTROSPECTION_MAX_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {INTROSPECTION_MAX_TOKENS} tokens per request.",
+        )
+
+    results = await introspect_tokens(data.tokens)
+    return JSONResponse({"results": results}, headers={"Cache-Control": "no-store"})
+
 @router.post("/logout", response_model=MessageResponse)
-def logout(current_username: str = Depends(get_current_username)):
-    if not deactivate_session(current_username):
+async def logout(request: Request, current_username: str = Depends(get_current_username)):
+    if not await deactivate_session(current_username):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="This user is not logged in.",
         )
+    audit_log.record(LOGOUT, username=current_username, ip=_client_ip(request))
     return MessageResponse(status="success", message="You successfully logged out.")
 
 @router.post("/change-username", response_model=MessageResponse)
-def rename_user(data: ChangeUsernameRequest, current_username: str = Depends(get_current_username)):
+async def rename_user(data: ChangeUsernameRequest, request: Request, current_username: str = Depends(get_current_username)):
     requester = data.requester
     new_username = data.new_username
 
@@ -131,34 +308,30 @@ def rename_user(data: ChangeUsernameRequest, current_username: str = Depends(get
             detail="Token user does not match requester.",
         )
 
-    requester_user = find_user_by_username(requester)
-    if requester_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requester not found.")
-
     username_ok, error_msg = validate_username(new_username)
     if not username_ok:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
 
-    if username_exists(new_username):
+    if await username_exists(new_username):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Username already in use.",
         )
 
-    if not update_username(requester, new_username):
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Could not update username.",
-        )
+    # o get_current_username já conferiu o usuário; sem linha aqui, ele foi
+    # apagado depois do token (modo claims)
+    if not await update_username(requester, new_username):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requester not found.")
 
-    deactivate_session(new_username)
+    await deactivate_session(new_username)
+    audit_log.record(CHANGE_USERNAME, username=requester, ip=_client_ip(request), detail=f"new_username={new_username}")
     return MessageResponse(
         status="success",
         message=f"Username changed to {new_username}. Session closed automatically, please login again.",
     )
 
 @router.post("/change-password", response_model=MessageResponse)
-def change_pass(data: ChangePasswordRequest, current_username: str = Depends(get_current_username)):
+async def change_pass(data: ChangePasswordRequest, request: Request, current_username: str = Depends(get_current_username)):
     requester = data.requester
     new_password = data.new_password
 
@@ -168,30 +341,29 @@ def change_pass(data: ChangePasswordRequest, current_username: str = Depends(get
             detail="Token user does not match requester.",
         )
 
-    requester_user = find_user_by_username(requester)
-    if requester_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requester not found.")
-
     password_ok, error_msg = validate_pass(new_password)
     if not password_ok:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
 
-    hashed_password = hash_password(new_password)
-    if not update_password(requester, hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Could not update password.",
-        )
+    hashed_password = await hashing_service.hash(new_password)
+    if not await update_password(requester, hashed_password):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requester not found.")
 
+    audit_log.record(CHANGE_PASSWORD, username=requester, ip=_client_ip(request))
     return MessageResponse(
         status="success",
         message=f"User {requester} password changed successfully.",
     )
 
 @router.delete("/delete-user", response_model=MessageResponse)
-def delete_user(data: DeleteUserRequest, current_username: str = Depends(get_current_username)):
+async def delete_user(
+    data: DeleteUserRequest,
+    request: Request,
+    current_user: CurrentUser = Depends(require_role(ROLE_ADMIN, "Only admin can delete users.")),
+):
     requester = data.requester
     target = data.target
+    current_username = current_user.username
 
     if requester != current_username:
         raise HTTPException(
@@ -199,45 +371,179 @@ def delete_user(data: DeleteUserRequest, current_username: str = Depends(get_cur
             detail="Token user does not match requester.",
         )
 
-    admin_user = find_user_by_username(current_username)
-    if admin_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requester not found.")
-
-    if admin_user["username"] != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admin can delete users.",
-        )
-
-    if not username_exists(target):
+    if not await username_exists(target):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User to delete not found.",
         )
 
-    if not delete_user_by_username(target):
+    if not await delete_user_by_username(target):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Could not delete user.",
         )
 
+    audit_log.record(DELETE_USER, username=target, actor=current_username, ip=_client_ip(request))
     return MessageResponse(status="success", message=f"User {target} deleted successfully.")
 
 @router.get("/show-users", response_model=ShowUsersResponse | MessageResponse)
-def show_users(params: ShowUsersRequest = Depends(), current_username: str = Depends(get_current_username)):
+async def show_users(
+    params: ShowUsersRequest = Depends(),
+    current_user: CurrentUser = Depends(require_role(ROLE_ADMIN)),
+):
     requester = params.requester
 
-    if requester != current_username:
+    if requester != current_user.username:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Token user does not match requester.",
         )
 
-    user = find_user_by_username(current_username)
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+    if params.stream:
+        return StreamingResponse(_stream_usernames(params.prefix), media_type="application/json")
+
+    users, next_cursor = await list_usernames_page(params.cursor, params.limit, params.prefix)
+    return ShowUsersResponse(users=users, next_cursor=next_cursor)
+
+
+async def _stream_usernames(prefix: str | None):
+    # mesmo formato do ShowUsersResponse, montado aos pedaços
+    yield '{"users": ['
+    cursor = None
+    first = True
+    while True:
+        users, cursor = await list_usernames_page(cursor, SHOW_USERS_STREAM_BATCH, prefix)
+        if users:
+            yield ("" if first else ", ") + ", ".join(json.dumps(user) for user in users)
+            first = False
+        if cursor is None:
+            break
+    yield '], "next_cursor": null}'
+
+
+
+async def _iter_request_lines(request: Request):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+@router.post("/admin/import-users", response_model=ImportUsersResponse)
+async def import_users(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: CurrentUser = Depends(require_role(ROLE_ADMIN, "Only admin can import users.")),
+):
+
+    report = ImportReport()
+    parser = RecordParser(format)
+    batch = []
+    try:
+        async for line in _iter_request_lines(request):
+            record = parser.feed(line)
+            if record is None:
+                continue
+            batch.append((parser.line_no, record))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await import_batch(report, batch)
+                batch = []
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Import body must be UTF-8.")
+    if batch:
+        await import_batch(report, batch)
+
+    audit_log.record(
+        IMPORT_USERS,
+        actor=current_user.username,
+        ip=_client_ip(request),
+        detail=f"imported={report.imported} failed={report.failed}",
+    )
+    return report.as_dict()
+
+@router.get("/admin/export-users")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: CurrentUser = Depends(require_role(ROLE_ADMIN, "Only admin can export users.")),
+):
+
+    async def chunks():
+        header = export_header(format)
+        if header:
+            yield header
+        after_id = 0
+        while True:
+            text, after_id = await export_chunk(format, after_id, EXPORT_BATCH_SIZE)
+            if after_id is None:
+                return
+            yield text
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        chunks(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=users.{format}"},
+    )
 
-    if user["username"] != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied.")
+@router.get("/admin/audit", response_model=AuditEventsResponse)
+async def audit_events(
+    params: AuditQueryRequest = Depends(),
+    current_user: CurrentUser = Depends(require_role(ROLE_ADMIN, "Only admin can read the audit log.")),
+):
+    if not audit_log.enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audit log is disabled.")
+
+    # eventos ficam no buffer até o próximo flush (SIMPLEAUTH_AUDIT_FLUSH_INTERVAL)
+    try:
+        rows, next_cursor = await query_audit_events(
+            params.cursor,
+            params.limit,
+            username=params.username,
+            event=params.event,
+            since=params.since,
+            until=params.until,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    return AuditEventsResponse(events=[AuditEvent(**dict(row)) for row in rows], next_cursor=next_cursor)
+
+
+@router.post("/admin/revoke-sessions", response_model=MessageResponse)
+async def revoke_sessions(
+    request: Request,
+    current_user: CurrentUser = Depends(require_role(ROLE_ADMIN, "Only admin can revoke sessions.")),
+):
+    # uma linha gravada, qualquer que seja o número de usuários; o token do
+    # próprio admin também cai
+    epoch = await bump_session_epoch()
+    audit_log.record(REVOKE_SESSIONS, actor=current_user.username, ip=_client_ip(request), detail=f"epoch={epoch}")
+    return MessageResponse(status="success", message="All sessions revoked. Users must log in again.")
+
+
+@router.post("/admin/roles", response_model=MessageResponse)
+async def set_roles(
+    data: SetRolesRequest,
+    request: Request,
+    current_user: CurrentUser = Depends(require_role(ROLE_ADMIN, "Only admin can change roles.")),
+):
+    # a sessão do usuário alterado é encerrada: o próximo login traz os papéis novos
+    try:
+        updated = await update_roles(data.username, data.roles)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if not updated:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
 
-    return {"users": list_usernames()}
+    audit_log.record(
+        SET_ROLES,
+        username=data.username,
+        actor=current_user.username,
+        ip=_client_ip(request),
+        detail=f"roles={','.join(sorted(set(data.roles)))}",
+    )
+    return MessageResponse(status="success", message=f"Roles of {data.username} updated. Session closed automatically.")
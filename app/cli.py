@@ -0,0 +1,120 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app.security.password import HASH_SCHEME, SCHEMES, calibrate
+from app.services.user_service import ROLES, bump_session_epoch, repository, update_roles
+from app.services.user_transfer import FORMATS, IMPORT_BATCH_SIZE, import_lines, iter_export_chunks
+from app.storage.migrations import MIGRATION_BATCH_SIZE
+
+
+def _detect_format(path: str, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    return "csv" if Path(path).suffix.lower() == ".csv" else "ndjson"
+
+
+def cmd_import(args) -> int:
+    fmt = _detect_format(args.file, args.format)
+    with (sys.stdin if args.file == "-" else open(args.file, encoding="utf-8", newline="")) as handle:
+        report = import_lines(handle, fmt, batch_size=args.batch_size)
+    print(json.dumps(report.as_dict(), indent=2))
+    return 0 if report.failed == 0 else 1
+
+
+def cmd_export(args) -> int:
+    fmt = _detect_format(args.file, args.format)
+    with (sys.stdout if args.file == "-" else open(args.file, "w", encoding="utf-8", newline="")) as handle:
+        for chunk in iter_export_chunks(fmt):
+            handle.write(chunk)
+    return 0
+
+
+def cmd_calibrate(args) -> int:
+    result = calibrate(args.scheme, args.target_ms / 1000)
+    verify_ms = result.pop("verify_ms")
+    for key, value in result.items():
+        print(f"{key}={value}")
+    print(f"# verify takes {verify_ms} ms on this host (target {args.target_ms} ms)", file=sys.stderr)
+    return 0
+
+
+def cmd_migrate(args) -> int:
+    if args.status:
+        print(json.dumps(repository.migration_status(), indent=2))
+        return 0
+    applied = repository.migrate(target=args.target, batch_size=args.batch_size)
+    print(json.dumps({"applied": applied, **repository.migration_status()}, indent=2))
+    return 0
+
+
+def cmd_revoke_sessions(args) -> int:
+    # os workers com canal de invalidação recebem a época nova na hora; os
+    # outros percebem no próximo polling
+    print(json.dumps({"epoch": bump_session_epoch()}))
+    return 0
+
+
+def cmd_set_roles(args) -> int:
+    # sem papéis na linha de comando tira todos; a sessão do usuário é encerrada
+    try:
+        updated = update_roles(args.username, args.roles)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    if not updated:
+        print(f"User {args.username} not found.", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import users from NDJSON or CSV.")
+    import_parser.add_argument("file", help="Input file, or - for stdin.")
+    import_parser.add_argument("--format", choices=FORMATS)
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    import_parser.set_defaults(handler=cmd_import)
+
+    export_parser = commands.add_parser("export", help="Export users to NDJSON or CSV.")
+    export_parser.add_argument("file", help="Output file, or - for stdout.")
+    export_parser.add_argument("--format", choices=FORMATS)
+    export_parser.set_defaults(handler=cmd_export)
+
+    calibrate_parser = commands.add_parser("calibrate", help="Pick hashing cost settings for a target verify time.")
+    calibrate_parser.add_argument("--scheme", choices=SCHEMES, default=HASH_SCHEME)
+    calibrate_parser.add_argument("--target-ms", type=float, default=250.0)
+    calibrate_parser.set_defaults(handler=cmd_calibrate, needs_db=False)
+
+    migrate_parser = commands.add_parser("migrate", help="Apply pending schema migrations.")
+    migrate_parser.add_argument("--status", action="store_true", help="Only show the schema version.")
+    migrate_parser.add_argument("--target", type=int, help="Defaults to the latest version of the configured backend.")
+    migrate_parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    migrate_parser.set_defaults(handler=cmd_migrate, needs_db=False)
+
+    revoke_parser = commands.add_parser("revoke-sessions", help="Invalidate every session and access token at once.")
+    revoke_parser.set_defaults(handler=cmd_revoke_sessions)
+
+    roles_parser = commands.add_parser("set-roles", help="Replace the roles of a user (e.g. grant admin).")
+    roles_parser.add_argument("username")
+    roles_parser.add_argument("roles", nargs="*", help=f"Any of: {', '.join(ROLES)}. None removes all roles.")
+    roles_parser.set_defaults(handler=cmd_set_roles)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if getattr(args, "needs_db", True):
+            repository.init()
+        return args.handler(args)
+    finally:
+        repository.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import os
+import threading
+
+# segundos entre o SIGTERM e o fechamento do socket: o /health/ready já
+# responde 503 e o balanceador tira o worker da rotação antes do fim
+DRAIN_SECONDS = float(os.getenv("SIMPLEAUTH_DRAIN_SECONDS", "5"))
+# tempo máximo para as requisições em andamento terminarem depois disso
+SHUTDOWN_TIMEOUT = float(os.getenv("SIMPLEAUTH_SHUTDOWN_TIMEOUT", "30"))
+
+
+class Lifecycle:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = False
+        self.draining = False
+
+    @property
+    def ready(self) -> bool:
+        return self.started and not self.draining
+
+    def mark_started(self):
+        with self._lock:
+            self.started = True
+
+    def start_draining(self) -> bool:
+        # devolve False se já estava drenando
+        with self._lock:
+            if self.draining:
+                return False
+            self.draining = True
+            return True
+
+    def stats(self) -> dict:
+        return {"started": int(self.started), "draining": int(self.draining)}
+
+
+lifecycle = Lifecycle()
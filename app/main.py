@@ -1,14 +1,100 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app import metrics
 from app.api.endpoints import router
-from app.storage.db import init_db
+from app.lifecycle import lifecycle
+from app.security.hashing import HASH_RETRY_AFTER, HashingBusyError, hashing_service
+from app.security.jwt import keyring
+from app.security.limiter import login_limiter
+from app.security.token_cache import token_cache
+from app.services.async_user_service import check_database
+from app.services.audit import audit_log
+from app.services.user_service import (
+    invalidation,
+    repository,
+    session_cache,
+    session_epoch,
+    session_sweeper,
+    username_filter,
+)
+from app.storage.async_db import stop_db_executor
+from app.storage.write_queue import group_commit
+
+def startup():
+    repository.init()
+    keyring.load()
+    repository.start()
+    hashing_service.start()
+    username_filter.start()
+    invalidation.start()
+    audit_log.start()
+    session_sweeper.start()
+    lifecycle.mark_started()
 
-app = FastAPI()
+def shutdown():
+    # nesta hora o servidor já parou de aceitar conexões e as requisições
+    # em andamento terminaram; sobra esvaziar os pools na ordem de uso
+    lifecycle.start_draining()
+    session_sweeper.stop()
+    invalidation.close()
+    hashing_service.shutdown()
+    stop_db_executor()
+    audit_log.close()
+    repository.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup()
+    yield
+    shutdown()
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(router)
+app.add_middleware(metrics.MetricsMiddleware)
 
-@app.on_event("startup")
-def startup():
-    init_db()
+metrics.register_collector("simpleauth_db_pool", repository.stats)
+metrics.register_collector("simpleauth_db_writer", group_commit.stats)
+metrics.register_collector("simpleauth_session_cache", session_cache.stats)
+metrics.register_collector("simpleauth_token_cache", token_cache.stats)
+metrics.register_collector("simpleauth_hashing", hashing_service.stats)
+metrics.register_collector("simpleauth_login_limiter", login_limiter.stats)
+metrics.register_collector("simpleauth_username_filter", username_filter.stats)
+metrics.register_collector("simpleauth_jwt_keys", keyring.stats)
+metrics.register_collector("simpleauth_invalidation", invalidation.stats)
+metrics.register_collector("simpleauth_lifecycle", lifecycle.stats)
+metrics.register_collector("simpleauth_audit", audit_log.stats)
+metrics.register_collector("simpleauth_session_sweeper", session_sweeper.stats)
+metrics.register_collector("simpleauth_session_epoch", session_epoch.stats)
+
+@app.exception_handler(HashingBusyError)
+def hashing_busy_handler(request: Request, exc: HashingBusyError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy. Please try again shortly."},
+        headers={"Retry-After": str(HASH_RETRY_AFTER)},
+    )
 
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+@app.get("/health/live", include_in_schema=False)
+def liveness():
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness():
+    if not lifecycle.ready:
+        state = "draining" if lifecycle.draining else "starting"
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": state})
+    try:
+        await check_database()
+    except Exception:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "database_unavailable"})
+    return {"status": "ready"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
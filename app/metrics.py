@@ -0,0 +1,215 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+METRICS_ENABLED = os.getenv("SIMPLEAUTH_METRICS_ENABLED", "1") == "1"
+SERVER_TIMING_ENABLED = os.getenv("SIMPLEAUTH_SERVER_TIMING", "0") == "1"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# tempos da requisição atual para o header Server-Timing ({"db": 0.0012, ...})
+_request_timings: ContextVar[dict | None] = ContextVar("simpleauth_request_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {} # label_values -> [contagem por bucket..., soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(value)) for key, value in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labels + ("le",), label_values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels + ("le",), label_values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            plain = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{plain} {series[-2]}")
+            lines.append(f"{self.name}_count{plain} {series[-1]}")
+        return lines
+
+
+_metrics = []
+_collectors = []
+
+
+def counter(name: str, help_text: str, labels: tuple = ()) -> Counter:
+    metric = Counter(name, help_text, labels)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    metric = Histogram(name, help_text, labels, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(prefix: str, collect):
+    # collect() devolve um dict de números (ex.: pool.stats()), exportado como gauges
+    _collectors.append((prefix, collect))
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for prefix, collect in _collectors:
+        try:
+            stats = collect()
+        except Exception:
+            continue
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def record_timing(component: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[component] = timings.get(component, 0.0) + seconds
+
+
+REQUEST_DURATION = histogram(
+    "simpleauth_http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+DB_CALLS = counter("simpleauth_db_calls_total", "User service calls that hit the database.", ("function",))
+DB_DURATION = histogram("simpleauth_db_call_duration_seconds", "Time spent in user service database calls.", ("function",))
+DB_CONNECTIONS_OPENED = counter("simpleauth_db_connections_opened_total", "SQLite connections opened.")
+PASSWORD_HASH_DURATION = histogram(
+    "simpleauth_password_hash_duration_seconds",
+    "Password hash/verify latency, including time queued for a worker.",
+    ("operation",),
+)
+JWT_DECODE_DURATION = histogram("simpleauth_jwt_decode_duration_seconds", "jwt.decode time on token cache misses.")
+LOGIN_ATTEMPTS = counter("simpleauth_login_attempts_total", "Login attempts by outcome.", ("result",))
+LOGIN_LOCKOUTS = counter("simpleauth_login_lockouts_total", "Users locked out after too many failed attempts.")
+
+
+def instrument_db(func):
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_CALLS.inc(name)
+            DB_DURATION.observe(elapsed, name)
+            record_timing("db", elapsed)
+    return wrapper
+
+
+class MetricsMiddleware:
+    # middleware ASGI puro: bem mais barato que BaseHTTPMiddleware
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = {} if SERVER_TIMING_ENABLED else None
+        token = _request_timings.set(timings)
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+                if timings is not None:
+                    timings["app"] = time.perf_counter() - started
+                    header = ", ".join(f"{name};dur={value * 1000:.3f}" for name, value in timings.items())
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started, scope.get("method", ""), path, status_holder["status"]
+            )
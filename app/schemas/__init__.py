@@ -1,9 +1,23 @@
-from app.schemas.admin import DeleteUserRequest, ShowUsersRequest, ShowUsersResponse
+from app.schemas.admin import (
+    AuditEvent,
+    AuditEventsResponse,
+    AuditQueryRequest,
+    DeleteUserRequest,
+    ImportRowError,
+    ImportUsersResponse,
+    SetRolesRequest,
+    ShowUsersRequest,
+    ShowUsersResponse,
+)
 from app.schemas.auth import (
     ChangePasswordRequest,
     ChangeUsernameRequest,
+    IntrospectRequest,
+    IntrospectResponse,
+    IntrospectionResult,
     LoginRequest,
     LogoutRequest,
+    RefreshRequest,
     RegisterRequest,
     TokenResponse,
 )
@@ -13,11 +27,21 @@ __all__ = [
     "RegisterRequest",
     "LoginRequest",
     "LogoutRequest",
+    "RefreshRequest",
     "ChangeUsernameRequest",
     "ChangePasswordRequest",
     "TokenResponse",
+    "IntrospectRequest",
+    "IntrospectionResult",
+    "IntrospectResponse",
     "DeleteUserRequest",
     "ShowUsersRequest",
     "ShowUsersResponse",
+    "ImportRowError",
+    "ImportUsersResponse",
+    "SetRolesRequest",
+    "AuditQueryRequest",
+    "AuditEvent",
+    "AuditEventsResponse",
     "MessageResponse",
 ]
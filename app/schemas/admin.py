@@ -1,5 +1,5 @@
-from typing import List
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class DeleteUserRequest(BaseModel):
@@ -9,7 +9,55 @@ class DeleteUserRequest(BaseModel):
 
 class ShowUsersRequest(BaseModel):
     requester: str
+    cursor: Optional[str] = None
+    limit: int = Field(100, ge=1, le=1000)
+    prefix: Optional[str] = None
+    stream: bool = False
 
 
 class ShowUsersResponse(BaseModel):
     users: List[str]
+    next_cursor: Optional[str] = None
+
+
+class ImportRowError(BaseModel):
+    line: int
+    username: Optional[str] = None
+    error: str
+
+
+class ImportUsersResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+
+
+class SetRolesRequest(BaseModel):
+    username: str
+    roles: List[str]
+
+
+class AuditQueryRequest(BaseModel):
+    username: Optional[str] = None
+    event: Optional[str] = None
+    since: Optional[float] = None
+    until: Optional[float] = None
+    cursor: Optional[str] = None
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class AuditEvent(BaseModel):
+    id: int
+    created_at: float
+    event: str
+    outcome: str
+    username: Optional[str] = None
+    actor: Optional[str] = None
+    ip: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class AuditEventsResponse(BaseModel):
+    events: List[AuditEvent]
+    next_cursor: Optional[str] = None
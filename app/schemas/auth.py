@@ -14,6 +14,12 @@ class LoginRequest(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str
+    expires_in: int | None = None
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class LogoutRequest(BaseModel):
@@ -28,3 +34,20 @@ class ChangeUsernameRequest(BaseModel):
 class ChangePasswordRequest(BaseModel):
     requester: str
     new_password: str
+
+
+class IntrospectRequest(BaseModel):
+    tokens: list[str]
+
+
+class IntrospectionResult(BaseModel):
+    active: bool
+    sub: str | None = None
+    sv: int | None = None
+    roles: list[str] | None = None
+    exp: int | None = None
+    error: str | None = None
+
+
+class IntrospectResponse(BaseModel):
+    results: list[IntrospectionResult]
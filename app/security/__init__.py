@@ -1,7 +1,11 @@
+from app.security.hashing import HashingBusyError, HashingService, hashing_service
 from app.security.jwt import create_access_token, decode_access_token, get_current_username
 from app.security.password import hash_password, verify_password
 
 __all__ = [
+    "HashingBusyError",
+    "HashingService",
+    "hashing_service",
     "create_access_token",
     "decode_access_token",
     "get_current_username",
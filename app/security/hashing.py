@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from starlette.concurrency import run_in_threadpool
+
+from app.metrics import PASSWORD_HASH_DURATION, record_timing
+from app.security import password as policy
+from app.security.password import hash_password, verify_and_update, verify_password
+
+HASH_WORKERS = int(os.getenv("SIMPLEAUTH_HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.getenv("SIMPLEAUTH_HASH_MAX_PENDING", str(max(HASH_WORKERS, 1) * 8)))
+HASH_RETRY_AFTER = int(os.getenv("SIMPLEAUTH_HASH_RETRY_AFTER", "1"))
+
+
+class HashingBusyError(RuntimeError):
+    pass
+
+
+class HashingService:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._dummy_hash = None
+        self._dummy_lock = threading.Lock()
+
+    def start(self):
+        # o hash falso fica pronto antes da primeira requisição: gerá-lo
+        # dentro dela deixaria esse login mais lento que os outros
+        self._ensure_dummy()
+        if self.workers > 0 and self._executor is None:
+            # spawn evita herdar threads do processo do servidor (pool, checkpoint)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, operation: str, func, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HashingBusyError("Password hashing queue is full.")
+            self._pending += 1
+
+        started = time.perf_counter()
+        try:
+            if self._executor is None:
+                return await run_in_threadpool(func, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            PASSWORD_HASH_DURATION.observe(elapsed, operation)
+            record_timing("hash", elapsed)
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+                self._latency_total += elapsed
+                self._latency_max = max(self._latency_max, elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        return await self._run("verify", verify_and_update, plain_password, hashed_password)
+
+    def _ensure_dummy(self) -> str:
+        # segue a política atual (esquema e custo), senão a verificação falsa
+        # custaria diferente de uma real; o lock evita gerar dois ao mesmo tempo
+        with self._dummy_lock:
+            if self._dummy_hash is None or policy.pwd_context.needs_update(self._dummy_hash):
+                self._dummy_hash = policy.hash_password(secrets.token_urlsafe(16))
+            return self._dummy_hash
+
+    async def verify_dummy(self, plain_password: str) -> bool:
+        # mesmo trabalho de uma verificação real, para usuários que não existem
+        dummy_hash = self._dummy_hash
+        if dummy_hash is None or policy.pwd_context.needs_update(dummy_hash):
+            dummy_hash = await run_in_threadpool(self._ensure_dummy)
+        await self.verify(plain_password, dummy_hash)
+        return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "queue_depth": self._pending,
+                "max_pending": self.max_pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "latency_avg_ms": round(self._latency_total / completed * 1000, 3) if completed else 0.0,
+                "latency_max_ms": round(self._latency_max * 1000, 3),
+            }
+
+
+hashing_service = HashingService()
@@ -1,62 +1,204 @@
+import hashlib
 import os
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 
-from app.services.user_service import find_user_by_username
+from app.metrics import JWT_DECODE_DURATION, record_timing
+from app.security.keys import JWT_ALGORITHM, KeyRing
+from app.security.token_cache import token_cache
+from app.services import async_user_service
 
 SECRET_KEY = os.getenv("SECRET_KEY", "change-this-secret-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ALGORITHM = JWT_ALGORITHM
+
+# session: toda requisição confere session_active/session_version (cache ou banco)
+# claims: o access token vale sozinho até expirar; a revogação fica com o refresh token
+ACCESS_TOKEN_MODE = os.getenv("SIMPLEAUTH_ACCESS_TOKEN_MODE", "session").lower()
+if ACCESS_TOKEN_MODE not in {"session", "claims"}:
+    raise ValueError(f"Invalid SIMPLEAUTH_ACCESS_TOKEN_MODE: {ACCESS_TOKEN_MODE}")
+ACCESS_TOKEN_EXPIRE_MINUTES = float(
+    os.getenv("SIMPLEAUTH_ACCESS_TOKEN_EXPIRE_MINUTES", "30" if ACCESS_TOKEN_MODE == "session" else "5")
+)
+
+keyring = KeyRing(secret=SECRET_KEY, token_lifetime=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 bearer_scheme = HTTPBearer()
 
+# o gateway se autentica com este segredo no header X-Introspection-Secret;
+# sem ele configurado o /introspect fica desligado
+INTROSPECTION_SECRET = os.getenv("SIMPLEAUTH_INTROSPECTION_SECRET", "")
+INTROSPECTION_MAX_TOKENS = int(os.getenv("SIMPLEAUTH_INTROSPECTION_MAX_TOKENS", "100"))
+
+
+class CurrentUser(NamedTuple):
+    username: str
+    roles: tuple[str, ...] = ()
+
 
-def create_access_token(subject: str, session_version: int) -> str:
+def create_access_token(subject: str, session_version: int, session_epoch: int = 0, roles=()) -> str:
+    # os papéis vão no token: checar permissão não custa outra leitura do
+    # usuário. Mudar os papéis encerra a sessão, então no modo session um
+    # token com papéis antigos já cai na checagem de session_version
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    payload = {"sub": subject, "sv": session_version, "exp": expire}
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    payload = {"sub": subject, "sv": session_version, "ep": session_epoch, "roles": list(roles), "exp": expire}
+    key = keyring.signing_key()
+    headers = {"kid": key.kid} if key.kid else None
+    return jwt.encode(payload, key.private_key, algorithm=ALGORITHM, headers=headers)
+
+
+def new_refresh_token() -> tuple[str, str]:
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+
+def hash_refresh_token(token: str) -> str:
+    # token aleatório de 256 bits: sha256 basta, não precisa de hash lento
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 def decode_access_token(token: str) -> dict | None:
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    started = time.perf_counter()
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        key = keyring.verification_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            return None
+        claims = jwt.decode(token, key, algorithms=[ALGORITHM])
     except JWTError:
         return None
+    finally:
+        elapsed = time.perf_counter() - started
+        JWT_DECODE_DURATION.observe(elapsed)
+        record_timing("jwt", elapsed)
 
+    token_cache.put(token, claims)
+    return claims
 
-def get_current_username(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-) -> str:
-    payload = decode_access_token(credentials.credentials)
+
+# motivos de rejeição; o introspect devolve o código e o /me, a mensagem
+TOKEN_INVALID = "invalid_token"
+USER_NOT_FOUND = "user_not_found"
+SESSION_INACTIVE = "session_inactive"
+SESSION_REPLACED = "session_replaced"
+SESSION_REVOKED = "session_revoked"
+
+TOKEN_ERROR_DETAILS = {
+    TOKEN_INVALID: "Invalid or expired token.",
+    USER_NOT_FOUND: "User not found for this token.",
+    SESSION_INACTIVE: "Session is not active.",
+    SESSION_REPLACED: "Session is no longer active. Please log in again.",
+    SESSION_REVOKED: "Session was revoked. Please log in again.",
+}
+
+
+def _access_claims(token: str) -> dict | None:
+    payload = decode_access_token(token)
     if not payload or "sub" not in payload or "sv" not in payload:
+        return None
+    return payload
+
+
+def _epoch_error(payload: dict, epoch: int) -> str | None:
+    # token emitido antes do último bump da época foi revogado em massa;
+    # vale nos dois modos, inclusive no claims, que não consulta a sessão
+    if int(payload.get("ep", 0)) < epoch:
+        return SESSION_REVOKED
+    return None
+
+
+def _session_error(payload: dict, session_state: tuple[int, int] | None) -> str | None:
+    if session_state is None:
+        return USER_NOT_FOUND
+    session_active, session_version = session_state
+    if session_active != 1:
+        return SESSION_INACTIVE
+    if session_version != int(payload["sv"]):
+        return SESSION_REPLACED
+    return None
+
+
+def _claim_roles(payload: dict) -> tuple[str, ...]:
+    # token emitido antes dos papéis existirem não tem a claim: sem papel
+    return tuple(payload.get("roles") or ())
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+) -> CurrentUser:
+    payload = _access_claims(credentials.credentials)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token.",
+            detail=TOKEN_ERROR_DETAILS[TOKEN_INVALID],
         )
 
     username = payload["sub"]
-    token_session_version = payload["sv"]
 
-    user = find_user_by_username(username)
-    if user is None:
+    error = _epoch_error(payload, await async_user_service.current_session_epoch())
+    if error is None and ACCESS_TOKEN_MODE == "session":
+        session_state = await async_user_service.get_session_state(username)
+        error = _session_error(payload, session_state)
+    if error is not None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found for this token.",
+            detail=TOKEN_ERROR_DETAILS[error],
         )
 
-    if int(user["session_active"]) != 1:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Session is not active.",
-        )
+    return CurrentUser(username, _claim_roles(payload))
 
-    if int(user["session_version"]) != int(token_session_version):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Session is no longer active. Please log in again.",
-        )
 
-    return username
+async def get_current_username(current_user: CurrentUser = Depends(get_current_user)) -> str:
+    return current_user.username
+
+
+def require_role(role: str, detail: str = "Permission denied."):
+    # dependência das rotas restritas: confere o papel no usuário que o
+    # get_current_user já validou, sem ir ao banco de novo
+    async def dependency(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+        if role not in current_user.roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+        return current_user
+
+    return dependency
+
+
+async def introspect_tokens(tokens: list[str]) -> list[dict]:
+    # mesmas regras do get_current_username para um lote inteiro: decode de
+    # cada token (com o token_cache) e o estado de sessão de todos os
+    # usuários numa ida só ao banco
+    payloads = [_access_claims(token) for token in tokens]
+    epoch = await async_user_service.current_session_epoch()
+    states = {}
+    if ACCESS_TOKEN_MODE == "session":
+        usernames = list(dict.fromkeys(payload["sub"] for payload in payloads if payload is not None))
+        if usernames:
+            states = await async_user_service.get_session_states(usernames)
+
+    results = []
+    for payload in payloads:
+        if payload is None:
+            results.append({"active": False, "error": TOKEN_INVALID})
+            continue
+        error = _epoch_error(payload, epoch)
+        if error is None and ACCESS_TOKEN_MODE == "session":
+            error = _session_error(payload, states.get(payload["sub"]))
+        if error is not None:
+            results.append({"active": False, "error": error})
+            continue
+        results.append({
+            "active": True,
+            "sub": payload["sub"],
+            "sv": int(payload["sv"]),
+            "roles": list(_claim_roles(payload)),
+            "exp": int(payload["exp"]),
+        })
+    return results
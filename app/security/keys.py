@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+
+# HS256 mantém o comportamento antigo (SECRET_KEY compartilhado); RS256/ES256
+# assinam com chaves privadas em JWT_KEYS_DIR e publicam as públicas no JWKS.
+# EdDSA ficou de fora: o python-jose não implementa esse algoritmo.
+JWT_ALGORITHM = os.getenv("SIMPLEAUTH_JWT_ALGORITHM", "HS256").upper()
+JWT_KEYS_DIR = Path(os.getenv("SIMPLEAUTH_JWT_KEYS_DIR", Path(__file__).resolve().parents[1] / "storage" / "keys"))
+JWT_ROTATION_DAYS = float(os.getenv("SIMPLEAUTH_JWT_ROTATION_DAYS", "30"))
+JWT_RELOAD_INTERVAL = float(os.getenv("SIMPLEAUTH_JWT_RELOAD_INTERVAL", "60"))
+JWKS_MAX_AGE = int(os.getenv("SIMPLEAUTH_JWKS_MAX_AGE", "300"))
+RSA_KEY_SIZE = int(os.getenv("SIMPLEAUTH_JWT_RSA_KEY_SIZE", "2048"))
+
+ALGORITHMS = ("HS256", "RS256", "ES256")
+
+if JWT_ALGORITHM not in ALGORITHMS:
+    raise ValueError(f"Invalid SIMPLEAUTH_JWT_ALGORITHM: {JWT_ALGORITHM}")
+
+
+class SigningKey:
+    def __init__(self, kid: str, created_at: float, private_key, public_key, public_jwk: dict | None):
+        self.kid = kid
+        self.created_at = created_at
+        self.private_key = private_key # objetos jose já construídos, usados direto em encode/decode
+        self.public_key = public_key
+        self.public_jwk = public_jwk
+
+
+def _generate_private_pem(algorithm: str) -> bytes:
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=RSA_KEY_SIZE)
+    else:
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+class KeyRing:
+    # chaves em <keys_dir>/<algoritmo>/<kid>.pem, com kid = "<criada em epoch>-<aleatório>".
+    # A mais nova assina; as anteriores só verificam, até que todo token que
+    # elas assinaram tenha expirado. Cada worker lê o mesmo diretório, então
+    # uma rotação feita por um é vista pelos outros no próximo reload.
+    def __init__(
+        self,
+        algorithm: str = JWT_ALGORITHM,
+        keys_dir: Path = JWT_KEYS_DIR,
+        secret: str | None = None,
+        rotation_days: float = JWT_ROTATION_DAYS,
+        reload_interval: float = JWT_RELOAD_INTERVAL,
+        token_lifetime: float = 0,
+    ):
+        self.algorithm = algorithm
+        self.keys_dir = Path(keys_dir) / algorithm.lower()
+        self.secret = secret
+        self.rotation_seconds = rotation_days * 86400
+        self.reload_interval = reload_interval
+        self.token_lifetime = token_lifetime
+        self._keys = {}
+        self._active = None
+        self._jwks = {"keys": []}
+        self._jwks_etag = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.rotations = 0
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.algorithm != "HS256"
+
+    def load(self):
+        with self._lock:
+            self._load_locked()
+
+    def _load_locked(self):
+        if not self.asymmetric:
+            key = jwk.construct(self.secret, self.algorithm)
+            self._keys = {None: SigningKey(None, 0.0, key, key, None)}
+            self._active = self._keys[None]
+            self._loaded_at = time.monotonic()
+            return
+
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.keys_dir.glob("*.pem"):
+            kid = path.stem
+            try:
+                created_at = float(kid.split("-", 1)[0])
+            except ValueError:
+                continue
+            entries.append((created_at, kid, path))
+        entries.sort()
+
+        now = time.time()
+        if not entries or now - entries[-1][0] >= self.rotation_seconds:
+            entries.append(self._create_key(now))
+            self.rotations += 1
+
+        keys = {}
+        for index, (created_at, kid, path) in enumerate(entries):
+            # aposentada há mais tempo que a validade de um token: não verifica mais nada
+            retired_at = entries[index + 1][0] if index + 1 < len(entries) else None
+            if retired_at is not None and now - retired_at > self.token_lifetime:
+                continue
+            key = self._keys.get(kid)
+            if key is None:
+                pem = path.read_bytes()
+                private_key = jwk.construct(pem, self.algorithm)
+                public_key = private_key.public_key()
+                public_jwk = {**public_key.to_dict(), "kid": kid, "use": "sig", "alg": self.algorithm}
+                key = SigningKey(kid, created_at, private_key, public_key, public_jwk)
+            keys[kid] = key
+
+        self._keys = keys
+        self._active = keys[entries[-1][1]]
+        self._jwks = {"keys": [key.public_jwk for key in keys.values()]}
+        body = json.dumps(self._jwks, sort_keys=True).encode()
+        self._jwks_etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._loaded_at = time.monotonic()
+
+    def _create_key(self, now: float) -> tuple[float, str, Path]:
+        created_at = int(now)
+        kid = f"{created_at}-{secrets.token_hex(4)}"
+        path = self.keys_dir / f"{kid}.pem"
+        # grava em arquivo temporário e renomeia: outro worker nunca lê PEM pela metade
+        tmp = path.with_suffix(".tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(_generate_private_pem(self.algorithm))
+        os.replace(tmp, path)
+        return float(created_at), kid, path
+
+    def _refresh_if_due(self):
+        if self._active is None or time.monotonic() - self._loaded_at >= self.reload_interval:
+            with self._lock:
+                if self._active is None or time.monotonic() - self._loaded_at >= self.reload_interval:
+                    self._load_locked()
+
+    def signing_key(self) -> SigningKey:
+        self._refresh_if_due()
+        return self._active
+
+    def verification_key(self, kid: str | None):
+        self._refresh_if_due()
+        if not self.asymmetric:
+            return self._active.public_key
+        key = self._keys.get(kid)
+        if key is None and kid is not None:
+            # kid desconhecido: talvez outro worker acabou de rotacionar
+            with self._lock:
+                if time.monotonic() - self._loaded_at >= 1.0:
+                    self._load_locked()
+                key = self._keys.get(kid)
+        return key.public_key if key is not None else None
+
+    def jwks(self) -> tuple[dict, str | None]:
+        self._refresh_if_due()
+        return self._jwks, self._jwks_etag
+
+    def stats(self) -> dict:
+        with self._lock:
+            active = self._active
+            return {
+                "keys": len(self._keys),
+                "active_key_age_seconds": round(time.time() - active.created_at, 1) if active and active.kid else 0,
+                "rotations": self.rotations,
+            }
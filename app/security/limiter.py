@@ -0,0 +1,315 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from starlette.concurrency import run_in_threadpool
+
+LIMITER_BACKEND = os.getenv("SIMPLEAUTH_LIMITER_BACKEND", "memory").lower()
+LIMITER_REDIS_URL = os.getenv("SIMPLEAUTH_LIMITER_REDIS_URL", "redis://localhost:6379/0")
+LIMITER_REDIS_PREFIX = os.getenv("SIMPLEAUTH_LIMITER_REDIS_PREFIX", "simpleauth:limiter")
+# backend sqlite: um arquivo compartilhado pelos workers da mesma máquina;
+# em /dev/shm fica em memória. app.serve escolhe este backend sozinho com
+# mais de um worker
+LIMITER_SQLITE_PATH = os.getenv("SIMPLEAUTH_LIMITER_SQLITE_PATH", "")
+LIMITER_MAX_KEYS = int(os.getenv("SIMPLEAUTH_LIMITER_MAX_KEYS", "100000"))
+
+MAX_FAILED_LOGINS = int(os.getenv("SIMPLEAUTH_MAX_FAILED_LOGINS", "3"))
+FAILED_LOGIN_WINDOW = int(os.getenv("SIMPLEAUTH_FAILED_LOGIN_WINDOW", "900"))
+LOCKOUT_SECONDS = int(os.getenv("SIMPLEAUTH_LOCKOUT_SECONDS", "180"))
+IP_LOGIN_LIMIT = int(os.getenv("SIMPLEAUTH_IP_LOGIN_LIMIT", "30"))
+IP_LOGIN_WINDOW = int(os.getenv("SIMPLEAUTH_IP_LOGIN_WINDOW", "60"))
+
+
+class MemoryLimiter:
+    # janelas deslizantes em memória do processo, protegidas por lock;
+    # cada worker tem as suas (sqlite ou redis compartilham entre workers)
+    blocking = False
+
+    def __init__(self, max_keys: int = LIMITER_MAX_KEYS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ip_hits = OrderedDict() # ip -> deque de timestamps
+        self._failures = OrderedDict() # username -> deque de timestamps
+        self._blocked = OrderedDict() # username -> bloqueado até
+
+    def _touch(self, table: OrderedDict, key, default):
+        value = table.get(key)
+        if value is None:
+            value = table[key] = default()
+        table.move_to_end(key)
+        while len(table) > self.max_keys:
+            table.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _trim(hits: deque, cutoff: float):
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+
+    def hit_ip(self, ip: str) -> int:
+        now = self._clock()
+        with self._lock:
+            hits = self._touch(self._ip_hits, ip, deque)
+            self._trim(hits, now - IP_LOGIN_WINDOW)
+            if len(hits) >= IP_LOGIN_LIMIT:
+                return max(1, int(hits[0] + IP_LOGIN_WINDOW - now) + 1)
+            hits.append(now)
+            return 0
+
+    def blocked_for(self, username: str) -> int:
+        now = self._clock()
+        with self._lock:
+            blocked_until = self._blocked.get(username)
+            if blocked_until is None:
+                return 0
+            if blocked_until <= now:
+                del self._blocked[username]
+                return 0
+            return max(1, int(blocked_until - now))
+
+    def record_failure(self, username: str) -> tuple[int, int]:
+        now = self._clock()
+        with self._lock:
+            failures = self._touch(self._failures, username, deque)
+            self._trim(failures, now - FAILED_LOGIN_WINDOW)
+            failures.append(now)
+            if len(failures) >= MAX_FAILED_LOGINS:
+                self._failures.pop(username, None)
+                self._touch(self._blocked, username, float)
+                self._blocked[username] = now + LOCKOUT_SECONDS
+                return 0, LOCKOUT_SECONDS
+            return MAX_FAILED_LOGINS - len(failures), 0
+
+    def reset(self, username: str):
+        with self._lock:
+            self._failures.pop(username, None)
+            self._blocked.pop(username, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tracked_ips": len(self._ip_hits),
+                "tracked_users": len(self._failures),
+                "blocked_users": len(self._blocked),
+            }
+
+
+class SQLiteLimiter:
+    # as mesmas janelas num arquivo SQLite separado do banco de usuários, para
+    # os workers de app.serve dividirem os contadores. Cada operação é uma
+    # transação IMMEDIATE: conferir e registrar acontecem sob o mesmo lock
+    blocking = True
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._local = threading.local()
+        self._calls = 0
+        with self._transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS ip_hits (ip TEXT NOT NULL, at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ip_hits ON ip_hits (ip, at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS failures (username TEXT NOT NULL, at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_failures ON failures (username, at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS blocked (username TEXT PRIMARY KEY, until REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # uma conexão por thread do threadpool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # contadores são descartáveis: não vale esperar o fsync
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _purge(self, conn: sqlite3.Connection, now: float):
+        # as janelas de cada chave são aparadas quando ela é usada; chaves que
+        # não voltam saem nesta limpeza periódica
+        self._calls += 1
+        if self._calls % self.PURGE_EVERY:
+            return
+        conn.execute("DELETE FROM ip_hits WHERE at <= ?", (now - IP_LOGIN_WINDOW,))
+        conn.execute("DELETE FROM failures WHERE at <= ?", (now - FAILED_LOGIN_WINDOW,))
+        conn.execute("DELETE FROM blocked WHERE until <= ?", (now,))
+
+    def hit_ip(self, ip: str) -> int:
+        now = self._clock()
+        with self._transaction() as conn:
+            self._purge(conn, now)
+            conn.execute("DELETE FROM ip_hits WHERE ip = ? AND at <= ?", (ip, now - IP_LOGIN_WINDOW))
+            count, oldest = conn.execute("SELECT COUNT(*), MIN(at) FROM ip_hits WHERE ip = ?", (ip,)).fetchone()
+            if count >= IP_LOGIN_LIMIT:
+                return max(1, int(oldest + IP_LOGIN_WINDOW - now) + 1)
+            conn.execute("INSERT INTO ip_hits (ip, at) VALUES (?, ?)", (ip, now))
+            return 0
+
+    def blocked_for(self, username: str) -> int:
+        now = self._clock()
+        row = self._conn().execute("SELECT until FROM blocked WHERE username = ?", (username,)).fetchone()
+        if row is None or row[0] <= now:
+            return 0
+        return max(1, int(row[0] - now))
+
+    def record_failure(self, username: str) -> tuple[int, int]:
+        now = self._clock()
+        with self._transaction() as conn:
+            self._purge(conn, now)
+            conn.execute("DELETE FROM failures WHERE username = ? AND at <= ?", (username, now - FAILED_LOGIN_WINDOW))
+            conn.execute("INSERT INTO failures (username, at) VALUES (?, ?)", (username, now))
+            (count,) = conn.execute("SELECT COUNT(*) FROM failures WHERE username = ?", (username,)).fetchone()
+            if count >= MAX_FAILED_LOGINS:
+                conn.execute("DELETE FROM failures WHERE username = ?", (username,))
+                conn.execute(
+                    "INSERT INTO blocked (username, until) VALUES (?, ?) "
+                    "ON CONFLICT (username) DO UPDATE SET until = excluded.until",
+                    (username, now + LOCKOUT_SECONDS),
+                )
+                return 0, LOCKOUT_SECONDS
+            return MAX_FAILED_LOGINS - count, 0
+
+    def reset(self, username: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM failures WHERE username = ?", (username,))
+            conn.execute("DELETE FROM blocked WHERE username = ?", (username,))
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        return {
+            "tracked_ips": conn.execute("SELECT COUNT(DISTINCT ip) FROM ip_hits").fetchone()[0],
+            "tracked_users": conn.execute("SELECT COUNT(DISTINCT username) FROM failures").fetchone()[0],
+            "blocked_users": conn.execute("SELECT COUNT(*) FROM blocked WHERE until > ?", (self._clock(),)).fetchone()[0],
+        }
+
+
+# conferir e registrar num passo só: com dois round-trips, dois workers viam
+# a mesma contagem e os dois passavam do limite
+_HIT_IP_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')[2]
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('EXPIRE', KEYS[1], window)
+return false
+"""
+
+_RECORD_FAILURE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local max_failures = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[5])
+local count = redis.call('ZCARD', KEYS[1])
+if count >= max_failures then
+    redis.call('DEL', KEYS[1])
+    redis.call('SET', KEYS[2], '1', 'EX', ARGV[4])
+    return 0
+end
+redis.call('EXPIRE', KEYS[1], window)
+return max_failures - count
+"""
+
+
+class RedisLimiter:
+    # mesmas janelas usando sorted sets, cada operação num script Lua (atômico
+    # no servidor); aceita qualquer cliente com a interface do redis-py, como
+    # o fakeredis dos testes
+    blocking = True
+
+    def __init__(self, client, prefix: str = LIMITER_REDIS_PREFIX, clock=time.time):
+        self.client = client
+        self.prefix = prefix
+        self._clock = clock
+        self._hit_ip = client.register_script(_HIT_IP_SCRIPT)
+        self._record_failure = client.register_script(_RECORD_FAILURE_SCRIPT)
+
+    def _key(self, kind: str, value: str) -> str:
+        return f"{self.prefix}:{kind}:{value}"
+
+    @staticmethod
+    def _member(now: float) -> str:
+        # workers diferentes podem bater no mesmo microssegundo
+        return f"{now:.6f}:{uuid.uuid4().hex[:8]}"
+
+    def hit_ip(self, ip: str) -> int:
+        now = self._clock()
+        oldest_at = self._hit_ip(
+            keys=[self._key("ip", ip)],
+            args=[f"{now:.6f}", IP_LOGIN_WINDOW, IP_LOGIN_LIMIT, self._member(now)],
+        )
+        if oldest_at is None:
+            return 0
+        return max(1, int(float(oldest_at) + IP_LOGIN_WINDOW - now) + 1)
+
+    def blocked_for(self, username: str) -> int:
+        ttl = self.client.pttl(self._key("blocked", username))
+        if ttl is None or ttl <= 0:
+            return 0
+        return max(1, int(ttl / 1000))
+
+    def record_failure(self, username: str) -> tuple[int, int]:
+        now = self._clock()
+        attempts_left = int(self._record_failure(
+            keys=[self._key("failures", username), self._key("blocked", username)],
+            args=[f"{now:.6f}", FAILED_LOGIN_WINDOW, MAX_FAILED_LOGINS, LOCKOUT_SECONDS, self._member(now)],
+        ))
+        if attempts_left <= 0:
+            return 0, LOCKOUT_SECONDS
+        return attempts_left, 0
+
+    def reset(self, username: str):
+        self.client.delete(self._key("failures", username), self._key("blocked", username))
+
+    def stats(self) -> dict:
+        return {}
+
+
+def default_sqlite_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "simpleauth-limiter.db")
+
+
+def create_limiter(backend: str = LIMITER_BACKEND):
+    if backend == "memory":
+        return MemoryLimiter()
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("SIMPLEAUTH_LIMITER_BACKEND=redis requires the 'redis' package.") from exc
+        return RedisLimiter(redis.Redis.from_url(LIMITER_REDIS_URL))
+    if backend == "sqlite":
+        return SQLiteLimiter(LIMITER_SQLITE_PATH or default_sqlite_path())
+    raise ValueError(f"Invalid SIMPLEAUTH_LIMITER_BACKEND: {backend}")
+
+
+login_limiter = create_limiter()
+
+
+async def call_limiter(func, *args):
+    # o backend de memória responde no próprio event loop; sqlite e redis fazem I/O
+    if getattr(func.__self__, "blocking", False):
+        return await run_in_threadpool(func, *args)
+    return func(*args)
@@ -1,9 +1,114 @@
+import os
+import time
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# política única de hash: o esquema padrão e o custo vêm do ambiente; hashes
+# em outro esquema ou com outro custo continuam válidos e são refeitos no login
+HASH_SCHEME = os.getenv("SIMPLEAUTH_HASH_SCHEME", "pbkdf2_sha256").lower()
+PBKDF2_ROUNDS = int(os.getenv("SIMPLEAUTH_PBKDF2_ROUNDS", "29000"))
+BCRYPT_ROUNDS = int(os.getenv("SIMPLEAUTH_BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("SIMPLEAUTH_ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("SIMPLEAUTH_ARGON2_MEMORY_COST", "65536")) # KiB
+ARGON2_PARALLELISM = int(os.getenv("SIMPLEAUTH_ARGON2_PARALLELISM", "2"))
+
+SCHEMES = ("argon2", "bcrypt", "pbkdf2_sha256")
+
+if HASH_SCHEME not in SCHEMES:
+    raise ValueError(f"Invalid SIMPLEAUTH_HASH_SCHEME: {HASH_SCHEME}")
+
+
+def build_context(
+    scheme: str = HASH_SCHEME,
+    pbkdf2_rounds: int = PBKDF2_ROUNDS,
+    bcrypt_rounds: int = BCRYPT_ROUNDS,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_memory_cost: int = ARGON2_MEMORY_COST,
+    argon2_parallelism: int = ARGON2_PARALLELISM,
+) -> CryptContext:
+    context = CryptContext(
+        schemes=[scheme] + [name for name in SCHEMES if name != scheme],
+        default=scheme,
+        deprecated="auto",
+        # min e max iguais ao custo configurado: hash com custo diferente,
+        # para mais ou para menos, é refeito no próximo login
+        pbkdf2_sha256__default_rounds=pbkdf2_rounds,
+        pbkdf2_sha256__min_rounds=pbkdf2_rounds,
+        pbkdf2_sha256__max_rounds=pbkdf2_rounds,
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+    has_backend = getattr(context.handler(scheme), "has_backend", None)
+    if has_backend is not None and not has_backend():
+        package = "argon2-cffi" if scheme == "argon2" else scheme
+        raise RuntimeError(f"SIMPLEAUTH_HASH_SCHEME={scheme} requires the '{package}' package.")
+    return context
+
+
+pwd_context = build_context()
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    # o segundo valor é o hash novo quando o atual está fora da política
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _verify_seconds(context: CryptContext, samples: int = 3) -> float:
+    hashed = context.hash("Calibrate123")
+    best = float("inf")
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify("Calibrate123", hashed)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate(scheme: str, target_seconds: float) -> dict:
+    # mede este host e devolve as variáveis de ambiente que chegam mais perto
+    # do tempo de verificação pedido
+    if scheme == "pbkdf2_sha256":
+        rounds = 10000
+        elapsed = _verify_seconds(build_context(scheme, pbkdf2_rounds=rounds))
+        # custo linear nas rodadas: escala pela medição (duas vezes, para absorver o custo fixo)
+        rounds = max(1000, int(rounds * target_seconds / elapsed))
+        elapsed = _verify_seconds(build_context(scheme, pbkdf2_rounds=rounds))
+        rounds = max(1000, int(rounds * target_seconds / elapsed))
+        elapsed = _verify_seconds(build_context(scheme, pbkdf2_rounds=rounds))
+        settings = {"SIMPLEAUTH_PBKDF2_ROUNDS": rounds}
+    elif scheme == "bcrypt":
+        # custo dobra a cada rodada: fica com a maior que não passa do alvo
+        rounds = 4
+        elapsed = _verify_seconds(build_context(scheme, bcrypt_rounds=rounds))
+        while rounds < 31 and elapsed * 2 <= target_seconds:
+            rounds += 1
+            elapsed = _verify_seconds(build_context(scheme, bcrypt_rounds=rounds))
+        settings = {"SIMPLEAUTH_BCRYPT_ROUNDS": rounds}
+    else:
+        # memória fixa pela configuração; ajusta só o número de passadas
+        time_cost = 1
+        elapsed = _verify_seconds(build_context(scheme, argon2_time_cost=time_cost))
+        while elapsed * (time_cost + 1) / time_cost <= target_seconds:
+            time_cost += 1
+            elapsed = _verify_seconds(build_context(scheme, argon2_time_cost=time_cost))
+        settings = {
+            "SIMPLEAUTH_ARGON2_TIME_COST": time_cost,
+            "SIMPLEAUTH_ARGON2_MEMORY_COST": ARGON2_MEMORY_COST,
+            "SIMPLEAUTH_ARGON2_PARALLELISM": ARGON2_PARALLELISM,
+        }
+
+    return {
+        "SIMPLEAUTH_HASH_SCHEME": scheme,
+        **settings,
+        "verify_ms": round(elapsed * 1000, 2),
+    }
@@ -0,0 +1,66 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TOKEN_CACHE_SIZE = int(os.getenv("SIMPLEAUTH_TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_MAX_TOKEN_LENGTH = int(os.getenv("SIMPLEAUTH_TOKEN_CACHE_MAX_TOKEN_LENGTH", "2048"))
+
+
+class TokenCache:
+    # guarda as claims já verificadas até o exp do token; a chave é o sha256
+    # do token para não manter o token inteiro na memória
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, max_token_length: int = TOKEN_CACHE_MAX_TOKEN_LENGTH):
+        self.maxsize = maxsize
+        self.max_token_length = max_token_length
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        if self.maxsize <= 0 or len(token) > self.max_token_length:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, token: str, claims: dict):
+        if self.maxsize <= 0 or len(token) > self.max_token_length:
+            return
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(claims), float(expires_at))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache()
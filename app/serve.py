@@ -0,0 +1,163 @@
+# launcher com vários workers:
+#
+#     python -m app.serve --workers 4 --port 8000
+#
+# migra o banco uma vez, abre o socket e roda um servidor uvicorn por processo
+# worker. No SIGTERM cada worker drena: /health/ready passa a responder 503 por
+# SIMPLEAUTH_DRAIN_SECONDS, o socket fecha, as requisições em andamento têm
+# SIMPLEAUTH_SHUTDOWN_TIMEOUT segundos e o shutdown do app esvazia os pools de
+# hash e de banco. Worker que morre é substituído. Com mais de um worker o
+# limiter de login usa por padrão um arquivo SQLite compartilhado entre eles
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+import uvicorn
+from uvicorn.config import STARTUP_FAILURE
+
+from app.lifecycle import DRAIN_SECONDS, SHUTDOWN_TIMEOUT
+
+logger = logging.getLogger("uvicorn.error")
+
+_spawn = multiprocessing.get_context("spawn")
+
+
+class DrainingServer(uvicorn.Server):
+    def handle_exit(self, sig, frame):
+        from app.lifecycle import lifecycle
+
+        # SIGINT (Ctrl+C) e um segundo SIGTERM encerram sem esperar
+        if sig != signal.SIGTERM or DRAIN_SECONDS <= 0 or not lifecycle.start_draining():
+            return super().handle_exit(sig, frame)
+        logger.info("Draining for %s seconds before shutdown [%s]", DRAIN_SECONDS, os.getpid())
+        timer = threading.Timer(DRAIN_SECONDS, super().handle_exit, (sig, frame))
+        timer.daemon = True
+        timer.start()
+
+
+def _run_worker(config: uvicorn.Config, sockets):
+    config.configure_logging()
+    server = DrainingServer(config)
+    server.run(sockets=sockets)
+    if not server.started:
+        sys.exit(STARTUP_FAILURE)
+
+
+class Supervisor:
+    def __init__(self, config: uvicorn.Config, sockets, workers: int):
+        self.config = config
+        self.sockets = sockets
+        self.workers = workers
+        self.processes = []
+        self._stop = threading.Event()
+
+    def _spawn_worker(self):
+        process = _spawn.Process(target=_run_worker, kwargs={"config": self.config, "sockets": self.sockets})
+        process.start()
+        logger.info("Started worker [%s]", process.pid)
+        return process
+
+    def run(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self._stop.set())
+
+        self.processes = [self._spawn_worker() for _ in range(self.workers)]
+        while not self._stop.wait(0.5):
+            for i, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                if process.exitcode == STARTUP_FAILURE:
+                    # o app não sobe; reiniciar só repetiria o erro
+                    logger.error("Worker [%s] failed to start, stopping.", process.pid)
+                    self._stop.set()
+                    break
+                logger.warning("Worker [%s] exited with %s, restarting.", process.pid, process.exitcode)
+                self.processes[i] = self._spawn_worker()
+
+        for process in self.processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + DRAIN_SECONDS + SHUTDOWN_TIMEOUT + 5
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error("Worker [%s] did not stop in time, killing it.", process.pid)
+                process.kill()
+                process.join()
+        return 0 if all(process.exitcode in (0, -signal.SIGTERM) for process in self.processes) else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--uds", help="Listen on a Unix socket instead of host/port.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1.")
+
+    # cada worker tem o próprio pool de hashing; sem isso N workers abririam
+    # N x núcleos processos disputando a CPU
+    os.environ.setdefault("SIMPLEAUTH_HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // args.workers)))
+    # o limiter em memória conta por processo: com N workers, N vezes mais
+    # tentativas de senha. Sem backend escolhido, os workers dividem um
+    # arquivo SQLite (em /dev/shm quando existe); memory pedido explicitamente
+    # só vale com um worker
+    limiter_dir = None
+    limiter_backend = os.getenv("SIMPLEAUTH_LIMITER_BACKEND", "").lower()
+    if args.workers > 1 and limiter_backend == "memory":
+        parser.error("SIMPLEAUTH_LIMITER_BACKEND=memory keeps separate counters per worker; "
+                     "use sqlite or redis with --workers > 1.")
+    if args.workers > 1 and not limiter_backend:
+        os.environ["SIMPLEAUTH_LIMITER_BACKEND"] = "sqlite"
+        if not os.getenv("SIMPLEAUTH_LIMITER_SQLITE_PATH"):
+            shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+            limiter_dir = tempfile.mkdtemp(prefix="simpleauth-limiter-", dir=shm)
+            os.environ["SIMPLEAUTH_LIMITER_SQLITE_PATH"] = os.path.join(limiter_dir, "limiter.db")
+
+    invalidation_dir = None
+    if not os.getenv("SIMPLEAUTH_INVALIDATION_DIR"):
+        invalidation_dir = tempfile.mkdtemp(prefix="simpleauth-invalidation-")
+        os.environ["SIMPLEAUTH_INVALIDATION_DIR"] = invalidation_dir
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        uds=args.uds,
+        workers=args.workers,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT,
+    )
+    # migrações e seed do admin rodam uma vez aqui, antes dos workers, em vez
+    # de N processos disputando o mesmo schema na subida
+    from app.services.user_service import repository
+
+    repository.init()
+    repository.close()
+
+    sock = config.bind_socket()
+    try:
+        return Supervisor(config, [sock], args.workers).run()
+    finally:
+        sock.close()
+        if args.uds and os.path.exists(args.uds):
+            os.remove(args.uds)
+        for directory in (invalidation_dir, limiter_dir):
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
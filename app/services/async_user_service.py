@@ -0,0 +1,142 @@
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+from app.security.hashing import HashingBusyError, hashing_service
+from app.services import user_service, user_transfer
+from app.services.user_service import session_cache, session_epoch, username_filter
+from app.storage.async_db import run_db
+
+
+async def create_user(username: str, password: str):
+    return await run_db(user_service.create_user, username, password)
+
+
+async def find_user_by_username(username: str):
+    return await run_db(user_service.find_user_by_username, username)
+
+
+async def username_exists(username: str) -> bool:
+    return await run_db(user_service.username_exists, username)
+
+
+async def username_might_exist(username: str) -> bool:
+    # com o filtro em dia a resposta sai do event loop, sem ir ao banco
+    if not username_filter.poll_due():
+        return username_filter.might_exist(username)
+    return await run_db(user_service.username_might_exist, username)
+
+
+async def get_session_state(username: str) -> tuple[int, int] | None:
+    # cache quente responde direto no event loop, sem trocar de thread
+    if not session_cache.poll_due():
+        cached = session_cache.get(username)
+        if cached is not None:
+            return cached
+    return await run_db(user_service.get_session_state, username)
+
+
+async def get_session_states(usernames: list[str]) -> dict[str, tuple[int, int]]:
+    if not session_cache.poll_due():
+        states = {}
+        for username in usernames:
+            cached = session_cache.get(username)
+            if cached is None:
+                break
+            states[username] = cached
+        else:
+            return states
+    return await run_db(user_service.get_session_states, usernames)
+
+
+async def current_session_epoch() -> int:
+    # entre um polling e outro a época sai da memória, sem trocar de thread
+    if not session_epoch.poll_due():
+        return session_epoch.value
+    return await run_db(session_epoch.sync)
+
+
+async def bump_session_epoch() -> int:
+    return await run_db(user_service.bump_session_epoch)
+
+
+async def login_attempt(
+    username: str,
+    new_hash: str | None = None,
+    refresh_token_hash: str | None = None,
+) -> user_service.LoginResult:
+    return await run_db(user_service.login_attempt, username, new_hash, refresh_token_hash)
+
+
+async def refresh_session(token_hash: str, new_token_hash: str) -> user_service.RefreshResult:
+    return await run_db(user_service.refresh_session, token_hash, new_token_hash)
+
+
+async def activate_session(username: str) -> int | None:
+    return await run_db(user_service.activate_session, username)
+
+
+async def deactivate_session(username: str) -> bool:
+    return await run_db(user_service.deactivate_session, username)
+
+
+async def update_username(current_username: str, new_username: str) -> bool:
+    return await run_db(user_service.update_username, current_username, new_username)
+
+
+async def update_roles(username: str, roles: list[str]) -> bool:
+    return await run_db(user_service.update_roles, username, roles)
+
+
+async def update_password(username: str, new_password: str) -> bool:
+    return await run_db(user_service.update_password, username, new_password)
+
+
+async def delete_user_by_username(username: str) -> bool:
+    return await run_db(user_service.delete_user_by_username, username)
+
+
+async def list_usernames() -> list[str]:
+    return await run_db(user_service.list_usernames)
+
+
+async def list_usernames_page(after: str | None, limit: int, prefix: str | None) -> tuple[list[str], str | None]:
+    return await run_db(user_service.list_usernames_page, after, limit, prefix)
+
+
+async def _hash_import_row(report: "user_transfer.ImportReport", limit: asyncio.Semaphore, row: tuple):
+    line_no, username, password_hash, password = row
+    if password is None:
+        return line_no, username, password_hash
+    if report.plaintext >= user_transfer.IMPORT_MAX_PLAINTEXT:
+        report.add_error(line_no, username, "Too many plaintext passwords in one import; send password_hash instead.")
+        return None
+    report.plaintext += 1
+    async with limit:
+        try:
+            return line_no, username, await hashing_service.hash(password)
+        except HashingBusyError:
+            report.add_error(line_no, username, "Password hashing is busy; retry this row later.")
+            return None
+
+
+async def import_batch(report: "user_transfer.ImportReport", batch: list):
+    # validação numa thread, hash das senhas em texto pelo hashing_service (o
+    # mesmo pool e o mesmo limite de fila do /register) e só a gravação na
+    # thread do banco
+    rows = await run_in_threadpool(user_transfer.validate_batch, report, batch)
+    limit = asyncio.Semaphore(max(hashing_service.workers, 1))
+    hashed = await asyncio.gather(*(_hash_import_row(report, limit, row) for row in rows))
+    return await run_db(user_transfer.store_batch, report, [row for row in hashed if row is not None])
+
+
+async def export_chunk(fmt: str, after_id: int, limit: int) -> tuple[str, int | None]:
+    rows = await run_db(user_service.fetch_export_batch, after_id, limit)
+    if not rows:
+        return "", None
+    return user_transfer.format_export_rows(rows, fmt), rows[-1]["user_id"]
+
+
+async def check_database():
+    # usado pelo /health/ready; levanta exceção se o banco não responde
+    await run_db(user_service.read_sessions_generation)
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from app.storage.async_db import run_db
+from app.storage.audit_store import AuditStore
+from app.storage.db import PoolTimeoutError
+
+AUDIT_ENABLED = os.getenv("SIMPLEAUTH_AUDIT_ENABLED", "1") == "1"
+AUDIT_BUFFER_SIZE = int(os.getenv("SIMPLEAUTH_AUDIT_BUFFER_SIZE", "10000"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("SIMPLEAUTH_AUDIT_FLUSH_INTERVAL", "1"))
+AUDIT_BATCH_SIZE = int(os.getenv("SIMPLEAUTH_AUDIT_BATCH_SIZE", "500"))
+
+REGISTER = "register"
+LOGIN = "login"
+LOGOUT = "logout"
+REFRESH = "refresh"
+CHANGE_USERNAME = "change_username"
+CHANGE_PASSWORD = "change_password"
+DELETE_USER = "delete_user"
+IMPORT_USERS = "import_users"
+REVOKE_SESSIONS = "revoke_sessions"
+SET_ROLES = "set_roles"
+
+SUCCESS = "success"
+
+
+class AuditLog:
+    # record() só empilha o evento num buffer circular em memória e volta; uma
+    # thread grava os eventos em lote no banco de audit. Com o buffer cheio o
+    # evento mais antigo ainda não gravado é descartado e contado em "dropped":
+    # a requisição nunca espera pelo disco.
+    def __init__(
+        self,
+        store: AuditStore,
+        enabled: bool = AUDIT_ENABLED,
+        buffer_size: int = AUDIT_BUFFER_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+        batch_size: int = AUDIT_BATCH_SIZE,
+    ):
+        self.store = store
+        self.enabled = enabled and buffer_size > 0
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.lost = 0 # eventos de lotes que o banco recusou
+        self.flushes = 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self.store.open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="simpleauth-audit", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        # grava o que ainda está no buffer antes de sair
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self.store.close()
+
+    def record(
+        self,
+        event: str,
+        outcome: str = SUCCESS,
+        username: str | None = None,
+        actor: str | None = None,
+        ip: str | None = None,
+        detail: str | None = None,
+    ):
+        if not self.enabled:
+            return
+        entry = (time.time(), event, outcome, username, actor, ip, detail)
+        with self._lock:
+            if len(self._buffer) >= self.buffer_size:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(entry)
+            self.recorded += 1
+            pending = len(self._buffer)
+        # lote cheio não espera o intervalo: o flusher acorda na hora
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def _take_batch(self) -> list:
+        with self._lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def flush(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                self.store.insert(batch)
+            except (sqlite3.Error, PoolTimeoutError):
+                self.lost += len(batch)
+                return # o resto fica no buffer para o próximo ciclo
+            self.written += len(batch)
+            self.flushes += 1
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def query_page(self, cursor: str | None = None, limit: int = 100, **filters) -> tuple[list, str | None]:
+        # cursor "<created_at>:<id>" do último evento da página anterior;
+        # levanta ValueError se vier malformado
+        before = _decode_cursor(cursor) if cursor else None
+        self.store.open()
+        rows = self.store.query(before=before, limit=limit + 1, **filters)
+        events = rows[:limit]
+        next_cursor = f"{events[-1]['created_at']!r}:{events[-1]['id']}" if len(rows) > limit else None
+        return events, next_cursor
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "enabled": int(self.enabled),
+            "buffered": buffered,
+            "capacity": self.buffer_size,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "lost": self.lost,
+            "flushes": self.flushes,
+        }
+
+
+def _decode_cursor(cursor: str) -> tuple[float, int]:
+    created_at, _, event_id = cursor.partition(":")
+    return float(created_at), int(event_id)
+
+
+audit_log = AuditLog(AuditStore())
+
+
+async def query_audit_events(cursor: str | None, limit: int, **filters) -> tuple[list, str | None]:
+    return await run_db(audit_log.query_page, cursor, limit, **filters)
@@ -0,0 +1,127 @@
+import json
+import os
+import socket
+import threading
+from pathlib import Path
+
+# diretório compartilhado pelos workers de uma mesma máquina; vazio desliga o canal
+INVALIDATION_DIR = os.getenv("SIMPLEAUTH_INVALIDATION_DIR", "")
+# acima disso a mensagem não é enviada e os outros workers ficam com o polling
+MAX_MESSAGE_BYTES = int(os.getenv("SIMPLEAUTH_INVALIDATION_MAX_MESSAGE_BYTES", "60000"))
+
+SESSIONS_CHANGED = "sessions"
+USERS_CHANGED = "users"
+EPOCH_CHANGED = "epoch"
+
+
+class InvalidationChannel:
+    # cada worker escuta num socket Unix de datagrama (<dir>/<pid>.sock) e,
+    # a cada escrita, avisa os outros com a geração nova e os usernames
+    # afetados. É só um atalho: o contador de geração no banco continua sendo
+    # a referência, então mensagem perdida custa no máximo um intervalo de polling.
+    def __init__(self, handle, directory: str = INVALIDATION_DIR, max_message_bytes: int = MAX_MESSAGE_BYTES):
+        self._handle = handle
+        self.directory = Path(directory) if directory else None
+        self.max_message_bytes = max_message_bytes
+        self._path = None
+        self._recv_sock = None
+        self._send_sock = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self.oversized = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path = self.directory / f"{os.getpid()}.sock"
+        if self._path.exists():
+            self._path.unlink() # sobra de um processo antigo com o mesmo pid
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self._path))
+        sock.settimeout(0.5)
+        self._recv_sock = sock
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._receive_loop, name="simpleauth-invalidation", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._recv_sock.close()
+        self._recv_sock = None
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _receive_loop(self):
+        while not self._stop.is_set():
+            try:
+                data = self._recv_sock.recv(self.max_message_bytes + 1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            self.received += 1
+            try:
+                self._handle(message)
+            except Exception:
+                pass # o polling corrige o que esta mensagem não aplicou
+
+    def _peers(self) -> list[Path]:
+        try:
+            return [path for path in self.directory.glob("*.sock") if path != self._path]
+        except OSError:
+            return []
+
+    def publish(self, kind: str, generation: int, **payload):
+        # funciona também sem start(): a CLI avisa os workers sem escutar nada
+        if not self.enabled:
+            return
+        data = json.dumps({"kind": kind, "generation": generation, **payload}, separators=(",", ":")).encode()
+        if len(data) > self.max_message_bytes:
+            self.oversized += 1
+            return
+        with self._lock:
+            if self._send_sock is None:
+                self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._send_sock.setblocking(False) # fila cheia num worker lento não trava a escrita
+            for path in self._peers():
+                try:
+                    self._send_sock.sendto(data, str(path))
+                    self.sent += 1
+                except ConnectionRefusedError:
+                    # ninguém escuta mais: worker que morreu sem limpar o socket
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                except (BlockingIOError, FileNotFoundError, OSError):
+                    self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": int(self.enabled),
+            "listening": int(self._thread is not None),
+            "peers": len(self._peers()) if self.enabled else 0,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "oversized": self.oversized,
+        }
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_CACHE_SIZE = int(os.getenv("SIMPLEAUTH_SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.getenv("SIMPLEAUTH_SESSION_CACHE_TTL", "30"))
+SESSION_CACHE_POLL_INTERVAL = float(os.getenv("SIMPLEAUTH_SESSION_CACHE_POLL_INTERVAL", "0.5"))
+
+
+class SessionCache:
+    # username -> (session_active, session_version), com LRU + TTL.
+    # Escritas locais invalidam na hora; escritas de outros workers são
+    # percebidas pelo contador "sessions" da tabela generations.
+    def __init__(
+        self,
+        read_generation,
+        maxsize: int = SESSION_CACHE_SIZE,
+        ttl: float = SESSION_CACHE_TTL,
+        poll_interval: float = SESSION_CACHE_POLL_INTERVAL,
+    ):
+        self._read_generation = read_generation
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0.0
+        self._epoch = 0 # muda a cada invalidação local, protege put() de leituras antigas
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def poll_due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.poll_interval
+
+    def _sync_generation(self):
+        if not self.poll_due():
+            return
+        now = time.monotonic()
+        generation = self._read_generation()
+        with self._lock:
+            self._checked_at = now
+            if generation != self._generation:
+                self._entries.clear()
+                self._epoch += 1
+                self._generation = generation
+
+    def get(self, username: str):
+        if not self.enabled:
+            return None
+        self._sync_generation()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[0]
+
+    def snapshot(self) -> int:
+        return self._epoch
+
+    def put(self, username: str, state: tuple[int, int], snapshot: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            if snapshot != self._epoch:
+                return
+            self._entries[username] = (state, time.monotonic() + self.ttl)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *usernames: str, generation: int | None = None):
+        with self._lock:
+            for username in usernames:
+                self._entries.pop(username, None)
+            self._epoch += 1
+            # se ninguém mais escreveu desde o último valor visto, não precisa limpar tudo
+            if generation is not None and self._generation is not None and generation == self._generation + 1:
+                self._generation = generation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+            self._generation = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+
+SESSION_EPOCH_POLL_INTERVAL = float(os.getenv("SIMPLEAUTH_SESSION_EPOCH_POLL_INTERVAL", "0.5"))
+
+
+class SessionEpoch:
+    # cópia em memória da época global de sessões. Tokens carregam a época em
+    # que a sessão foi aberta; qualquer um abaixo do valor atual foi revogado
+    # em massa. A checagem é uma comparação de inteiros: o banco só é lido a
+    # cada poll_interval, e bumps deste worker ou avisados pelo canal de
+    # invalidação já entram na hora por observe().
+    def __init__(self, read_epoch, poll_interval: float = SESSION_EPOCH_POLL_INTERVAL):
+        self._read_epoch = read_epoch
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._value = 0
+        self._checked_at = None
+        self.polls = 0
+        self.bumps_seen = 0
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def poll_due(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.poll_interval
+
+    def sync(self) -> int:
+        if self.poll_due():
+            now = time.monotonic()
+            epoch = self._read_epoch()
+            self.polls += 1
+            self.observe(epoch)
+            self._checked_at = now
+        return self._value
+
+    def observe(self, epoch: int):
+        # só anda para frente: uma leitura atrasada não desfaz um bump já visto
+        with self._lock:
+            if epoch > self._value:
+                if self._checked_at is not None:
+                    self.bumps_seen += 1
+                self._value = epoch
+
+    def stats(self) -> dict:
+        return {"epoch": self._value, "polls": self.polls, "bumps_seen": self.bumps_seen}
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+SESSION_SWEEP_INTERVAL = float(os.getenv("SIMPLEAUTH_SESSION_SWEEP_INTERVAL", "60"))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SIMPLEAUTH_SESSION_SWEEP_BATCH_SIZE", "500"))
+
+
+class SessionSweeper:
+    # desativa as sessões vencidas em lotes pequenos, cada um na sua
+    # transação, para o lock de escrita nunca ficar preso numa varredura longa.
+    # O login já trata sessão vencida como encerrada; o sweeper só limpa as
+    # linhas e invalida os tokens que ainda estavam circulando.
+    def __init__(self, expire_sessions, interval: float = SESSION_SWEEP_INTERVAL, batch_size: int = SESSION_SWEEP_BATCH_SIZE):
+        self._expire_sessions = expire_sessions
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self._thread = None
+        self._stop = threading.Event()
+        self.runs = 0
+        self.expired = 0
+        self.errors = 0
+        self.last_run_seconds = 0.0
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="simpleauth-session-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def sweep(self) -> int:
+        # repete enquanto os lotes vierem cheios; devolve quantas sessões expirou
+        started = time.perf_counter()
+        total = 0
+        while not self._stop.is_set():
+            usernames = self._expire_sessions(self.batch_size)
+            total += len(usernames)
+            if len(usernames) < self.batch_size:
+                break
+        self.runs += 1
+        self.expired += total
+        self.last_run_seconds = round(time.perf_counter() - started, 4)
+        return total
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                self.errors += 1 # banco indisponível agora; o próximo ciclo tenta de novo
+
+    def stats(self) -> dict:
+        return {
+            "running": int(self._thread is not None),
+            "runs": self.runs,
+            "expired": self.expired,
+            "errors": self.errors,
+            "last_run_seconds": self.last_run_seconds,
+        }
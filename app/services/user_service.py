@@ -1,11 +1,98 @@
-from datetime import datetime, timedelta
-
-from app.storage.db import get_conn
+import secrets
+import time
+
+from app.metrics import instrument_db
+from app.services.invalidation import EPOCH_CHANGED, SESSIONS_CHANGED, USERS_CHANGED, InvalidationChannel
+from app.services.session_cache import SessionCache
+from app.services.session_epoch import SessionEpoch
+from app.services.session_sweeper import SessionSweeper
+from app.services.username_filter import UsernameFilter
+from app.storage.generations import SESSIONS, USERS
+from app.storage.repository import (
+    LOGIN_ACTIVE_SESSION,
+    LOGIN_BLOCKED,
+    LOGIN_FAILED,
+    LOGIN_LOCKED_OUT,
+    LOGIN_NOT_FOUND,
+    LOGIN_RATE_LIMITED,
+    LOGIN_SUCCESS,
+    REFRESH_INVALID,
+    REFRESH_REUSED,
+    REFRESH_SUCCESS,
+    ROLE_ADMIN,
+    ROLES,
+    LoginResult,
+    RefreshResult,
+    create_repository,
+    format_roles,
+)
 
 USERNAME_ERROR_MSG = "Username must be all lowercase. Try again."
 PASSWORD_MIN_LEN_ERROR_MSG = "Password must be at least 8 characters long."
 PASSWORD_UPPERCASE_START_ERROR_MSG = "Password must start with an uppercase letter."
 PASSWORD_NUMBER_ERROR_MSG = "Password must contain at least one number."
+ROLE_ERROR_MSG = f"Unknown role. Valid roles: {', '.join(ROLES)}."
+
+# backend escolhido por SIMPLEAUTH_STORAGE_BACKEND; o SQL mora nele e aqui
+# ficam validação, caches e o filtro de usernames
+repository = create_repository()
+
+
+@instrument_db
+def read_sessions_generation() -> int:
+    return repository.read_generation(SESSIONS)
+
+
+session_cache = SessionCache(read_sessions_generation)
+
+
+@instrument_db
+def read_users_generation() -> int:
+    return repository.read_generation(USERS)
+
+
+@instrument_db
+def scan_usernames(consume) -> int:
+    # geração e nomes lidos no mesmo snapshot; consume(total, usernames)
+    return repository.scan_usernames(consume)
+
+
+username_filter = UsernameFilter(scan_usernames, read_users_generation)
+
+
+@instrument_db
+def read_session_epoch() -> int:
+    return repository.read_session_epoch()
+
+
+session_epoch = SessionEpoch(read_session_epoch)
+
+
+def _apply_invalidation(message: dict):
+    # escrita feita por outro worker: mesma invalidação que ele fez localmente
+    if message["kind"] == SESSIONS_CHANGED:
+        session_cache.invalidate(*message["usernames"], generation=message["generation"])
+    elif message["kind"] == USERS_CHANGED:
+        username_filter.add(*message["added"], generation=message["generation"])
+        if message["removed"]:
+            username_filter.discard(*message["removed"])
+    elif message["kind"] == EPOCH_CHANGED:
+        session_epoch.observe(message["generation"])
+
+
+invalidation = InvalidationChannel(_apply_invalidation)
+
+
+def _sessions_changed(generation: int, *usernames: str):
+    session_cache.invalidate(*usernames, generation=generation)
+    invalidation.publish(SESSIONS_CHANGED, generation, usernames=usernames)
+
+
+def _users_changed(generation: int | None, added: tuple = (), removed: tuple = ()):
+    username_filter.add(*added, generation=generation)
+    if removed:
+        username_filter.discard(*removed)
+    invalidation.publish(USERS_CHANGED, generation, added=added, removed=removed)
 
 
 def ensure_username(username: str) -> str:
@@ -24,6 +111,12 @@ def ensure_password(password: str) -> str:
     return password
 
 
+def ensure_roles(roles) -> str:
+    if any(role not in ROLES for role in roles):
+        raise ValueError(ROLE_ERROR_MSG)
+    return format_roles(roles)
+
+
 def validate_username(username):
     try:
         ensure_username(username)
@@ -39,31 +132,40 @@ def validate_pass(password):
     except ValueError as exc:
         return False, str(exc)
 
+@instrument_db
 def create_user(username: str, password: str):
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, password, session_active, attempts, blocked_until) VALUES (?, ?, ?, ?, ?)",
-            (username, password, 0, 3, None)
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    generation = repository.create_user(username, password)
+    _users_changed(generation, added=(username,))
+
+@instrument_db
+def insert_users_batch(users: list[tuple[str, str]]) -> set[str]:
+    # insere tudo numa transação só; devolve os usernames que já existiam
+    if not users:
+        return set()
+    existing, generation = repository.insert_users_batch(users)
+    _users_changed(generation, added=tuple(username for username, _ in users if username not in existing))
+    return existing
 
+
+@instrument_db
+def fetch_export_batch(after_id: int, limit: int) -> list:
+    return repository.fetch_export_batch(after_id, limit)
+
+
+@instrument_db
 def find_user_by_username(username: str):
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-        return cursor.fetchone()
-    finally:
-        conn.close()
+    return repository.find_user(username)
 
 def username_exists(username: str) -> bool:
     return find_user_by_username(username) is not None
 
 
+def username_might_exist(username: str) -> bool:
+    # False só quando o filtro está em dia e o nome com certeza não existe
+    username_filter.sync()
+    return username_filter.might_exist(username)
+
+
 def get_session_version_by_username(username: str) -> int | None:
     user = find_user_by_username(username)
     if user is None:
@@ -71,139 +173,172 @@ def get_session_version_by_username(username: str) -> int | None:
     return int(user["session_version"])
 
 
-def activate_session(username: str) -> int | None:
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            UPDATE users
-            SET session_active = 1, session_version = session_version + 1
-            WHERE username = ? AND session_active = 0
-            """,
-            (username,),
-        )
-        if cursor.rowcount == 0:
-            conn.commit()
-            return None
-
-        cursor.execute("SELECT session_version FROM users WHERE username = ?", (username,))
-        row = cursor.fetchone()
-        conn.commit()
-        if row is None:
-            return None
-        return int(row["session_version"])
-    finally:
-        conn.close()
+def get_session_state(username: str) -> tuple[int, int] | None:
+    cached = session_cache.get(username)
+    if cached is not None:
+        return cached
 
+    snapshot = session_cache.snapshot()
+    state = _load_session_state(username)
+    if state is not None:
+        session_cache.put(username, state, snapshot)
+    return state
 
-def deactivate_session(username: str) -> bool:
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            UPDATE users
-            SET session_active = 0, session_version = session_version + 1
-            WHERE username = ? AND session_active = 1
-            """,
-            (username,),
-        )
-        conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        conn.close()
-
-
-def reset_login_state(username: str):
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE users SET attempts = ?, blocked_until = ? WHERE username = ?",
-            (3, None, username),
-        )
-        conn.commit()
-    finally:
-        conn.close()
-
-
-def register_failed_login(username: str) -> tuple[int, bool]:
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT attempts FROM users WHERE username = ?", (username,))
-        row = cursor.fetchone()
-        if row is None:
-            return 0, False
-
-        attempts_left = row["attempts"] - 1
-        blocked = attempts_left <= 0
-
-        if blocked:
-            blocked_until = (datetime.now() + timedelta(minutes=3)).isoformat()
-            cursor.execute(
-                "UPDATE users SET attempts = ?, blocked_until = ? WHERE username = ?",
-                (0, blocked_until, username),
-            )
-            conn.commit()
-            return 0, True
-
-        cursor.execute(
-            "UPDATE users SET attempts = ? WHERE username = ?",
-            (attempts_left, username),
-        )
-        conn.commit()
-        return attempts_left, False
-    finally:
-        conn.close()
 
+@instrument_db
+def _load_session_state(username: str) -> tuple[int, int] | None:
+    return repository.load_session_state(username)
 
-def update_username(current_username: str, new_username: str) -> bool:
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE users SET username = ? WHERE username = ?",
-            (new_username, current_username),
-        )
-        conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        conn.close()
 
+def get_session_states(usernames: list[str]) -> dict[str, tuple[int, int]]:
+    # versão em lote do get_session_state: o que faltar no cache sai de uma consulta só
+    states = {}
+    missing = []
+    for username in dict.fromkeys(usernames):
+        cached = session_cache.get(username)
+        if cached is not None:
+            states[username] = cached
+        else:
+            missing.append(username)
+    if not missing:
+        return states
 
-def update_password(username: str, new_password: str) -> bool:
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE users SET password = ? WHERE username = ?",
-            (new_password, username),
-        )
-        conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        conn.close()
+    snapshot = session_cache.snapshot()
+    loaded = _load_session_states(missing)
+    for username, state in loaded.items():
+        session_cache.put(username, state, snapshot)
+    states.update(loaded)
+    return states
 
 
-def delete_user_by_username(username: str) -> bool:
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM users WHERE username = ?", (username,))
-        conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        conn.close()
+@instrument_db
+def _load_session_states(usernames: list[str]) -> dict[str, tuple[int, int]]:
+    return repository.load_session_states(usernames)
+
+
+@instrument_db
+def activate_session(username: str) -> int | None:
+    session_version, generation = repository.activate_session(username)
+    if generation is not None:
+        _sessions_changed(generation, username)
+    return session_version
 
 
+@instrument_db
+def deactivate_session(username: str) -> bool:
+    generation = repository.deactivate_session(username)
+    if generation is None:
+        return False
+    _sessions_changed(generation, username)
+    return True
+
+
+@instrument_db
+def refresh_session(token_hash: str, new_token_hash: str) -> RefreshResult:
+    result, generation = repository.refresh_session(token_hash, new_token_hash)
+    if generation is not None:
+        _sessions_changed(generation, result.username)
+    if result.status == REFRESH_SUCCESS:
+        session_epoch.observe(result.session_epoch)
+    return result
+
+
+@instrument_db
+def login_attempt(
+    username: str,
+    new_hash: str | None = None,
+    refresh_token_hash: str | None = None,
+) -> LoginResult:
+    # senha já verificada por quem chama (as falhas ficam com o limiter); o
+    # repositório confere sessão e bloqueio legado de novo numa transação só
+    result, generation = repository.login_attempt(username, new_hash, refresh_token_hash, secrets.token_hex(8))
+    if generation is not None:
+        _sessions_changed(generation, username)
+    if result.status == LOGIN_SUCCESS:
+        session_epoch.observe(result.session_epoch)
+    return result
+
+
+@instrument_db
+def expire_sessions(limit: int) -> list[str]:
+    usernames, generation = repository.expire_sessions(int(time.time()), limit)
+    if generation is not None:
+        _sessions_changed(generation, *usernames)
+    return usernames
+
+
+session_sweeper = SessionSweeper(expire_sessions)
+
+
+@instrument_db
+def bump_session_epoch() -> int:
+    # revoga todas as sessões: o cache de sessões não precisa mudar, quem
+    # barra os tokens antigos é a comparação com a época nova
+    epoch = repository.bump_session_epoch()
+    session_epoch.observe(epoch)
+    invalidation.publish(EPOCH_CHANGED, epoch)
+    return epoch
+
+
+@instrument_db
+def update_username(current_username: str, new_username: str) -> bool:
+    generations = repository.update_username(current_username, new_username)
+    if generations is None:
+        return False
+    generation, users_generation = generations
+    _sessions_changed(generation, current_username, new_username)
+    _users_changed(users_generation, added=(new_username,), removed=(current_username,))
+    return True
+
+
+@instrument_db
+def update_roles(username: str, roles) -> bool:
+    # levanta ValueError para papel desconhecido
+    generation = repository.update_roles(username, ensure_roles(roles))
+    if generation is None:
+        return False
+    _sessions_changed(generation, username)
+    return True
+
+
+@instrument_db
+def update_password(username: str, new_password: str) -> bool:
+    return repository.update_password(username, new_password)
+
+
+@instrument_db
+def delete_user_by_username(username: str) -> bool:
+    generation = repository.delete_user(username)
+    if generation is None:
+        return False
+    _sessions_changed(generation, username)
+    # delete não mexe na geração "users": o nome só vira falso positivo
+    _users_changed(None, removed=(username,))
+    return True
+
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    # menor string maior que todas as que começam com o prefixo; assim o filtro
+    # vira um intervalo e usa o índice de username (LIKE não usaria)
+    # U+D800..U+DFFF (surrogates) não existe em UTF-8: depois de U+D7FF vem U+E000
+    for i in range(len(prefix) - 1, -1, -1):
+        code = ord(prefix[i])
+        if code < 0x10FFFF:
+            return prefix[:i] + chr(0xE000 if 0xD7FF <= code < 0xE000 else code + 1)
+    return None
+
+
+@instrument_db
+def list_usernames_page(after: str | None = None, limit: int = 100, prefix: str | None = None) -> tuple[list[str], str | None]:
+    lower = prefix or None
+    upper = _prefix_upper_bound(prefix) if prefix else None
+    rows = repository.list_usernames_range(after, lower, upper, limit + 1)
+
+    usernames = rows[:limit]
+    next_cursor = usernames[-1] if len(rows) > limit else None
+    return usernames, next_cursor
+
+
+@instrument_db
 def list_usernames() -> list[str]:
-    conn = get_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT username FROM users ORDER BY username ASC")
-        rows = cursor.fetchall()
-        return [row["username"] for row in rows]
-    finally:
-        conn.close()
+    return repository.list_usernames()
@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+import os
+
+from app.security.password import hash_password, pwd_context
+from app.services.user_service import (
+    ensure_password,
+    ensure_username,
+    fetch_export_batch,
+    insert_users_batch,
+)
+
+IMPORT_BATCH_SIZE = int(os.getenv("SIMPLEAUTH_IMPORT_BATCH_SIZE", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("SIMPLEAUTH_EXPORT_BATCH_SIZE", "1000"))
+MAX_REPORTED_ERRORS = int(os.getenv("SIMPLEAUTH_IMPORT_MAX_REPORTED_ERRORS", "1000"))
+# senhas em texto por requisição de /admin/import-users; cada uma custa um hash
+# no pool, então lotes grandes devem vir com password_hash ou pela CLI
+IMPORT_MAX_PLAINTEXT = int(os.getenv("SIMPLEAUTH_IMPORT_MAX_PLAINTEXT", "1000"))
+
+FORMATS = ("ndjson", "csv")
+EXPORT_FIELDS = ("username", "password_hash")
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.errors_truncated = False
+        self.plaintext = 0
+
+    def add_error(self, line: int, username: str | None, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "username": username, "error": error})
+        else:
+            self.errors_truncated = True
+
+    def as_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+class RecordParser:
+    # recebe uma linha por vez, assim serve tanto para arquivo quanto para o corpo em stream
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.fmt = fmt
+        self.header = None
+        self.line_no = 0
+
+    def feed(self, line: str):
+        self.line_no += 1
+        if not line.strip():
+            return None
+
+        if self.fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                return ValueError(f"Invalid JSON: {exc.msg}")
+            if not isinstance(record, dict):
+                return ValueError("Each line must be a JSON object.")
+            return record
+
+        values = next(csv.reader([line]))
+        if self.header is None:
+            self.header = [value.strip() for value in values]
+            return None
+        if len(values) != len(self.header):
+            return ValueError(f"Expected {len(self.header)} columns, got {len(values)}.")
+        return {key: value for key, value in zip(self.header, values) if value != ""}
+
+
+def ensure_password_hash(password_hash) -> str:
+    if not isinstance(password_hash, str):
+        raise ValueError("password_hash must be a string.")
+    scheme = pwd_context.identify(password_hash, required=False)
+    if scheme is None:
+        raise ValueError("password_hash is not in a supported passlib format.")
+    handler = pwd_context.handler(scheme)
+    # hash de um esquema sem backend instalado entraria no banco e nunca
+    # mais daria login: recusa já na importação
+    has_backend = getattr(handler, "has_backend", None)
+    if has_backend is not None and not has_backend():
+        raise ValueError(f"password_hash uses {scheme}, which is not installed on this server.")
+    # identify só olha o prefixo; from_string confere sal, custo e digest
+    try:
+        handler.from_string(password_hash)
+    except (ValueError, TypeError):
+        raise ValueError(f"password_hash is not a valid {scheme} hash.")
+    return password_hash
+
+
+def validate_record(record: dict) -> tuple[str, str | None, str | None]:
+    # devolve (username, hash, senha): só um dos dois últimos vem preenchido
+    username = record.get("username")
+    if not isinstance(username, str) or not username:
+        raise ValueError("Missing username.")
+    ensure_username(username)
+
+    password_hash = record.get("password_hash")
+    if password_hash is not None:
+        return username, ensure_password_hash(password_hash), None
+
+    password = record.get("password")
+    if not isinstance(password, str):
+        raise ValueError("Either password_hash or password is required.")
+    ensure_password(password)
+    return username, None, password
+
+
+def validate_batch(report: ImportReport, batch: list[tuple[int, object]]) -> list[tuple[int, str, str | None, str | None]]:
+    # batch: (linha, registro ou erro de parse); devolve as linhas válidas, sem
+    # username repetido, ainda com a senha em texto onde não veio hash
+    valid = []
+    seen = set()
+    for line_no, record in batch:
+        if isinstance(record, Exception):
+            report.add_error(line_no, None, str(record))
+            continue
+        try:
+            username, password_hash, password = validate_record(record)
+        except ValueError as exc:
+            report.add_error(line_no, record.get("username"), str(exc))
+            continue
+        if username in seen:
+            report.add_error(line_no, username, "Duplicate username in import.")
+            continue
+        seen.add(username)
+        valid.append((line_no, username, password_hash, password))
+    return valid
+
+
+def store_batch(report: ImportReport, rows: list[tuple[int, str, str]]):
+    if not rows:
+        return
+    existing = insert_users_batch([(username, password_hash) for _, username, password_hash in rows])
+    for line_no, username, _ in rows:
+        if username in existing:
+            report.add_error(line_no, username, "Username already in use.")
+        else:
+            report.imported += 1
+
+
+def import_batch(report: ImportReport, batch: list[tuple[int, object]]):
+    # caminho da CLI: processo próprio, sem pool de hash para disputar, então
+    # o hash das senhas em texto é feito aqui mesmo. A API usa
+    # async_user_service.import_batch, que passa pelo hashing_service
+    rows = [
+        (line_no, username, password_hash if password is None else hash_password(password))
+        for line_no, username, password_hash, password in validate_batch(report, batch)
+    ]
+    store_batch(report, rows)
+
+
+def import_lines(lines, fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    report = ImportReport()
+    parser = RecordParser(fmt)
+    batch = []
+    for line in lines:
+        record = parser.feed(line)
+        if record is None:
+            continue
+        batch.append((parser.line_no, record))
+        if len(batch) >= batch_size:
+            import_batch(report, batch)
+            batch = []
+    if batch:
+        import_batch(report, batch)
+    return report
+
+
+def export_header(fmt: str) -> str:
+    if fmt == "csv":
+        return ",".join(EXPORT_FIELDS) + "\n"
+    return ""
+
+
+def format_export_rows(rows, fmt: str) -> str:
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps({"username": row["username"], "password_hash": row["password"]}) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows((row["username"], row["password"]) for row in rows)
+    return buffer.getvalue()
+
+
+def iter_export_chunks(fmt: str, batch_size: int = EXPORT_BATCH_SIZE):
+    yield export_header(fmt)
+    after_id = 0
+    while True:
+        rows = fetch_export_batch(after_id, batch_size)
+        if not rows:
+            return
+        yield format_export_rows(rows, fmt)
+        after_id = rows[-1]["user_id"]
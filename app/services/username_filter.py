@@ -0,0 +1,169 @@
+import hashlib
+import math
+import os
+import threading
+import time
+
+USERNAME_FILTER_ENABLED = os.getenv("SIMPLEAUTH_USERNAME_FILTER", "1") == "1"
+USERNAME_FILTER_CAPACITY = int(os.getenv("SIMPLEAUTH_USERNAME_FILTER_CAPACITY", "100000"))
+USERNAME_FILTER_ERROR_RATE = float(os.getenv("SIMPLEAUTH_USERNAME_FILTER_ERROR_RATE", "0.01"))
+USERNAME_FILTER_POLL_INTERVAL = float(os.getenv("SIMPLEAUTH_USERNAME_FILTER_POLL_INTERVAL", "0.5"))
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # double hashing: k posições a partir de um único digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class UsernameFilter:
+    # Bloom filter com todos os usernames do banco. "Não está" só é definitivo
+    # enquanto o filtro reflete o contador "users" da tabela generations;
+    # desatualizado ou ainda carregando, ele responde "talvez" e o login
+    # consulta o banco normalmente.
+    def __init__(
+        self,
+        scan_usernames,
+        read_generation,
+        capacity: int = USERNAME_FILTER_CAPACITY,
+        error_rate: float = USERNAME_FILTER_ERROR_RATE,
+        poll_interval: float = USERNAME_FILTER_POLL_INTERVAL,
+        enabled: bool = USERNAME_FILTER_ENABLED,
+    ):
+        self._scan_usernames = scan_usernames
+        self._read_generation = read_generation
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.poll_interval = poll_interval
+        self.enabled = enabled
+        self._bloom = None
+        self._generation = None # geração que o filtro reflete
+        self._latest = None # última geração lida do banco
+        self._checked_at = 0.0
+        self._removed = 0
+        self._recent = None # nomes adicionados durante um rebuild
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    @property
+    def fresh(self) -> bool:
+        return self._bloom is not None and self._generation == self._latest
+
+    def poll_due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.poll_interval
+
+    def start(self):
+        if self.enabled:
+            self._schedule_rebuild()
+
+    def sync(self):
+        if not self.enabled or not self.poll_due():
+            return
+        now = time.monotonic()
+        generation = self._read_generation()
+        with self._lock:
+            self._checked_at = now
+            self._latest = generation
+            stale = self._generation != generation
+        if stale:
+            self._schedule_rebuild()
+
+    def might_exist(self, username: str) -> bool:
+        with self._lock:
+            if not self.enabled or not self.fresh:
+                return True
+            return username in self._bloom
+
+    def add(self, *usernames: str, generation: int | None = None):
+        with self._lock:
+            if self._recent is not None:
+                self._recent.extend(usernames)
+            if self._bloom is None:
+                return
+            for username in usernames:
+                self._bloom.add(username)
+            # mesma regra do cache de sessão: só avança se ninguém mais escreveu
+            if generation is not None and self._generation is not None and generation == self._generation + 1:
+                self._generation = generation
+                if self._latest is not None and self._latest < generation:
+                    self._latest = generation
+
+    def discard(self, *usernames: str):
+        # Bloom filter não remove; os nomes ficam como falso positivo até o próximo rebuild
+        with self._lock:
+            if self._bloom is None:
+                return
+            self._removed += len(usernames)
+            rebuild = self._removed * 4 > max(self._bloom.count, self.capacity)
+        if rebuild:
+            self._schedule_rebuild()
+
+    def _schedule_rebuild(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+            self._recent = []
+        threading.Thread(target=self._rebuild, name="simpleauth-username-filter", daemon=True).start()
+
+    def _rebuild(self):
+        built = {}
+
+        def consume(total: int, usernames):
+            bloom = BloomFilter(max(self.capacity, total * 2), self.error_rate)
+            for username in usernames:
+                bloom.add(username)
+            built["bloom"] = bloom
+
+        try:
+            generation = self._scan_usernames(consume)
+        except Exception:
+            with self._lock:
+                self._rebuilding = False
+                self._recent = None
+            return
+
+        bloom = built["bloom"]
+        with self._lock:
+            for username in self._recent:
+                bloom.add(username)
+            self._bloom = bloom
+            self._generation = generation
+            if self._latest is None or self._latest < generation:
+                self._latest = generation
+            self._removed = 0
+            self._recent = None
+            self._rebuilding = False
+            self.rebuilds += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            bloom = self._bloom
+            return {
+                "enabled": int(self.enabled),
+                "fresh": int(self.fresh),
+                "entries": bloom.count if bloom is not None else 0,
+                "size_bits": bloom.size if bloom is not None else 0,
+                "hashes": bloom.hashes if bloom is not None else 0,
+                "removed": self._removed,
+                "rebuilds": self.rebuilds,
+            }
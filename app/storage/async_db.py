@@ -0,0 +1,48 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from starlette.concurrency import run_in_threadpool
+
+from app.storage.db import POOL_SIZE
+
+# sync: as chamadas bloqueantes usam o threadpool compartilhado do Starlette
+# async: vão para threads dedicadas ao banco e o event loop nunca disputa
+#        slot com o resto da aplicação
+STORAGE_MODE = os.getenv("SIMPLEAUTH_STORAGE_MODE", "sync").lower()
+DB_THREADS = int(os.getenv("SIMPLEAUTH_DB_THREADS", str(POOL_SIZE)))
+
+if STORAGE_MODE not in {"sync", "async"}:
+    raise ValueError(f"Invalid SIMPLEAUTH_STORAGE_MODE: {STORAGE_MODE}")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="simpleauth-db")
+    return _executor
+
+
+def stop_db_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+async def run_db(func, *args, **kwargs):
+    if STORAGE_MODE != "async":
+        return await run_in_threadpool(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    # run_in_executor não copia o contexto (o Server-Timing depende dele)
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), partial(context.run, func, *args, **kwargs))
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.storage.db import BUSY_TIMEOUT_MS, CONNECTION_PRAGMAS, DB_PATH, ConnectionPool, retry_on_contention
+
+# banco separado do principal: o flush do audit nunca disputa o lock de
+# escrita com login/logout e o arquivo pode ser rotacionado ou copiado à parte
+AUDIT_DB_PATH = Path(os.getenv("SIMPLEAUTH_AUDIT_DB_PATH", DB_PATH.with_name(f"{DB_PATH.stem}-audit.db")))
+
+AUDIT_COLUMNS = ("id", "created_at", "event", "outcome", "username", "actor", "ip", "detail")
+
+
+def get_audit_conn():
+    conn = sqlite3.connect(AUDIT_DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class AuditStore:
+    def __init__(self, connect=get_audit_conn, pool_size: int = 2):
+        # uma conexão para o flusher e uma para as consultas do admin
+        self._connect = connect
+        self._pool_size = pool_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+
+    def _create_pool(self) -> ConnectionPool:
+        pool = ConnectionPool(size=self._pool_size, connect=self._connect)
+        with pool.connection() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS audit_events (
+                    id INTEGER PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    event TEXT NOT NULL,
+                    outcome TEXT NOT NULL,
+                    username TEXT,
+                    actor TEXT,
+                    ip TEXT,
+                    detail TEXT
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_audit_events_username_time ON audit_events (username, created_at)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_time ON audit_events (created_at)")
+            conn.commit()
+        return pool
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
+    @retry_on_contention
+    def insert(self, events: list[tuple]):
+        # events: (created_at, event, outcome, username, actor, ip, detail)
+        with self._pool.connection() as conn:
+            conn.executemany(
+                "INSERT INTO audit_events (created_at, event, outcome, username, actor, ip, detail) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                events,
+            )
+            conn.commit()
+
+    def query(
+        self,
+        username: str | None = None,
+        event: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        before: tuple[float, int] | None = None,
+        limit: int = 100,
+    ) -> list:
+        # mais recentes primeiro; before=(created_at, id) da última linha da página anterior
+        conditions = []
+        params = []
+        if username is not None:
+            conditions.append("username = ?")
+            params.append(username)
+        if event is not None:
+            conditions.append("event = ?")
+            params.append(event)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        if before is not None:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(before)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._pool.connection() as conn:
+            return conn.execute(
+                f"SELECT {', '.join(AUDIT_COLUMNS)} FROM audit_events {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+
+    def stats(self) -> dict:
+        return self._pool.stats() if self._pool is not None else {}
@@ -1,44 +1,258 @@
+import os
+import queue
+import random
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
 
-from passlib.context import CryptContext
+from app.metrics import DB_CONNECTIONS_OPENED
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+DB_PATH = Path(os.getenv("SIMPLEAUTH_DB_PATH", Path(__file__).with_name("simpleauth.db")))
+POOL_SIZE = int(os.getenv("SIMPLEAUTH_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("SIMPLEAUTH_DB_POOL_TIMEOUT", "5"))
+HEALTHCHECK_INTERVAL = float(os.getenv("SIMPLEAUTH_DB_HEALTHCHECK_INTERVAL", "30"))
 
+JOURNAL_MODE = os.getenv("SIMPLEAUTH_DB_JOURNAL_MODE", "WAL").upper()
+SYNCHRONOUS = os.getenv("SIMPLEAUTH_DB_SYNCHRONOUS", "NORMAL").upper()
+BUSY_TIMEOUT_MS = int(os.getenv("SIMPLEAUTH_DB_BUSY_TIMEOUT_MS", "5000"))
+MMAP_SIZE = int(os.getenv("SIMPLEAUTH_DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+CACHE_SIZE_KIB = int(os.getenv("SIMPLEAUTH_DB_CACHE_SIZE_KIB", "16384"))
+CHECKPOINT_INTERVAL = float(os.getenv("SIMPLEAUTH_DB_CHECKPOINT_INTERVAL", "60"))
+WRITE_RETRIES = int(os.getenv("SIMPLEAUTH_DB_WRITE_RETRIES", "5"))
+WRITE_RETRY_BACKOFF = float(os.getenv("SIMPLEAUTH_DB_WRITE_RETRY_BACKOFF", "0.01"))
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+if JOURNAL_MODE not in {"WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"}:
+    raise ValueError(f"Invalid SIMPLEAUTH_DB_JOURNAL_MODE: {JOURNAL_MODE}")
+if SYNCHRONOUS not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+    raise ValueError(f"Invalid SIMPLEAUTH_DB_SYNCHRONOUS: {SYNCHRONOUS}")
 
-from pathlib import Path
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    f"PRAGMA synchronous = {SYNCHRONOUS}",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    f"PRAGMA mmap_size = {MMAP_SIZE}",
+    f"PRAGMA cache_size = -{CACHE_SIZE_KIB}", # valor negativo = tamanho em KiB
+)
+
+
+RETURNING_SUPPORTED = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+class PoolTimeoutError(RuntimeError):
+    pass
 
-DB_PATH = Path(__file__).with_name("simpleauth.db")
 
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
     conn.row_factory = sqlite3.Row # faz o select retornar linhas com acesso ao nome da coluna
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    DB_CONNECTIONS_OPENED.inc()
     return conn
 
+
+class ConnectionPool:
+    def __init__(self, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT, connect=get_conn):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.size = size
+        self.timeout = timeout
+        self._connect = connect
+        self._idle = queue.LifoQueue(maxsize=size) # LIFO reaproveita a conexão mais "quente"
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def _new_connection(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        if self._closed:
+            raise PoolTimeoutError("Connection pool is closed.")
+
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection()
+            if conn is not None:
+                return conn
+            try:
+                conn, last_used = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolTimeoutError("Timed out waiting for a database connection.") from None
+
+        # só testa conexões paradas há algum tempo, o caminho quente não paga o SELECT 1
+        if time.monotonic() - last_used > HEALTHCHECK_INTERVAL and not self._is_healthy(conn):
+            self._discard(conn)
+            return self.acquire()
+        return conn
+
+    def release(self, conn):
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put_nowait((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        return {"size": self.size, "created": self._created, "idle": self._idle.qsize()}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+@contextmanager
+def connection():
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def is_contention_error(exc: Exception) -> bool:
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+def retry_on_contention(func):
+    # o busy_timeout já espera pelo lock, mas upgrades de leitura para escrita
+    # em WAL falham na hora com SQLITE_BUSY; nesses casos tentamos de novo
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as exc:
+                if attempt == WRITE_RETRIES or not is_contention_error(exc):
+                    raise
+                delay = WRITE_RETRY_BACKOFF * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+    return wrapper
+
+
+def checkpoint(mode: str = "PASSIVE"):
+    if mode not in {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}:
+        raise ValueError(f"Invalid checkpoint mode: {mode}")
+    with connection() as conn:
+        return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+
+_checkpointer = None
+_checkpointer_stop = threading.Event()
+
+
+def _checkpoint_loop():
+    while not _checkpointer_stop.wait(CHECKPOINT_INTERVAL):
+        try:
+            checkpoint()
+        except sqlite3.Error:
+            pass # o próximo ciclo tenta de novo
+
+
+def start_checkpointer():
+    global _checkpointer
+    if JOURNAL_MODE != "WAL" or CHECKPOINT_INTERVAL <= 0 or _checkpointer is not None:
+        return
+    _checkpointer_stop.clear()
+    _checkpointer = threading.Thread(target=_checkpoint_loop, name="simpleauth-checkpoint", daemon=True)
+    _checkpointer.start()
+
+
+def stop_checkpointer():
+    global _checkpointer
+    if _checkpointer is None:
+        return
+    _checkpointer_stop.set()
+    _checkpointer.join()
+    _checkpointer = None
+
+
 def init_db():
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            session_version INTEGER NOT NULL DEFAULT 1,
-            session_active INTEGER NOT NULL DEFAULT 0,
-            attempts INTEGER NOT NULL DEFAULT 3,
-            blocked_until TEXT
-        )
-    """)
-
-    cursor.execute("SELECT 1 FROM users WHERE username = ?", ("admin",)) # verifica se existe usuário admin
-
-    if cursor.fetchone() is None: # pega a primeira linha do select, se é None, admin não existe, tipo um ReadLine.
-        cursor.execute(
-            "INSERT INTO users (username, password, attempts, blocked_until) VALUES (?, ?, ?, ?)",
-            ("admin", hash_password("54321"), 3, None)
-        )
-    
-    conn.commit() # salva as mudanças
-    conn.close() # fecha a conexão
+    from app.security.password import hash_password
+    from app.storage.repository import ROLE_ADMIN
+    from app.storage.migrations import migrate
+
+    with connection() as conn:
+        conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}") # fica gravado no arquivo do banco
+
+    migrate()
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM users WHERE username = ?", ("admin",)) # verifica se existe usuário admin
+
+        if cursor.fetchone() is None: # pega a primeira linha do select, se é None, admin não existe, tipo um ReadLine.
+            cursor.execute( # OR IGNORE: outro worker pode ter semeado entre o SELECT e aqui
+                "INSERT OR IGNORE INTO users (username, password, roles) VALUES (?, ?, ?)",
+                ("admin", hash_password("54321"), ROLE_ADMIN)
+            )
+
+        conn.commit() # salva as mudanças
@@ -0,0 +1,40 @@
+from app.storage.db import RETURNING_SUPPORTED
+
+# contadores globais gravados no banco; cada processo compara o valor lido
+# com o último que viu para saber se outro worker alterou algo
+
+SESSIONS = "sessions"
+USERS = "users"
+
+GENERATION_NAMES = (SESSIONS, USERS)
+
+
+def create_generations_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS generations (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.executemany(
+        "INSERT OR IGNORE INTO generations (name, value) VALUES (?, 0)",
+        [(name,) for name in GENERATION_NAMES],
+    )
+
+
+def bump_generation(conn, name: str) -> int:
+    # roda dentro da transação de quem chama, junto com a escrita que invalida
+    if RETURNING_SUPPORTED:
+        row = conn.execute(
+            "UPDATE generations SET value = value + 1 WHERE name = ? RETURNING value",
+            (name,),
+        ).fetchone()
+        return int(row[0])
+
+    conn.execute("UPDATE generations SET value = value + 1 WHERE name = ?", (name,))
+    return read_generation(conn, name)
+
+
+def read_generation(conn, name: str) -> int:
+    row = conn.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()
+    return int(row[0]) if row is not None else 0
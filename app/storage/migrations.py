@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import time
+from typing import Callable, NamedTuple
+
+from app.storage.db import connection, retry_on_contention
+from app.storage.generations import create_generations_table
+from app.storage.refresh_tokens import create_refresh_tokens_table
+from app.storage.repository import GLOBAL_EPOCH_SCOPE, ROLE_ADMIN, SESSION_TTL_MINUTES
+
+# a versão do schema fica em PRAGMA user_version. Cada migração precisa ser
+# idempotente: se o processo cair no meio, ela roda de novo do início e só a
+# última transação grava a versão nova. Backfills andam em lotes por faixa de
+# user_id, cada lote na sua transação, para nunca segurar o lock de escrita
+# por muito tempo enquanto a API continua atendendo.
+MIGRATION_BATCH_SIZE = int(os.getenv("SIMPLEAUTH_MIGRATION_BATCH_SIZE", "10000"))
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable
+
+
+def _column_exists(conn, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _batched_update(conn, sql: str, batch_size: int):
+    # sql recebe (primeiro user_id, último user_id) do lote
+    row = conn.execute("SELECT MIN(user_id), MAX(user_id) FROM users").fetchone()
+    if row[0] is None:
+        return
+    start, last = row[0], row[1]
+    while start <= last:
+        end = start + batch_size - 1
+        _run_batch(conn, sql, start, end)
+        start = end + 1
+
+
+@retry_on_contention
+def _run_batch(conn, sql: str, start: int, end: int):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(sql, (start, end))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _baseline(conn, batch_size: int):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            session_version INTEGER NOT NULL DEFAULT 1,
+            session_active INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 3,
+            blocked_until TEXT
+        )
+    """)
+    create_generations_table(conn)
+
+
+def _refresh_tokens(conn, batch_size: int):
+    create_refresh_tokens_table(conn)
+
+
+def _blocked_until_epoch(conn, batch_size: int):
+    # SQLite não troca o tipo de uma coluna sem reescrever a tabela; a coluna
+    # inteira nova é adicionada (O(1)) e preenchida em lotes. O texto ISO antigo
+    # foi gravado com datetime.now(), ou seja, em horário local.
+    if not _column_exists(conn, "users", "blocked_until_epoch"):
+        conn.execute("ALTER TABLE users ADD COLUMN blocked_until_epoch INTEGER")
+        conn.commit()
+    _batched_update(
+        conn,
+        """
+        UPDATE users
+        SET blocked_until_epoch = CAST(strftime('%s', blocked_until, 'utc') AS INTEGER),
+            blocked_until = NULL
+        WHERE user_id BETWEEN ? AND ? AND blocked_until IS NOT NULL
+        """,
+        batch_size,
+    )
+
+
+def _partial_indexes(conn, batch_size: int):
+    # índices parciais só guardam as poucas linhas que interessam
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_active ON users (user_id) WHERE session_active = 1")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_blocked ON users (blocked_until_epoch) "
+        "WHERE blocked_until_epoch IS NOT NULL"
+    )
+
+
+def _session_expiry(conn, batch_size: int):
+    # sessões abertas antes desta versão não têm validade registrada; ganham
+    # um TTL a partir de agora e passam a expirar como as novas
+    if not _column_exists(conn, "users", "session_expires_at"):
+        conn.execute("ALTER TABLE users ADD COLUMN session_expires_at INTEGER")
+        conn.commit()
+    expires_at = int(time.time() + SESSION_TTL_MINUTES * 60)
+    _batched_update(
+        conn,
+        f"""
+        UPDATE users SET session_expires_at = {expires_at}
+        WHERE user_id BETWEEN ? AND ? AND session_active = 1 AND session_expires_at IS NULL
+        """,
+        batch_size,
+    )
+    # o sweeper lê só as sessões ativas, em ordem de vencimento
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_session_expiry ON users (session_expires_at) WHERE session_active = 1"
+    )
+
+
+def _session_epochs(conn, batch_size: int):
+    # ADD COLUMN com default constante só muda o schema, não reescreve linhas
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS session_epochs (
+            scope TEXT PRIMARY KEY,
+            epoch INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO session_epochs (scope, epoch) VALUES (?, 0)", (GLOBAL_EPOCH_SCOPE,))
+    if not _column_exists(conn, "users", "session_epoch"):
+        conn.execute("ALTER TABLE users ADD COLUMN session_epoch INTEGER NOT NULL DEFAULT 0")
+
+
+def _user_roles(conn, batch_size: int):
+    # quem era admin pelo nome passa a ser admin pelo papel
+    if not _column_exists(conn, "users", "roles"):
+        conn.execute("ALTER TABLE users ADD COLUMN roles TEXT NOT NULL DEFAULT ''")
+    conn.execute("UPDATE users SET roles = ? WHERE username = 'admin' AND roles = ''", (ROLE_ADMIN,))
+
+
+def _drop_lockout_columns(conn, batch_size: int):
+    # o bloqueio por usuário saiu do banco (agora é o limiter): nenhuma
+    # consulta usa idx_users_blocked, e attempts e o blocked_until em texto
+    # (zerado na versão 3) não são mais lidos. blocked_until_epoch fica para os
+    # bloqueios legados ainda em vigor
+    conn.execute("DROP INDEX IF EXISTS idx_users_blocked")
+    conn.commit()
+    # DROP COLUMN (3.35+) reescreve a tabela numa transação só, cerca de um
+    # segundo por coluna a cada milhão de linhas; escritas concorrentes esperam
+    # no busy_timeout. Em SQLite mais antigo as colunas ficam, sem uso
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        return
+    for column in ("blocked_until", "attempts"):
+        if _column_exists(conn, "users", column):
+            conn.execute(f"ALTER TABLE users DROP COLUMN {column}")
+            conn.commit()
+
+
+MIGRATIONS = (
+    Migration(1, "baseline", _baseline),
+    Migration(2, "refresh_tokens", _refresh_tokens),
+    Migration(3, "blocked_until_epoch", _blocked_until_epoch),
+    Migration(4, "partial_indexes", _partial_indexes),
+    Migration(5, "session_expiry", _session_expiry),
+    Migration(6, "session_epochs", _session_epochs),
+    Migration(7, "user_roles", _user_roles),
+    Migration(8, "drop_lockout_columns", _drop_lockout_columns),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(target: int = LATEST_VERSION, batch_size: int = MIGRATION_BATCH_SIZE) -> list[dict]:
+    applied = []
+    with connection() as conn:
+        for migration in MIGRATIONS:
+            if migration.version > target or migration.version <= schema_version(conn):
+                continue
+            started = time.perf_counter()
+            migration.apply(conn, batch_size)
+            # a versão só avança junto com o commit final; outro worker que
+            # chegar junto refaz passos idempotentes e grava o mesmo valor
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+            conn.commit()
+            applied.append({
+                "version": migration.version,
+                "name": migration.name,
+                "seconds": round(time.perf_counter() - started, 3),
+            })
+    return applied
+
+
+def migration_status() -> dict:
+    with connection() as conn:
+        current = schema_version(conn)
+    return {
+        "current": current,
+        "latest": LATEST_VERSION,
+        "pending": [migration.name for migration in MIGRATIONS if migration.version > current],
+    }
@@ -0,0 +1,645 @@
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from app.storage.db import POOL_SIZE, POOL_TIMEOUT, WRITE_RETRIES, WRITE_RETRY_BACKOFF
+from app.storage.generations import GENERATION_NAMES, SESSIONS, USERS
+from app.storage.migrations import Migration
+from app.storage.refresh_tokens import REFRESH_TOKEN_EXPIRE_DAYS
+from app.storage.repository import (
+    GLOBAL_EPOCH_SCOPE,
+    LOGIN_ACTIVE_SESSION,
+    LOGIN_BLOCKED,
+    LOGIN_NOT_FOUND,
+    LOGIN_SUCCESS,
+    REFRESH_INVALID,
+    REFRESH_REUSED,
+    REFRESH_SUCCESS,
+    ROLE_ADMIN,
+    LoginResult,
+    SESSION_TTL_MINUTES,
+    RefreshResult,
+    UserRepository,
+    parse_roles,
+    refresh_family_current,
+    session_live,
+)
+
+POSTGRES_DSN = os.getenv("SIMPLEAUTH_POSTGRES_DSN", "postgresql://localhost/simpleauth")
+POSTGRES_POOL_MIN = int(os.getenv("SIMPLEAUTH_POSTGRES_POOL_MIN", "1"))
+# 0 prepara cada comando no primeiro uso; atrás de um pgbouncer em modo
+# transaction use -1 para desligar (prepared statements ficam na conexão)
+POSTGRES_PREPARE_THRESHOLD = int(os.getenv("SIMPLEAUTH_POSTGRES_PREPARE_THRESHOLD", "0"))
+POSTGRES_SCAN_FETCH_SIZE = int(os.getenv("SIMPLEAUTH_POSTGRES_SCAN_FETCH_SIZE", "5000"))
+
+MIGRATION_LOCK_ID = 0x51A7_0001 # chave do pg_advisory_lock das migrações
+
+# serialization_failure e deadlock_detected: a transação foi desfeita e pode
+# ser repetida do início
+RETRY_SQLSTATES = {"40001", "40P01"}
+
+
+def _expires_at(now: float) -> int:
+    return int(now + SESSION_TTL_MINUTES * 60)
+
+
+def retry_on_conflict(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except Exception as exc:
+                if attempt == WRITE_RETRIES or getattr(exc, "sqlstate", None) not in RETRY_SQLSTATES:
+                    raise
+                delay = WRITE_RETRY_BACKOFF * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+    return wrapper
+
+
+def _baseline(conn, batch_size: int):
+    # COLLATE "C" compara por bytes: a paginação por intervalo e o
+    # _prefix_upper_bound do user_service seguem a mesma ordem do SQLite
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+            username TEXT COLLATE "C" NOT NULL UNIQUE,
+            password TEXT NOT NULL,
+            session_version INTEGER NOT NULL DEFAULT 1,
+            session_active SMALLINT NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 3,
+            blocked_until_epoch BIGINT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS generations (
+            name TEXT PRIMARY KEY,
+            value BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    for name in GENERATION_NAMES:
+        conn.execute("INSERT INTO generations (name, value) VALUES (%s, 0) ON CONFLICT (name) DO NOTHING", (name,))
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS refresh_tokens (
+            token_hash TEXT PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            family_id TEXT NOT NULL,
+            session_version INTEGER NOT NULL,
+            expires_at BIGINT NOT NULL,
+            used_at BIGINT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user ON refresh_tokens (user_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens (family_id)")
+
+
+def _partial_indexes(conn, batch_size: int):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_active ON users (user_id) WHERE session_active = 1")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_blocked ON users (blocked_until_epoch) "
+        "WHERE blocked_until_epoch IS NOT NULL"
+    )
+
+
+def _session_expiry(conn, batch_size: int):
+    # ADD COLUMN sem default não reescreve a tabela; as sessões abertas
+    # ganham um TTL a partir de agora, como na migração do SQLite
+    conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS session_expires_at BIGINT")
+    conn.execute(
+        "UPDATE users SET session_expires_at = %s WHERE session_active = 1 AND session_expires_at IS NULL",
+        (int(time.time() + SESSION_TTL_MINUTES * 60),),
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_session_expiry ON users (session_expires_at) WHERE session_active = 1"
+    )
+
+
+def _session_epochs(conn, batch_size: int):
+    # ADD COLUMN com default constante não reescreve a tabela (Postgres 11+)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS session_epochs (
+            scope TEXT PRIMARY KEY,
+            epoch BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute(
+        "INSERT INTO session_epochs (scope, epoch) VALUES (%s, 0) ON CONFLICT (scope) DO NOTHING",
+        (GLOBAL_EPOCH_SCOPE,),
+    )
+    conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS session_epoch BIGINT NOT NULL DEFAULT 0")
+
+
+def _user_roles(conn, batch_size: int):
+    conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS roles TEXT NOT NULL DEFAULT ''")
+    conn.execute("UPDATE users SET roles = %s WHERE username = 'admin' AND roles = ''", (ROLE_ADMIN,))
+
+
+def _drop_lockout_columns(conn, batch_size: int):
+    # o bloqueio por usuário agora é do limiter; DROP COLUMN aqui só marca a
+    # coluna como removida, sem reescrever a tabela
+    conn.execute("DROP INDEX IF EXISTS idx_users_blocked")
+    conn.execute("ALTER TABLE users DROP COLUMN IF EXISTS attempts")
+
+
+# o histórico do SQLite (texto ISO -> epoch etc.) não existe aqui: o schema
+# do Postgres já nasce na forma atual. DDL é transacional, então cada
+# migração roda inteira numa transação junto com o registro da versão.
+MIGRATIONS = (
+    Migration(1, "baseline", _baseline),
+    Migration(2, "partial_indexes", _partial_indexes),
+    Migration(3, "session_expiry", _session_expiry),
+    Migration(4, "session_epochs", _session_epochs),
+    Migration(5, "user_roles", _user_roles),
+    Migration(6, "drop_lockout_columns", _drop_lockout_columns),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+class PostgresUserRepository(UserRepository):
+    def __init__(self, dsn: str = POSTGRES_DSN, min_size: int = POSTGRES_POOL_MIN, max_size: int = POOL_SIZE):
+        try:
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
+        except ImportError as exc:
+            raise RuntimeError(
+                "SIMPLEAUTH_STORAGE_BACKEND=postgres requires the 'psycopg' and 'psycopg-pool' packages."
+            ) from exc
+
+        prepare_threshold = POSTGRES_PREPARE_THRESHOLD if POSTGRES_PREPARE_THRESHOLD >= 0 else None
+        # aberto sob demanda: importar o módulo não pode exigir o banco no ar
+        self._pool = ConnectionPool(
+            dsn,
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            timeout=POOL_TIMEOUT,
+            kwargs={"row_factory": dict_row, "prepare_threshold": prepare_threshold},
+            name="simpleauth",
+            open=False,
+        )
+        self._open_lock = threading.Lock()
+        self._opened = False
+
+    def _connection(self):
+        if not self._opened:
+            with self._open_lock:
+                if not self._opened:
+                    self._pool.open(wait=True, timeout=POOL_TIMEOUT)
+                    self._opened = True
+        # o context manager do pool faz commit na saída e rollback se houver exceção
+        return self._pool.connection()
+
+    def init(self):
+        from app.security.password import hash_password
+
+        self.migrate()
+        with self._connection() as conn:
+            if conn.execute("SELECT 1 FROM users WHERE username = %s", ("admin",)).fetchone() is None:
+                conn.execute(
+                    """
+                    INSERT INTO users (username, password, roles) VALUES (%s, %s, %s)
+                    ON CONFLICT (username) DO NOTHING
+                    """,
+                    ("admin", hash_password("54321"), ROLE_ADMIN),
+                )
+
+    def close(self):
+        with self._open_lock:
+            if self._opened:
+                self._pool.close()
+                self._opened = False
+
+    def stats(self) -> dict:
+        stats = self._pool.get_stats()
+        return {
+            "size": self._pool.max_size,
+            "created": stats.get("pool_size", 0),
+            "idle": stats.get("pool_available", 0),
+        }
+
+    def _schema_version(self, conn) -> int:
+        row = conn.execute("SELECT COALESCE(MAX(version), 0) AS version FROM schema_migrations").fetchone()
+        return int(row["version"])
+
+    def migrate(self, target: int | None = None, batch_size: int | None = None) -> list[dict]:
+        target = LATEST_VERSION if target is None else target
+        applied = []
+        with self._connection() as conn:
+            # vários workers subindo juntos: só um migra, os outros esperam o lock
+            # e encontram as versões já registradas
+            conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            try:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                """)
+                current = self._schema_version(conn)
+                conn.commit()
+                for migration in MIGRATIONS:
+                    if migration.version > target or migration.version <= current:
+                        continue
+                    started = time.perf_counter()
+                    with conn.transaction():
+                        migration.apply(conn, batch_size)
+                        conn.execute(
+                            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                            (migration.version, migration.name),
+                        )
+                    applied.append({
+                        "version": migration.version,
+                        "name": migration.name,
+                        "seconds": round(time.perf_counter() - started, 3),
+                    })
+            finally:
+                conn.rollback()
+                conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+                conn.commit()
+        return applied
+
+    def migration_status(self) -> dict:
+        with self._connection() as conn:
+            exists = conn.execute("SELECT to_regclass('schema_migrations') IS NOT NULL AS exists").fetchone()["exists"]
+            current = self._schema_version(conn) if exists else 0
+        return {
+            "current": current,
+            "latest": LATEST_VERSION,
+            "pending": [migration.name for migration in MIGRATIONS if migration.version > current],
+        }
+
+    def _read_generation(self, conn, name: str) -> int:
+        row = conn.execute("SELECT value FROM generations WHERE name = %s", (name,)).fetchone()
+        return int(row["value"]) if row is not None else 0
+
+    def _bump_generation(self, conn, name: str) -> int:
+        row = conn.execute(
+            "UPDATE generations SET value = value + 1 WHERE name = %s RETURNING value",
+            (name,),
+        ).fetchone()
+        return int(row["value"])
+
+    def _read_session_epoch(self, conn) -> int:
+        row = conn.execute("SELECT epoch FROM session_epochs WHERE scope = %s", (GLOBAL_EPOCH_SCOPE,)).fetchone()
+        return int(row["epoch"]) if row is not None else 0
+
+    def _store_refresh_token(self, conn, token_hash: str, user_id: int, family_id: str, session_version: int):
+        conn.execute(
+            """
+            INSERT INTO refresh_tokens (token_hash, user_id, family_id, session_version, expires_at)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (token_hash, user_id, family_id, session_version, int(time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400)),
+        )
+
+    def _revoke_user_refresh_tokens(self, conn, username: str):
+        conn.execute(
+            "DELETE FROM refresh_tokens WHERE user_id = (SELECT user_id FROM users WHERE username = %s)",
+            (username,),
+        )
+
+    def read_generation(self, name: str) -> int:
+        with self._connection() as conn:
+            return self._read_generation(conn, name)
+
+    def read_session_epoch(self) -> int:
+        with self._connection() as conn:
+            return self._read_session_epoch(conn)
+
+    @retry_on_conflict
+    def bump_session_epoch(self) -> int:
+        with self._connection() as conn:
+            row = conn.execute(
+                "UPDATE session_epochs SET epoch = epoch + 1 WHERE scope = %s RETURNING epoch",
+                (GLOBAL_EPOCH_SCOPE,),
+            ).fetchone()
+        return int(row["epoch"])
+
+    def scan_usernames(self, consume) -> int:
+        # snapshot REPEATABLE READ para geração, contagem e nomes; o cursor
+        # nomeado fica no servidor e traz os nomes em lotes
+        with self._connection() as conn:
+            conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            try:
+                generation = self._read_generation(conn, USERS)
+                total = conn.execute("SELECT COUNT(*) AS total FROM users").fetchone()["total"]
+                with conn.cursor(name="simpleauth_scan_usernames") as cursor:
+                    cursor.itersize = POSTGRES_SCAN_FETCH_SIZE
+                    cursor.execute("SELECT username FROM users")
+                    consume(total, (row["username"] for row in cursor))
+            finally:
+                conn.rollback()
+        return generation
+
+    @retry_on_conflict
+    def create_user(self, username: str, password: str) -> int:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO users (username, password, session_active) VALUES (%s, %s, %s)",
+                (username, password, 0),
+            )
+            return self._bump_generation(conn, USERS)
+
+    @retry_on_conflict
+    def insert_users_batch(self, users: list[tuple[str, str]]) -> tuple[set[str], int]:
+        # um comando só para o lote inteiro; o que voltar do RETURNING foi
+        # inserido e o resto já existia
+        with self._connection() as conn:
+            rows = conn.execute(
+                """
+                INSERT INTO users (username, password)
+                SELECT username, password FROM unnest(%s::text[], %s::text[]) AS batch (username, password)
+                ON CONFLICT (username) DO NOTHING
+                RETURNING username
+                """,
+                ([username for username, _ in users], [password for _, password in users]),
+            ).fetchall()
+            generation = self._bump_generation(conn, USERS)
+        inserted = {row["username"] for row in rows}
+        return {username for username, _ in users if username not in inserted}, generation
+
+    def fetch_export_batch(self, after_id: int, limit: int) -> list:
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT user_id, username, password FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                (after_id, limit),
+            ).fetchall()
+
+    def find_user(self, username: str):
+        with self._connection() as conn:
+            return conn.execute("SELECT * FROM users WHERE username = %s", (username,)).fetchone()
+
+    def load_session_state(self, username: str) -> tuple[int, int] | None:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT session_active, session_version FROM users WHERE username = %s",
+                (username,),
+            ).fetchone()
+        if row is None:
+            return None
+        return int(row["session_active"]), int(row["session_version"])
+
+    def load_session_states(self, usernames: list[str]) -> dict[str, tuple[int, int]]:
+        # = ANY(array) mantém um único prepared statement para qualquer tamanho de lote
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT username, session_active, session_version FROM users WHERE username = ANY(%s)",
+                (usernames,),
+            ).fetchall()
+        return {row["username"]: (int(row["session_active"]), int(row["session_version"])) for row in rows}
+
+    @retry_on_conflict
+    def activate_session(self, username: str) -> tuple[int | None, int | None]:
+        now = time.time()
+        with self._connection() as conn:
+            epoch = self._read_session_epoch(conn)
+            row = conn.execute(
+                """
+                UPDATE users
+                SET session_active = 1, session_version = session_version + 1, session_expires_at = %s,
+                    session_epoch = %s
+                WHERE username = %s AND (session_active = 0 OR session_expires_at <= %s OR session_epoch < %s)
+                RETURNING session_version
+                """,
+                (_expires_at(now), epoch, username, now, epoch),
+            ).fetchone()
+            if row is None:
+                return None, None
+            generation = self._bump_generation(conn, SESSIONS)
+        return int(row["session_version"]), generation
+
+    @retry_on_conflict
+    def deactivate_session(self, username: str) -> int | None:
+        with self._connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE users
+                SET session_active = 0, session_version = session_version + 1, session_expires_at = NULL
+                WHERE username = %s AND session_active = 1
+                """,
+                (username,),
+            )
+            if cursor.rowcount == 0:
+                return None
+            self._revoke_user_refresh_tokens(conn, username)
+            return self._bump_generation(conn, SESSIONS)
+
+    @retry_on_conflict
+    def expire_sessions(self, now: int, limit: int) -> tuple[list[str], int | None]:
+        # SKIP LOCKED: linhas travadas por um login em andamento ficam para a
+        # próxima rodada em vez de segurar o sweeper
+        with self._connection() as conn:
+            rows = conn.execute(
+                """
+                UPDATE users
+                SET session_active = 0, session_expires_at = NULL
+                WHERE user_id IN (
+                    SELECT user_id FROM users
+                    WHERE session_active = 1 AND session_expires_at <= %s
+                    ORDER BY session_expires_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING user_id, username
+                """,
+                (now, limit),
+            ).fetchall()
+            if not rows:
+                return [], None
+            # versão mantida: refresh token ainda válido reabre a sessão; as
+            # famílias sem nenhum token válido saem aqui
+            conn.execute(
+                """
+                DELETE FROM refresh_tokens t WHERE t.user_id = ANY(%s) AND NOT EXISTS (
+                    SELECT 1 FROM refresh_tokens live
+                    WHERE live.user_id = t.user_id AND live.used_at IS NULL AND live.expires_at > %s
+                )
+                """,
+                ([row["user_id"] for row in rows], now),
+            )
+            return [row["username"] for row in rows], self._bump_generation(conn, SESSIONS)
+
+    @retry_on_conflict
+    def refresh_session(self, token_hash: str, new_token_hash: str) -> tuple[RefreshResult, int | None]:
+        # FOR UPDATE trava o token e o usuário: dois /refresh com o mesmo token
+        # entram em fila e o segundo já enxerga o used_at do primeiro
+        now = int(time.time())
+        with self._connection() as conn:
+            row = conn.execute(
+                """
+                SELECT t.user_id, t.family_id, t.session_version, t.expires_at, t.used_at,
+                       u.username, u.session_active, u.session_version AS current_version,
+                       u.session_expires_at, u.session_epoch, u.roles,
+                       (SELECT epoch FROM session_epochs WHERE scope = %s) AS current_epoch
+                FROM refresh_tokens t JOIN users u ON u.user_id = t.user_id
+                WHERE t.token_hash = %s
+                FOR UPDATE
+                """,
+                (GLOBAL_EPOCH_SCOPE, token_hash),
+            ).fetchone()
+            if row is None:
+                return RefreshResult(REFRESH_INVALID), None
+
+            current = refresh_family_current(row)
+
+            if row["used_at"] is not None:
+                conn.execute("DELETE FROM refresh_tokens WHERE family_id = %s", (row["family_id"],))
+                generation = None
+                if current:
+                    conn.execute(
+                        """
+                        UPDATE users
+                        SET session_active = 0, session_version = session_version + 1, session_expires_at = NULL
+                        WHERE user_id = %s
+                        """,
+                        (row["user_id"],),
+                    )
+                    generation = self._bump_generation(conn, SESSIONS)
+                return RefreshResult(REFRESH_REUSED, username=row["username"]), generation
+
+            if row["expires_at"] <= now or not current:
+                conn.execute("DELETE FROM refresh_tokens WHERE family_id = %s", (row["family_id"],))
+                return RefreshResult(REFRESH_INVALID), None
+
+            conn.execute("UPDATE refresh_tokens SET used_at = %s WHERE token_hash = %s", (now, token_hash))
+            self._store_refresh_token(conn, new_token_hash, row["user_id"], row["family_id"], row["session_version"])
+            # renova a validade e reabre a sessão que o sweeper tenha desativado
+            conn.execute(
+                "UPDATE users SET session_active = 1, session_expires_at = %s WHERE user_id = %s",
+                (_expires_at(now), row["user_id"]),
+            )
+            generation = None if int(row["session_active"]) == 1 else self._bump_generation(conn, SESSIONS)
+        result = RefreshResult(
+            REFRESH_SUCCESS,
+            username=row["username"],
+            session_version=int(row["session_version"]),
+            session_epoch=int(row["current_epoch"]),
+            roles=parse_roles(row["roles"]),
+        )
+        return result, generation
+
+    @retry_on_conflict
+    def login_attempt(
+        self,
+        username: str,
+        new_hash: str | None,
+        refresh_token_hash: str | None,
+        refresh_family: str,
+    ) -> tuple[LoginResult, int | None]:
+        # mesmo fluxo do SQLite; o FOR UPDATE faz o papel do BEGIN IMMEDIATE,
+        # só que travando a linha do usuário e não o banco inteiro
+        with self._connection() as conn:
+            row = conn.execute(
+                """
+                SELECT user_id, session_active, session_expires_at, session_epoch, roles, blocked_until_epoch,
+                       (SELECT epoch FROM session_epochs WHERE scope = %s) AS current_epoch
+                FROM users WHERE username = %s FOR UPDATE
+                """,
+                (GLOBAL_EPOCH_SCOPE, username),
+            ).fetchone()
+            if row is None:
+                return LoginResult(LOGIN_NOT_FOUND), None
+
+            now = int(time.time())
+            # legado: bloqueios gravados antes do limiter ainda valem até vencer
+            blocked_until = row["blocked_until_epoch"]
+            if blocked_until is not None and now < blocked_until:
+                return LoginResult(LOGIN_BLOCKED, retry_after=blocked_until - now), None
+
+            if session_live(row, now):
+                return LoginResult(LOGIN_ACTIVE_SESSION), None
+
+            epoch = int(row["current_epoch"])
+            session_version = int(conn.execute(
+                """
+                UPDATE users
+                SET session_active = 1, session_version = session_version + 1, session_expires_at = %s,
+                    session_epoch = %s, blocked_until_epoch = NULL, password = COALESCE(%s, password)
+                WHERE user_id = %s
+                RETURNING session_version
+                """,
+                (_expires_at(now), epoch, new_hash, row["user_id"]),
+            ).fetchone()["session_version"])
+            if refresh_token_hash is not None:
+                conn.execute("DELETE FROM refresh_tokens WHERE user_id = %s", (row["user_id"],))
+                self._store_refresh_token(conn, refresh_token_hash, row["user_id"], refresh_family, session_version)
+            generation = self._bump_generation(conn, SESSIONS)
+            result = LoginResult(
+                LOGIN_SUCCESS, session_version=session_version, session_epoch=epoch, roles=parse_roles(row["roles"])
+            )
+            return result, generation
+
+    @retry_on_conflict
+    def update_username(self, current_username: str, new_username: str) -> tuple[int, int] | None:
+        with self._connection() as conn:
+            self._revoke_user_refresh_tokens(conn, current_username)
+            cursor = conn.execute(
+                "UPDATE users SET username = %s WHERE username = %s",
+                (new_username, current_username),
+            )
+            if cursor.rowcount == 0:
+                return None
+            return self._bump_generation(conn, SESSIONS), self._bump_generation(conn, USERS)
+
+    @retry_on_conflict
+    def update_password(self, username: str, new_password: str) -> bool:
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "UPDATE users SET password = %s WHERE username = %s",
+                (new_password, username),
+            )
+            return cursor.rowcount > 0
+
+    @retry_on_conflict
+    def update_roles(self, username: str, roles: str) -> int | None:
+        with self._connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE users
+                SET roles = %s, session_active = 0, session_version = session_version + 1, session_expires_at = NULL
+                WHERE username = %s
+                """,
+                (roles, username),
+            )
+            if cursor.rowcount == 0:
+                return None
+            self._revoke_user_refresh_tokens(conn, username)
+            return self._bump_generation(conn, SESSIONS)
+
+    @retry_on_conflict
+    def delete_user(self, username: str) -> int | None:
+        with self._connection() as conn:
+            self._revoke_user_refresh_tokens(conn, username)
+            cursor = conn.execute("DELETE FROM users WHERE username = %s", (username,))
+            if cursor.rowcount == 0:
+                return None
+            return self._bump_generation(conn, SESSIONS)
+
+    def list_usernames_range(self, after: str | None, lower: str | None, upper: str | None, limit: int) -> list[str]:
+        conditions = []
+        params = []
+        if after is not None:
+            conditions.append("username > %s")
+            params.append(after)
+        if lower is not None:
+            conditions.append("username >= %s")
+            params.append(lower)
+        if upper is not None:
+            conditions.append("username < %s")
+            params.append(upper)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT username FROM users {where} ORDER BY username ASC LIMIT %s",
+                (*params, limit),
+            ).fetchall()
+        return [row["username"] for row in rows]
+
+    def list_usernames(self) -> list[str]:
+        with self._connection() as conn:
+            rows = conn.execute("SELECT username FROM users ORDER BY username ASC").fetchall()
+        return [row["username"] for row in rows]
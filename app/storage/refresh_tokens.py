@@ -0,0 +1,40 @@
+import os
+import time
+
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("SIMPLEAUTH_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# refresh tokens opacos; só o sha256 fica no banco. Cada login abre uma
+# família nova e cada /refresh marca o token usado e emite o próximo da mesma
+# família, então reapresentar um token já usado denuncia vazamento.
+
+
+def create_refresh_tokens_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS refresh_tokens (
+            token_hash TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            family_id TEXT NOT NULL,
+            session_version INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            used_at INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user ON refresh_tokens (user_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens (family_id)")
+
+
+def store_refresh_token(conn, token_hash: str, user_id: int, family_id: str, session_version: int):
+    conn.execute(
+        """
+        INSERT INTO refresh_tokens (token_hash, user_id, family_id, session_version, expires_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (token_hash, user_id, family_id, session_version, int(time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400)),
+    )
+
+
+def revoke_user_refresh_tokens(conn, username: str):
+    conn.execute(
+        "DELETE FROM refresh_tokens WHERE user_id = (SELECT user_id FROM users WHERE username = ?)",
+        (username,),
+    )
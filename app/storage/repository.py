@@ -0,0 +1,206 @@
+import os
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+
+# interface entre o user_service e o banco. O serviço cuida de validação,
+# caches e métricas; o repositório só executa as operações e devolve os
+# contadores de geração que elas incrementaram, para o serviço invalidar
+# o que estiver em memória.
+STORAGE_BACKEND = os.getenv("SIMPLEAUTH_STORAGE_BACKEND", "sqlite").lower()
+
+# sessão que passa esse tempo sem token novo (login ou /refresh) expira:
+# o login volta a ser aceito e o sweeper desativa a linha. O refresh token
+# tem a própria validade (SIMPLEAUTH_REFRESH_TOKEN_EXPIRE_DAYS): enquanto
+# ninguém fizer login por cima, ele renova a sessão mesmo depois disso
+SESSION_TTL_MINUTES = float(os.getenv("SIMPLEAUTH_SESSION_TTL_MINUTES", "30"))
+# linha da tabela session_epochs que revoga todas as sessões de uma vez
+GLOBAL_EPOCH_SCOPE = "global"
+
+# papéis ficam em users.roles separados por vírgula e vão no access token
+ROLE_ADMIN = "admin"
+ROLES = (ROLE_ADMIN,)
+
+# resultados de login_attempt; LOGIN_BLOCKED vem de uma linha com bloqueio
+# legado no banco. Falhas, lockouts e limite por IP são contados pelo
+# limiter (app/security/limiter.py): os três últimos só rotulam métricas e
+# auditoria
+LOGIN_SUCCESS = "success"
+LOGIN_NOT_FOUND = "not_found"
+LOGIN_ACTIVE_SESSION = "active_session"
+LOGIN_BLOCKED = "blocked"
+LOGIN_LOCKED_OUT = "locked_out"
+LOGIN_FAILED = "failed"
+LOGIN_RATE_LIMITED = "rate_limited"
+
+REFRESH_SUCCESS = "success"
+REFRESH_INVALID = "invalid"
+REFRESH_REUSED = "reused"
+
+
+def session_expired(expires_at: int | None, now: float) -> bool:
+    # NULL numa sessão ativa: linha gravada antes da validade existir, segue valendo
+    return expires_at is not None and expires_at <= now
+
+
+def parse_roles(value: str | None) -> tuple[str, ...]:
+    return tuple(role for role in (value or "").split(",") if role)
+
+
+def format_roles(roles) -> str:
+    # ordem fixa e sem repetição: a mesma lista sempre grava o mesmo texto
+    return ",".join(sorted(set(roles)))
+
+
+def session_live(row, now: float) -> bool:
+    # row traz session_active, session_expires_at, session_epoch e a época
+    # global atual (current_epoch); sessão aberta antes do último bump da
+    # época foi revogada em massa
+    return (
+        int(row["session_active"]) == 1
+        and not session_expired(row["session_expires_at"], now)
+        and int(row["session_epoch"]) >= int(row["current_epoch"])
+    )
+
+
+def refresh_family_current(row) -> bool:
+    # row traz o session_version do token e o atual do usuário
+    # (current_version), session_epoch e current_epoch. A validade da sessão
+    # não entra: login, logout e troca de papéis sobem a versão, e o bump da
+    # época revoga tudo
+    return (
+        int(row["current_version"]) == int(row["session_version"])
+        and int(row["session_epoch"]) >= int(row["current_epoch"])
+    )
+
+
+class LoginResult(NamedTuple):
+    status: str
+    session_version: int | None = None
+    retry_after: int = 0
+    session_epoch: int = 0
+    roles: tuple[str, ...] = ()
+
+
+class RefreshResult(NamedTuple):
+    status: str
+    username: str | None = None
+    session_version: int | None = None
+    session_epoch: int = 0
+    roles: tuple[str, ...] = ()
+
+
+class UserRepository(ABC):
+    # linhas devolvidas aceitam acesso por nome de coluna (row["username"])
+
+    @abstractmethod
+    def init(self):
+        """Cria ou migra o schema e semeia o admin."""
+
+    def start(self):
+        """Sobe as rotinas de fundo do backend, se houver."""
+
+    @abstractmethod
+    def close(self):
+        """Para as rotinas de fundo e fecha o pool de conexões."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Números do pool para o /metrics."""
+
+    @abstractmethod
+    def migrate(self, target: int | None = None, batch_size: int | None = None) -> list[dict]: ...
+
+    @abstractmethod
+    def migration_status(self) -> dict: ...
+
+    @abstractmethod
+    def read_generation(self, name: str) -> int: ...
+
+    @abstractmethod
+    def read_session_epoch(self) -> int: ...
+
+    @abstractmethod
+    def bump_session_epoch(self) -> int:
+        """Revoga todas as sessões com a escrita de uma linha; devolve a época nova."""
+
+    @abstractmethod
+    def scan_usernames(self, consume) -> int:
+        """Chama consume(total, usernames) num snapshot e devolve a geração "users" dele."""
+
+    @abstractmethod
+    def create_user(self, username: str, password: str) -> int:
+        """Devolve a nova geração "users"."""
+
+    @abstractmethod
+    def insert_users_batch(self, users: list[tuple[str, str]]) -> tuple[set[str], int]:
+        """Devolve (usernames que já existiam, nova geração "users")."""
+
+    @abstractmethod
+    def fetch_export_batch(self, after_id: int, limit: int) -> list: ...
+
+    @abstractmethod
+    def find_user(self, username: str): ...
+
+    @abstractmethod
+    def load_session_state(self, username: str) -> tuple[int, int] | None: ...
+
+    @abstractmethod
+    def load_session_states(self, usernames: list[str]) -> dict[str, tuple[int, int]]:
+        """Estado de sessão de vários usuários numa consulta só; ausentes ficam de fora."""
+
+    @abstractmethod
+    def activate_session(self, username: str) -> tuple[int | None, int | None]:
+        """Devolve (session_version, geração "sessions"), ou (None, None) se já estava ativa."""
+
+    @abstractmethod
+    def deactivate_session(self, username: str) -> int | None:
+        """Devolve a geração "sessions", ou None se não havia sessão ativa."""
+
+    @abstractmethod
+    def refresh_session(self, token_hash: str, new_token_hash: str) -> tuple[RefreshResult, int | None]: ...
+
+    @abstractmethod
+    def login_attempt(
+        self,
+        username: str,
+        new_hash: str | None,
+        refresh_token_hash: str | None,
+        refresh_family: str,
+    ) -> tuple[LoginResult, int | None]:
+        """Abre a sessão de quem já acertou a senha; confere sessão ativa e bloqueio legado na mesma transação."""
+
+    @abstractmethod
+    def expire_sessions(self, now: int, limit: int) -> tuple[list[str], int | None]:
+        """Desativa até limit sessões vencidas; devolve (usernames, geração "sessions" ou None)."""
+
+    @abstractmethod
+    def update_username(self, current_username: str, new_username: str) -> tuple[int, int] | None:
+        """Devolve (geração "sessions", geração "users"), ou None se o usuário não existe."""
+
+    @abstractmethod
+    def update_password(self, username: str, new_password: str) -> bool: ...
+
+    @abstractmethod
+    def update_roles(self, username: str, roles: str) -> int | None:
+        """Grava os papéis e encerra a sessão (tokens levam os papéis antigos); devolve a geração "sessions"."""
+
+    @abstractmethod
+    def delete_user(self, username: str) -> int | None:
+        """Devolve a geração "sessions", ou None se o usuário não existe."""
+
+    @abstractmethod
+    def list_usernames_range(self, after: str | None, lower: str | None, upper: str | None, limit: int) -> list[str]:
+        """Usernames em ordem, com after < username, lower <= username < upper."""
+
+    @abstractmethod
+    def list_usernames(self) -> list[str]: ...
+
+
+def create_repository(backend: str = STORAGE_BACKEND) -> UserRepository:
+    if backend == "sqlite":
+        from app.storage.sqlite_repository import SQLiteUserRepository
+        return SQLiteUserRepository()
+    if backend == "postgres":
+        from app.storage.postgres_repository import PostgresUserRepository
+        return PostgresUserRepository()
+    raise ValueError(f"Invalid SIMPLEAUTH_STORAGE_BACKEND: {backend}")
@@ -0,0 +1,500 @@
+import time
+from functools import partial
+
+from app.storage import migrations
+from app.storage.db import (
+    RETURNING_SUPPORTED,
+    close_pool,
+    connection,
+    get_pool,
+    init_db,
+    retry_on_contention,
+    start_checkpointer,
+    stop_checkpointer,
+)
+from app.storage.generations import SESSIONS, USERS, bump_generation, read_generation
+from app.storage.refresh_tokens import revoke_user_refresh_tokens, store_refresh_token
+from app.storage.repository import (
+    GLOBAL_EPOCH_SCOPE,
+    LOGIN_ACTIVE_SESSION,
+    LOGIN_BLOCKED,
+    LOGIN_NOT_FOUND,
+    LOGIN_SUCCESS,
+    REFRESH_INVALID,
+    REFRESH_REUSED,
+    REFRESH_SUCCESS,
+    LoginResult,
+    SESSION_TTL_MINUTES,
+    RefreshResult,
+    UserRepository,
+    parse_roles,
+    refresh_family_current,
+    session_live,
+)
+from app.storage.write_queue import GROUP_COMMIT_ENABLED, group_commit
+
+
+class SQLiteUserRepository(UserRepository):
+    def init(self):
+        init_db()
+
+    def start(self):
+        start_checkpointer()
+        if GROUP_COMMIT_ENABLED:
+            group_commit.start()
+
+    def close(self):
+        group_commit.stop()
+        stop_checkpointer()
+        close_pool()
+
+    def stats(self) -> dict:
+        return get_pool().stats()
+
+    def migrate(self, target: int | None = None, batch_size: int | None = None) -> list[dict]:
+        return migrations.migrate(
+            target=migrations.LATEST_VERSION if target is None else target,
+            batch_size=batch_size or migrations.MIGRATION_BATCH_SIZE,
+        )
+
+    def migration_status(self) -> dict:
+        return migrations.migration_status()
+
+    def read_generation(self, name: str) -> int:
+        with connection() as conn:
+            return read_generation(conn, name)
+
+    def read_session_epoch(self) -> int:
+        with connection() as conn:
+            return _read_session_epoch(conn)
+
+    def bump_session_epoch(self) -> int:
+        return self._write(_bump_session_epoch)
+
+    def scan_usernames(self, consume) -> int:
+        # geração e nomes lidos no mesmo snapshot; consume(total, usernames)
+        with connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                generation = read_generation(conn, USERS)
+                total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+                consume(total, (row[0] for row in conn.execute("SELECT username FROM users")))
+            finally:
+                conn.rollback()
+        return generation
+
+    @retry_on_contention
+    def create_user(self, username: str, password: str) -> int:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO users (username, password, session_active) VALUES (?, ?, ?)",
+                (username, password, 0)
+            )
+            generation = bump_generation(conn, USERS)
+            conn.commit()
+        return generation
+
+    @retry_on_contention
+    def insert_users_batch(self, users: list[tuple[str, str]]) -> tuple[set[str], int]:
+        # insere tudo numa transação só
+        with connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            placeholders = ", ".join("?" for _ in users)
+            cursor = conn.execute(
+                f"SELECT username FROM users WHERE username IN ({placeholders})",
+                [username for username, _ in users],
+            )
+            existing = {row["username"] for row in cursor.fetchall()}
+            conn.executemany(
+                "INSERT INTO users (username, password, session_active) VALUES (?, ?, ?)",
+                [(username, password, 0) for username, password in users if username not in existing],
+            )
+            generation = bump_generation(conn, USERS)
+            conn.commit()
+        return existing, generation
+
+    def fetch_export_batch(self, after_id: int, limit: int) -> list:
+        with connection() as conn:
+            return conn.execute(
+                "SELECT user_id, username, password FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+
+    def find_user(self, username: str):
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+            return cursor.fetchone()
+
+    def load_session_state(self, username: str) -> tuple[int, int] | None:
+        with connection() as conn:
+            row = conn.execute(
+                "SELECT session_active, session_version FROM users WHERE username = ?",
+                (username,),
+            ).fetchone()
+        if row is None:
+            return None
+        return int(row["session_active"]), int(row["session_version"])
+
+    def load_session_states(self, usernames: list[str]) -> dict[str, tuple[int, int]]:
+        placeholders = ", ".join("?" for _ in usernames)
+        with connection() as conn:
+            rows = conn.execute(
+                f"SELECT username, session_active, session_version FROM users WHERE username IN ({placeholders})",
+                usernames,
+            ).fetchall()
+        return {row["username"]: (int(row["session_active"]), int(row["session_version"])) for row in rows}
+
+    def activate_session(self, username: str) -> tuple[int | None, int | None]:
+        return self._write(_activate_session, username)
+
+    def deactivate_session(self, username: str) -> int | None:
+        return self._write(_deactivate_session, username)
+
+    @retry_on_contention
+    def refresh_session(self, token_hash: str, new_token_hash: str) -> tuple[RefreshResult, int | None]:
+        # troca o refresh token pelo próximo da família; um token já usado
+        # aparecendo de novo revoga a família inteira e encerra a sessão
+        now = int(time.time())
+        with connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """
+                SELECT t.user_id, t.family_id, t.session_version, t.expires_at, t.used_at,
+                       u.username, u.session_active, u.session_version AS current_version,
+                       u.session_expires_at, u.session_epoch, u.roles,
+                       (SELECT epoch FROM session_epochs WHERE scope = ?) AS current_epoch
+                FROM refresh_tokens t JOIN users u ON u.user_id = t.user_id
+                WHERE t.token_hash = ?
+                """,
+                (GLOBAL_EPOCH_SCOPE, token_hash),
+            ).fetchone()
+            if row is None:
+                conn.rollback()
+                return RefreshResult(REFRESH_INVALID), None
+
+            current = refresh_family_current(row)
+
+            if row["used_at"] is not None:
+                conn.execute("DELETE FROM refresh_tokens WHERE family_id = ?", (row["family_id"],))
+                generation = None
+                if current:
+                    conn.execute(
+                        """
+                        UPDATE users
+                        SET session_active = 0, session_version = session_version + 1, session_expires_at = NULL
+                        WHERE user_id = ?
+                        """,
+                        (row["user_id"],),
+                    )
+                    generation = bump_generation(conn, SESSIONS)
+                conn.commit()
+                return RefreshResult(REFRESH_REUSED, username=row["username"]), generation
+
+            if row["expires_at"] <= now or not current:
+                conn.execute("DELETE FROM refresh_tokens WHERE family_id = ?", (row["family_id"],))
+                conn.commit()
+                return RefreshResult(REFRESH_INVALID), None
+
+            conn.execute("UPDATE refresh_tokens SET used_at = ? WHERE token_hash = ?", (now, token_hash))
+            store_refresh_token(conn, new_token_hash, row["user_id"], row["family_id"], row["session_version"])
+            # token novo renova a validade da sessão; se o sweeper já tinha
+            # desativado a linha, ela volta a valer com a mesma versão
+            conn.execute(
+                "UPDATE users SET session_active = 1, session_expires_at = ? WHERE user_id = ?",
+                (_expires_at(now), row["user_id"]),
+            )
+            generation = None if int(row["session_active"]) == 1 else bump_generation(conn, SESSIONS)
+            conn.commit()
+        result = RefreshResult(
+            REFRESH_SUCCESS,
+            username=row["username"],
+            session_version=int(row["session_version"]),
+            session_epoch=int(row["current_epoch"]),
+            roles=parse_roles(row["roles"]),
+        )
+        return result, generation
+
+    def login_attempt(
+        self,
+        username: str,
+        new_hash: str | None,
+        refresh_token_hash: str | None,
+        refresh_family: str,
+    ) -> tuple[LoginResult, int | None]:
+        return self._write(_login_attempt, username, new_hash, refresh_token_hash, refresh_family)
+
+    def expire_sessions(self, now: int, limit: int) -> tuple[list[str], int | None]:
+        return self._write(_expire_sessions, now, limit)
+
+    def _write(self, op, *args):
+        # com o writer rodando a operação entra no próximo lote; sem ele (CLI,
+        # SIMPLEAUTH_DB_GROUP_COMMIT=0) vira uma transação própria
+        future = group_commit.submit(op, *args)
+        if future is None:
+            return _write_now(op, *args)
+        return future.result()
+
+    @retry_on_contention
+    def update_username(self, current_username: str, new_username: str) -> tuple[int, int] | None:
+        with connection() as conn:
+            cursor = conn.cursor()
+            revoke_user_refresh_tokens(conn, current_username)
+            cursor.execute(
+                "UPDATE users SET username = ? WHERE username = ?",
+                (new_username, current_username),
+            )
+            if cursor.rowcount == 0:
+                conn.commit()
+                return None
+            generation = bump_generation(conn, SESSIONS)
+            users_generation = bump_generation(conn, USERS)
+            conn.commit()
+        return generation, users_generation
+
+    @retry_on_contention
+    def update_password(self, username: str, new_password: str) -> bool:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE users SET password = ? WHERE username = ?",
+                (new_password, username),
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    @retry_on_contention
+    def update_roles(self, username: str, roles: str) -> int | None:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE users
+                SET roles = ?, session_active = 0, session_version = session_version + 1, session_expires_at = NULL
+                WHERE username = ?
+                """,
+                (roles, username),
+            )
+            if cursor.rowcount == 0:
+                conn.commit()
+                return None
+            revoke_user_refresh_tokens(conn, username)
+            generation = bump_generation(conn, SESSIONS)
+            conn.commit()
+        return generation
+
+    @retry_on_contention
+    def delete_user(self, username: str) -> int | None:
+        with connection() as conn:
+            cursor = conn.cursor()
+            revoke_user_refresh_tokens(conn, username)
+            cursor.execute("DELETE FROM users WHERE username = ?", (username,))
+            if cursor.rowcount == 0:
+                conn.commit()
+                return None
+            generation = bump_generation(conn, SESSIONS)
+            conn.commit()
+        return generation
+
+    def list_usernames_range(self, after: str | None, lower: str | None, upper: str | None, limit: int) -> list[str]:
+        conditions = []
+        params = []
+        if after is not None:
+            conditions.append("username > ?")
+            params.append(after)
+        if lower is not None:
+            conditions.append("username >= ?")
+            params.append(lower)
+        if upper is not None:
+            conditions.append("username < ?")
+            params.append(upper)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with connection() as conn:
+            rows = conn.execute(
+                f"SELECT username FROM users {where} ORDER BY username ASC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [row["username"] for row in rows]
+
+    def list_usernames(self) -> list[str]:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT username FROM users ORDER BY username ASC")
+            rows = cursor.fetchall()
+            return [row["username"] for row in rows]
+
+
+
+# escritas que passam pelo group commit: op(conn, bump, *args) roda dentro de
+# uma transação aberta por quem chama e não faz commit nem rollback; bump(nome)
+# incrementa o contador de geração e devolve o valor novo
+
+@retry_on_contention
+def _write_now(op, *args):
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        result = op(conn, partial(bump_generation, conn), *args)
+        conn.commit()
+    return result
+
+
+def _expires_at(now: float) -> int:
+    return int(now + SESSION_TTL_MINUTES * 60)
+
+
+def _read_session_epoch(conn) -> int:
+    row = conn.execute("SELECT epoch FROM session_epochs WHERE scope = ?", (GLOBAL_EPOCH_SCOPE,)).fetchone()
+    return int(row[0]) if row is not None else 0
+
+
+def _bump_session_epoch(conn, bump) -> int:
+    # uma linha só, não importa quantos usuários existem: tokens e sessões de
+    # épocas anteriores deixam de valer na checagem de cada um
+    conn.execute("UPDATE session_epochs SET epoch = epoch + 1 WHERE scope = ?", (GLOBAL_EPOCH_SCOPE,))
+    return _read_session_epoch(conn)
+
+
+def _activate_session(conn, bump, username: str) -> tuple[int | None, int | None]:
+    now = time.time()
+    epoch = _read_session_epoch(conn)
+    cursor = conn.execute(
+        """
+        UPDATE users
+        SET session_active = 1, session_version = session_version + 1, session_expires_at = ?, session_epoch = ?
+        WHERE username = ? AND (session_active = 0 OR session_expires_at <= ? OR session_epoch < ?)
+        """,
+        (_expires_at(now), epoch, username, now, epoch),
+    )
+    if cursor.rowcount == 0:
+        return None, None
+
+    row = conn.execute("SELECT session_version FROM users WHERE username = ?", (username,)).fetchone()
+    generation = bump(SESSIONS)
+    if row is None:
+        return None, generation
+    return int(row["session_version"]), generation
+
+
+def _deactivate_session(conn, bump, username: str) -> int | None:
+    cursor = conn.execute(
+        """
+        UPDATE users
+        SET session_active = 0, session_version = session_version + 1, session_expires_at = NULL
+        WHERE username = ? AND session_active = 1
+        """,
+        (username,),
+    )
+    if cursor.rowcount == 0:
+        return None
+    revoke_user_refresh_tokens(conn, username)
+    return bump(SESSIONS)
+
+
+def _expire_sessions(conn, bump, now: int, limit: int) -> tuple[list[str], int | None]:
+    # percorre o índice parcial de sessões ativas em ordem de vencimento, sem
+    # varrer a tabela; quem chama repete até vir menos que limit
+    rows = conn.execute(
+        """
+        SELECT user_id, username FROM users
+        WHERE session_active = 1 AND session_expires_at <= ?
+        ORDER BY session_expires_at
+        LIMIT ?
+        """,
+        (now, limit),
+    ).fetchall()
+    if not rows:
+        return [], None
+
+    # a versão fica como está: um refresh token ainda válido reabre a sessão
+    # (refresh_session confere a versão); família sem token válido sai junto
+    user_ids = [(row["user_id"],) for row in rows]
+    conn.executemany(
+        "UPDATE users SET session_active = 0, session_expires_at = NULL WHERE user_id = ?",
+        user_ids,
+    )
+    conn.executemany(
+        """
+        DELETE FROM refresh_tokens WHERE user_id = ? AND NOT EXISTS (
+            SELECT 1 FROM refresh_tokens live
+            WHERE live.user_id = refresh_tokens.user_id AND live.used_at IS NULL AND live.expires_at > ?
+        )
+        """,
+        [(user_id, now) for (user_id,) in user_ids],
+    )
+    return [row["username"] for row in rows], bump(SESSIONS)
+
+
+def _login_attempt(
+    conn,
+    bump,
+    username: str,
+    new_hash: str | None,
+    refresh_token_hash: str | None,
+    refresh_family: str,
+) -> tuple[LoginResult, int | None]:
+    # a senha já foi conferida, fora do lock de escrita; aqui a sessão é
+    # checada de novo e ativada na mesma transação (junto com o rehash, se houver)
+    row = conn.execute(
+        """
+        SELECT user_id, session_active, session_expires_at, session_epoch, roles, blocked_until_epoch,
+               (SELECT epoch FROM session_epochs WHERE scope = ?) AS current_epoch
+        FROM users WHERE username = ?
+        """,
+        (GLOBAL_EPOCH_SCOPE, username),
+    ).fetchone()
+    if row is None:
+        return LoginResult(LOGIN_NOT_FOUND), None
+
+    now = int(time.time())
+    # legado: bloqueios gravados antes do limiter ainda valem até vencer;
+    # nada grava nesta coluna hoje, o login bem-sucedido só a limpa
+    blocked_until = row["blocked_until_epoch"]
+    if blocked_until is not None and now < blocked_until:
+        return LoginResult(LOGIN_BLOCKED, retry_after=blocked_until - now), None
+
+    # sessão vencida ou revogada pela época conta como encerrada: o
+    # login abre outra por cima
+    if session_live(row, now):
+        return LoginResult(LOGIN_ACTIVE_SESSION), None
+
+    epoch = int(row["current_epoch"])
+    session_version = _activate_session_row(conn, username, now, epoch)
+    if new_hash is not None:
+        conn.execute("UPDATE users SET password = ? WHERE username = ?", (new_hash, username))
+    if refresh_token_hash is not None:
+        # login abre uma família nova; sobras de sessões anteriores saem junto
+        conn.execute("DELETE FROM refresh_tokens WHERE user_id = ?", (row["user_id"],))
+        store_refresh_token(conn, refresh_token_hash, row["user_id"], refresh_family, session_version)
+    result = LoginResult(
+        LOGIN_SUCCESS, session_version=session_version, session_epoch=epoch, roles=parse_roles(row["roles"])
+    )
+    return result, bump(SESSIONS)
+
+
+def _activate_session_row(conn, username: str, now: float, epoch: int) -> int:
+    if RETURNING_SUPPORTED:
+        row = conn.execute(
+            """
+            UPDATE users
+            SET session_active = 1, session_version = session_version + 1, session_expires_at = ?,
+                session_epoch = ?, blocked_until_epoch = NULL
+            WHERE username = ?
+            RETURNING session_version
+            """,
+            (_expires_at(now), epoch, username),
+        ).fetchone()
+        return int(row["session_version"])
+
+    conn.execute(
+        """
+        UPDATE users
+        SET session_active = 1, session_version = session_version + 1, session_expires_at = ?,
+            session_epoch = ?, blocked_until_epoch = NULL
+        WHERE username = ?
+        """,
+        (_expires_at(now), epoch, username),
+    )
+    row = conn.execute("SELECT session_version FROM users WHERE username = ?", (username,)).fetchone()
+    return int(row["session_version"])
@@ -0,0 +1,209 @@
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from app.storage.db import WRITE_RETRIES, WRITE_RETRY_BACKOFF, get_conn, is_contention_error
+from app.storage.generations import bump_generation
+
+GROUP_COMMIT_ENABLED = os.getenv("SIMPLEAUTH_DB_GROUP_COMMIT", "1") == "1"
+# quanto o primeiro pedido de um lote pode esperar por outros antes do commit.
+# Com 0 o lote é o que chegou enquanto o commit anterior gravava: sem custo
+# com pouca carga e já agrupa bem numa rajada de logins
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("SIMPLEAUTH_DB_GROUP_COMMIT_MAX_DELAY_MS", "0"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("SIMPLEAUTH_DB_GROUP_COMMIT_MAX_BATCH", "128"))
+
+
+class _Batch:
+    # cada contador de geração sobe uma vez por lote: todas as operações do
+    # commit recebem o mesmo valor e o cache de sessões continua avançando
+    # sem limpar tudo a cada escrita
+    def __init__(self, conn):
+        self.conn = conn
+        self.generations = {}
+
+    def bump(self, name: str) -> int:
+        if name not in self.generations:
+            self.generations[name] = bump_generation(self.conn, name)
+        return self.generations[name]
+
+
+class GroupCommitWriter:
+    # uma thread dona de uma conexão própria recebe as escritas pequenas do
+    # serviço (login, logout, tentativas) e grava as que chegarem juntas numa
+    # transação só. Cada operação roda num SAVEPOINT, então o erro de uma não
+    # desfaz as outras; quem pediu recebe o resultado pelo Future depois do commit.
+    def __init__(
+        self,
+        max_delay: float = GROUP_COMMIT_MAX_DELAY_MS / 1000,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+        connect=get_conn,
+    ):
+        if max_batch < 1:
+            raise ValueError("Group commit batch size must be at least 1.")
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._connect = connect
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self.batches = 0
+        self.operations = 0
+        self.failed = 0
+        self.retries = 0
+        self.largest_batch = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="simpleauth-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        # o que já está na fila é gravado antes da thread sair
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join()
+
+    def submit(self, op, *args) -> Future | None:
+        # op(conn, bump, *args) roda dentro da transação do lote; devolve None
+        # com o writer parado e quem chama grava por conta própria
+        with self._lock:
+            if self._thread is None:
+                return None
+            future = Future()
+            self._queue.put((op, args, future))
+        return future
+
+    def _loop(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                stopping = self._collect(batch)
+                batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+                if batch:
+                    self._commit(batch)
+                if stopping:
+                    return
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _collect(self, batch: list) -> bool:
+        # junta o que já estiver na fila e espera até max_delay por mais;
+        # devolve True se encontrou o pedido de parada
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    def _commit(self, batch: list):
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                if self._conn is None:
+                    self._conn = self._connect()
+                outcomes = self._apply(self._conn, batch)
+                break
+            except Exception as exc:
+                self._rollback()
+                if isinstance(exc, sqlite3.OperationalError) and is_contention_error(exc) and attempt < WRITE_RETRIES:
+                    # outro processo segura o lock; o lote inteiro roda de novo
+                    self.retries += 1
+                    delay = WRITE_RETRY_BACKOFF * (2 ** attempt)
+                    time.sleep(delay + random.uniform(0, delay))
+                    continue
+                if isinstance(exc, sqlite3.Error) and not is_contention_error(exc):
+                    self._reconnect()
+                self.failed += len(batch)
+                for _, _, future in batch:
+                    future.set_exception(exc)
+                return
+
+        self.batches += 1
+        self.operations += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                self.failed += 1
+                future.set_exception(value)
+
+    def _apply(self, conn, batch: list) -> list:
+        conn.execute("BEGIN IMMEDIATE")
+        state = _Batch(conn)
+        outcomes = []
+        for op, args, future in batch:
+            generations = dict(state.generations)
+            conn.execute("SAVEPOINT group_commit_op")
+            try:
+                value = op(conn, state.bump, *args)
+            except Exception as exc:
+                if is_contention_error(exc):
+                    raise
+                conn.execute("ROLLBACK TO group_commit_op")
+                conn.execute("RELEASE group_commit_op")
+                state.generations = generations # o incremento desta operação foi desfeito
+                outcomes.append((future, False, exc))
+                continue
+            conn.execute("RELEASE group_commit_op")
+            outcomes.append((future, True, value))
+        conn.commit()
+        return outcomes
+
+    def _rollback(self):
+        try:
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+        except sqlite3.Error:
+            self._reconnect()
+
+    def _reconnect(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "running": int(self.running),
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "operations": self.operations,
+            "failed": self.failed,
+            "retries": self.retries,
+            "largest_batch": self.largest_batch,
+        }
+
+
+group_commit = GroupCommitWriter()
@@ -0,0 +1,96 @@
+"""/me under many concurrent clients: SIMPLEAUTH_STORAGE_MODE=sync vs async.
+
+Each mode runs in its own process because the mode is read at import time.
+
+    python benchmarks/bench_async.py --clients 200 --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PASSWORD = "Benchmark123"
+
+
+async def hammer(users, clients, total):
+    import httpx
+
+    from app.main import app
+    from app.services.user_service import create_user
+    from app.security.password import hash_password
+    from app.storage.db import init_db
+
+    init_db()
+    hashed = hash_password(PASSWORD)
+    usernames = [f"bench{i:06d}" for i in range(users)]
+    for username in usernames:
+        create_user(username, hashed)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tokens = []
+        for username in usernames:
+            response = await client.post("/login", json={"username": username, "password": PASSWORD})
+            tokens.append(response.json()["access_token"])
+
+        latencies = []
+        counter = iter(range(total))
+
+        async def one_client(index):
+            headers = {"Authorization": f"Bearer {tokens[index % len(tokens)]}"}
+            for _ in counter:
+                started = time.perf_counter()
+                response = await client.get("/me", headers=headers)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_client(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "mode": os.environ["SIMPLEAUTH_STORAGE_MODE"],
+        "clients": clients,
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, str(ROOT))
+        print(json.dumps(asyncio.run(hammer(args.users, args.clients, args.requests))))
+        return
+
+    for mode in ("sync", "async"):
+        env = dict(
+            os.environ,
+            SIMPLEAUTH_STORAGE_MODE=mode,
+            SIMPLEAUTH_DB_PATH=str(Path(tempfile.mkdtemp()) / f"{mode}.db"),
+        )
+        subprocess.run(
+            [sys.executable, __file__, "--child", "--users", str(args.users),
+             "--clients", str(args.clients), "--requests", str(args.requests)],
+            env=env,
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
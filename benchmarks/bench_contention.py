@@ -0,0 +1,130 @@
+"""Multi-process write contention: lock errors and latency per storage profile.
+
+Each worker process runs login/logout style writes against the same SQLite
+file, the way several uvicorn workers would.
+
+    python benchmarks/bench_contention.py --workers 8 --ops 300
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PROFILES = {
+    # comportamento anterior: rollback journal, synchronous=FULL, sem retry
+    "legacy": {
+        "SIMPLEAUTH_DB_JOURNAL_MODE": "DELETE",
+        "SIMPLEAUTH_DB_SYNCHRONOUS": "FULL",
+        "SIMPLEAUTH_DB_WRITE_RETRIES": "0",
+    },
+    "tuned": {},
+}
+
+
+def _setup_env(profile, db_path):
+    os.environ.update(PROFILES[profile])
+    os.environ["SIMPLEAUTH_DB_PATH"] = db_path
+    sys.path.insert(0, str(ROOT))
+
+
+def seed(profile, db_path, users):
+    _setup_env(profile, db_path)
+    from app.services.user_service import create_user
+    from app.security.password import hash_password
+    from app.storage.db import close_pool, init_db
+
+    init_db()
+    hashed = hash_password("Benchmark123")
+    for i in range(users):
+        create_user(f"bench{i:06d}", hashed)
+    close_pool()
+
+
+def worker(profile, db_path, usernames, ops, results):
+    _setup_env(profile, db_path)
+    from app.services import user_service
+
+    latencies = []
+    errors = 0
+    for i in range(ops):
+        username = usernames[i % len(usernames)]
+        started = time.perf_counter()
+        try:
+            user_service.find_user_by_username(username)
+            user_service.activate_session(username)
+            user_service.deactivate_session(username)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    results.put((latencies, errors))
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_profile(profile, workers, ops, users):
+    ctx = multiprocessing.get_context("spawn")
+    db_path = str(Path(tempfile.mkdtemp()) / f"{profile}.db")
+
+    seeder = ctx.Process(target=seed, args=(profile, db_path, users))
+    seeder.start()
+    seeder.join()
+
+    results = ctx.Queue()
+    usernames = [f"bench{i:06d}" for i in range(users)]
+    per_worker = max(1, users // workers)
+    processes = [
+        ctx.Process(
+            target=worker,
+            args=(profile, db_path, usernames[i * per_worker:(i + 1) * per_worker] or usernames, ops, results),
+        )
+        for i in range(workers)
+    ]
+
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [value for batch, _ in collected for value in batch]
+    return {
+        "profile": profile,
+        "workers": workers,
+        "ops": len(latencies),
+        "lock_errors": sum(errors for _, errors in collected),
+        "ops_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=300)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+    args = parser.parse_args()
+
+    for profile in args.profile or ["legacy", "tuned"]:
+        print(json.dumps(run_profile(profile, args.workers, args.ops, args.users)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Login write throughput with and without the group-commit writer.
+
+Many threads in one process run the writes of a login storm (login and
+logout) through user_service, the way the request threads of a worker
+would. Failed attempts only touch the limiter and password hashing is left
+out: only the database side is measured.
+
+    python benchmarks/bench_group_commit.py --threads 64 --ops 200
+    python benchmarks/bench_group_commit.py --synchronous FULL --max-delay-ms 0 0.5 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _setup_env(db_path, synchronous, group_commit, max_delay_ms):
+    os.environ["SIMPLEAUTH_DB_PATH"] = db_path
+    os.environ["SIMPLEAUTH_DB_SYNCHRONOUS"] = synchronous
+    os.environ["SIMPLEAUTH_DB_GROUP_COMMIT"] = "1" if group_commit else "0"
+    os.environ["SIMPLEAUTH_DB_GROUP_COMMIT_MAX_DELAY_MS"] = str(max_delay_ms)
+    # uma conexão por thread, como num worker com o pool no tamanho do threadpool
+    os.environ.setdefault("SIMPLEAUTH_DB_POOL_SIZE", "64")
+    sys.path.insert(0, str(ROOT))
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_profile(db_path, synchronous, group_commit, max_delay_ms, threads, ops, results):
+    _setup_env(db_path, synchronous, group_commit, max_delay_ms)
+    from app.services import user_service
+    from app.storage.write_queue import group_commit as writer
+
+    user_service.repository.init()
+    user_service.repository.start()
+    usernames = [f"bench{i:05d}" for i in range(threads)]
+    user_service.insert_users_batch([(username, "unused") for username in usernames])
+
+    latencies = [[] for _ in range(threads)]
+    errors = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        username = usernames[index]
+        barrier.wait()
+        for _ in range(ops):
+            for write in (
+                lambda: user_service.login_attempt(username),
+                lambda: user_service.deactivate_session(username),
+            ):
+                started = time.perf_counter()
+                try:
+                    write()
+                except Exception:
+                    errors[index] += 1
+                    continue
+                latencies[index].append(time.perf_counter() - started)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stats = writer.stats()
+    user_service.repository.close()
+
+    flat = [value for values in latencies for value in values]
+    results.put({
+        "profile": f"group_commit_{max_delay_ms}ms" if group_commit else "per_request",
+        "synchronous": synchronous,
+        "threads": threads,
+        "writes": len(flat),
+        "errors": sum(errors),
+        "writes_per_sec": round(len(flat) / elapsed, 1),
+        "p50_ms": round(percentile(flat, 50) * 1000, 2) if flat else None,
+        "p99_ms": round(percentile(flat, 99) * 1000, 2) if flat else None,
+        "commits": stats["batches"] if group_commit else len(flat),
+        "largest_batch": stats["largest_batch"] if group_commit else 1,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--ops", type=int, default=100, help="Login/logout cycles per thread (3 writes each).")
+    parser.add_argument("--synchronous", choices=("OFF", "NORMAL", "FULL", "EXTRA"), default="NORMAL")
+    parser.add_argument("--max-delay-ms", type=float, nargs="+", default=[0, 1])
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    profiles = [(False, 0)] + [(True, delay) for delay in args.max_delay_ms]
+    for group_commit, max_delay_ms in profiles:
+        results = ctx.Queue()
+        db_path = str(Path(tempfile.mkdtemp()) / "group_commit.db")
+        process = ctx.Process(
+            target=run_profile,
+            args=(db_path, args.synchronous, group_commit, max_delay_ms, args.threads, args.ops, results),
+        )
+        process.start()
+        print(json.dumps(results.get()))
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""decode_access_token throughput with the verified-claims cache on and off.
+
+    python benchmarks/bench_jwt_decode.py --tokens 1000 --iterations 50000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.security.jwt import create_access_token, decode_access_token
+from app.security.token_cache import token_cache
+
+
+def run(tokens, iterations):
+    started = time.perf_counter()
+    for i in range(iterations):
+        decode_access_token(tokens[i % len(tokens)])
+    return iterations / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    tokens = [create_access_token(subject=f"user{i}", session_version=1) for i in range(args.tokens)]
+
+    maxsize = token_cache.maxsize
+    token_cache.maxsize = 0
+    uncached = run(tokens, args.iterations)
+
+    token_cache.maxsize = maxsize
+    token_cache.clear()
+    cached = run(tokens, args.iterations)
+
+    print(f"cache off: {uncached:,.0f} decodes/s")
+    print(f"cache on:  {cached:,.0f} decodes/s  {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Schema migrations against a seeded pre-migration database.
+
+Builds a database in the original schema (user_version 0, blocked_until as
+ISO text), runs app.storage.migrations.migrate() while a second thread keeps
+writing to the users table, then checks the converted data and reports how
+long each migration took and the worst write latency seen meanwhile.
+
+    python benchmarks/bench_migrations.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def seed_legacy(db_path, rows, blocked_every, active_every):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("""
+        CREATE TABLE users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            session_version INTEGER NOT NULL DEFAULT 1,
+            session_active INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 3,
+            blocked_until TEXT
+        )
+    """)
+    blocked_until = (datetime.now() + timedelta(minutes=3)).isoformat()
+    expected_blocked = 0
+    batch = []
+    for i in range(rows):
+        blocked = blocked_until if i % blocked_every == 0 else None
+        expected_blocked += blocked is not None
+        batch.append((f"user{i:07d}", "x", 1 if i % active_every == 0 else 0, blocked))
+        if len(batch) >= 50000:
+            conn.executemany(
+                "INSERT INTO users (username, password, session_active, blocked_until) VALUES (?, ?, ?, ?)", batch
+            )
+            batch = []
+    conn.executemany("INSERT INTO users (username, password, session_active, blocked_until) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+    return expected_blocked, datetime.fromisoformat(blocked_until).timestamp()
+
+
+def write_probe(db_path, stop, latencies):
+    # simula a API escrevendo durante a migração
+    conn = sqlite3.connect(db_path, timeout=30)
+    i = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.execute("UPDATE users SET session_version = session_version + 1 WHERE user_id = ?", (i % 1000 + 1,))
+        conn.commit()
+        latencies.append(time.perf_counter() - started)
+        i += 1
+        time.sleep(0.005)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--blocked-every", type=int, default=50, help="Every Nth row starts blocked.")
+    parser.add_argument("--active-every", type=int, default=20, help="Every Nth row has an active session.")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    db_path = str(Path(tempfile.mkdtemp()) / "legacy.db")
+    started = time.perf_counter()
+    expected_blocked, blocked_epoch = seed_legacy(db_path, args.rows, args.blocked_every, args.active_every)
+    seed_seconds = time.perf_counter() - started
+
+    os.environ["SIMPLEAUTH_DB_PATH"] = db_path
+    sys.path.insert(0, str(ROOT))
+    from app.storage.db import close_pool
+    from app.storage.migrations import LATEST_VERSION, migrate
+
+    stop = threading.Event()
+    latencies = []
+    probe = threading.Thread(target=write_probe, args=(db_path, stop, latencies))
+    probe.start()
+    started = time.perf_counter()
+    applied = migrate(batch_size=args.batch_size)
+    migrate_seconds = time.perf_counter() - started
+    stop.set()
+    probe.join()
+    close_pool()
+
+    conn = sqlite3.connect(db_path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    converted = conn.execute("SELECT COUNT(*) FROM users WHERE blocked_until_epoch IS NOT NULL").fetchone()[0]
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    wrong = conn.execute(
+        "SELECT COUNT(*) FROM users WHERE blocked_until_epoch IS NOT NULL AND blocked_until_epoch != ?",
+        (int(blocked_epoch),),
+    ).fetchone()[0]
+    plans = {
+        "active": conn.execute("EXPLAIN QUERY PLAN SELECT user_id FROM users WHERE session_active = 1").fetchall(),
+    }
+    conn.close()
+
+    latencies.sort()
+    report = {
+        "rows": args.rows,
+        "seed_seconds": round(seed_seconds, 2),
+        "migrate_seconds": round(migrate_seconds, 2),
+        "applied": applied,
+        "concurrent_writes": len(latencies),
+        "write_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2) if latencies else None,
+        "write_max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        "query_plans": {name: [row[-1] for row in rows] for name, rows in plans.items()},
+        "checks": {
+            "user_version": version == LATEST_VERSION,
+            "blocked_rows_converted": converted == expected_blocked,
+            "lockout_columns_dropped": not columns & {"blocked_until", "attempts"},
+            "epoch_values_match": wrong == 0,
+        },
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if all(report["checks"].values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Requests/sec on /login and /me with the connection pool vs. connect-per-call.
+
+    python benchmarks/bench_pool.py --users 500 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("SIMPLEAUTH_DB_PATH", str(Path(tempfile.mkdtemp()) / "bench.db"))
+
+import httpx
+
+from app.main import app
+from app.security.password import hash_password
+from app.services.user_service import create_user
+from app.storage import db
+
+PASSWORD = "Benchmark123"
+
+
+class ConnectPerCall:
+    # comportamento antigo: abre e fecha uma conexão por chamada
+    @contextmanager
+    def connection(self):
+        conn = db.get_conn()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        pass
+
+
+async def run_requests(client, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(method, url, kwargs):
+        async with semaphore:
+            return await client.request(method, url, **kwargs)
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(one(*request) for request in requests))
+    elapsed = time.perf_counter() - started
+    return len(responses) / elapsed, responses
+
+
+async def bench(mode, usernames, concurrency):
+    db.close_pool()
+    db._pool = ConnectPerCall() if mode == "connect" else db.ConnectionPool()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login_requests = [
+            ("POST", "/login", {"json": {"username": username, "password": PASSWORD}})
+            for username in usernames
+        ]
+        login_rps, responses = await run_requests(client, login_requests, concurrency)
+        tokens = [r.json()["access_token"] for r in responses if r.status_code == 200]
+
+        me_requests = [
+            ("GET", "/me", {"headers": {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}})
+            for i in range(len(usernames) * 4)
+        ]
+        me_rps, _ = await run_requests(client, me_requests, concurrency)
+
+    db.close_pool()
+    return {"mode": mode, "login_rps": round(login_rps, 1), "me_rps": round(me_rps, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    db.init_db()
+    hashed = hash_password(PASSWORD)
+    usernames = [f"bench{i:06d}" for i in range(args.users)]
+    for username in usernames:
+        create_user(username, hashed)
+
+    for mode in ("connect", "pool"):
+        with db.connection() as conn:
+            conn.execute("UPDATE users SET session_active = 0, blocked_until_epoch = NULL")
+            conn.commit()
+        print(asyncio.run(bench(mode, usernames, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""Benchmark harness for every SimpleAuth endpoint.
+
+Runs against app.main:app either in-process (httpx ASGI transport) or
+through a multi-worker server (plain uvicorn or the app.serve launcher), on a freshly seeded database, and
+prints throughput and p50/p95/p99 latency per scenario as JSON.
+
+    python benchmarks/run.py --seed-users 100000 --requests 500
+    python benchmarks/run.py --server uvicorn --workers 4 --output after.json
+    python benchmarks/run.py --server serve --workers 4
+    python benchmarks/run.py --baseline before.json --max-regression 0.15
+    python benchmarks/run.py --backend postgres --postgres-dsn postgresql://localhost/simpleauth_bench
+
+The postgres backend expects an empty database; the SQLite one always gets a
+fresh file unless --db-path is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PASSWORD = "Benchmark123"
+WRONG_PASSWORD = "Wrongpass123"
+ADMIN_PASSWORD = "54321"
+
+SCENARIOS = (
+    "register",
+    "login_success",
+    "login_failure",
+    "login_lockout",
+    "me",
+    "introspect",
+    "show_users",
+    "change_username",
+    "logout",
+)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+    }
+
+
+async def run_load(client, requests, concurrency, expected_status):
+    # requests: lista de (method, url, kwargs); cada uma conta como sucesso
+    # só se voltar com o status esperado para o cenário
+    queue = iter(requests)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code == expected_status
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def seed_database(seed_users, scenario_users):
+    from app.services.user_service import insert_users_batch, repository
+    from app.security.password import hash_password
+
+    repository.init()
+    hashed = hash_password(PASSWORD)
+    batch = []
+    for i in range(seed_users):
+        batch.append((f"seed{i:07d}", hashed))
+        if len(batch) >= 5000:
+            insert_users_batch(batch)
+            batch = []
+    insert_users_batch(batch)
+
+    groups = {}
+    for group in ("login", "fail", "locked", "rename", "active"):
+        groups[group] = [f"{group}{i:06d}" for i in range(scenario_users)]
+        insert_users_batch([(username, hashed) for username in groups[group]])
+
+    repository.close()
+    return groups
+
+
+def mint_tokens(usernames):
+    # abre sessões direto pela camada de serviço para não pagar o pbkdf2 no setup
+    from app.security.jwt import create_access_token
+    from app.services.user_service import activate_session, repository
+
+    tokens = {}
+    for username in usernames:
+        session_version = activate_session(username)
+        tokens[username] = create_access_token(subject=username, session_version=session_version)
+    repository.close()
+    return tokens
+
+
+async def run_scenarios(client, args, groups):
+    results = {}
+    selected = args.scenario or list(SCENARIOS)
+    n = args.requests
+    c = args.concurrency
+    run_id = int(time.time())
+
+    response = await client.post("/login", json={"username": "admin", "password": ADMIN_PASSWORD})
+    admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    active_tokens = mint_tokens(groups["active"] + groups["rename"])
+
+    def bearer(token):
+        return {"headers": {"Authorization": f"Bearer {token}"}}
+
+    if "register" in selected:
+        requests = [
+            ("POST", "/register", {"json": {"username": f"reg{run_id}x{i:06d}", "password": PASSWORD}})
+            for i in range(n)
+        ]
+        results["register"] = await run_load(client, requests, c, 200)
+
+    if "login_success" in selected:
+        requests = [
+            ("POST", "/login", {"json": {"username": username, "password": PASSWORD}})
+            for username in groups["login"][:n]
+        ]
+        results["login_success"] = await run_load(client, requests, c, 200)
+
+    if "login_failure" in selected:
+        # duas falhas por usuário ainda respondem 401; a terceira bloquearia
+        users = groups["fail"]
+        requests = [
+            ("POST", "/login", {"json": {"username": users[i % len(users)], "password": WRONG_PASSWORD}})
+            for i in range(min(n, len(users) * 2))
+        ]
+        results["login_failure"] = await run_load(client, requests, c, 401)
+
+    if "login_lockout" in selected:
+        # o bloqueio fica no limiter, então é montado por HTTP antes da medição
+        from app.security.limiter import MAX_FAILED_LOGINS
+
+        users = groups["locked"]
+        await run_load(client, [
+            ("POST", "/login", {"json": {"username": username, "password": WRONG_PASSWORD}})
+            for username in users
+            for _ in range(MAX_FAILED_LOGINS)
+        ], c, None)
+        requests = [
+            ("POST", "/login", {"json": {"username": users[i % len(users)], "password": PASSWORD}})
+            for i in range(n)
+        ]
+        results["login_lockout"] = await run_load(client, requests, c, 429)
+
+    if "me" in selected:
+        tokens = [active_tokens[username] for username in groups["active"]]
+        requests = [("GET", "/me", bearer(tokens[i % len(tokens)])) for i in range(n)]
+        results["me"] = await run_load(client, requests, c, 200)
+
+    if "introspect" in selected:
+        # um lote por chamada, como um gateway juntando as requisições que chegaram
+        tokens = [active_tokens[username] for username in groups["active"]]
+        batch = min(len(tokens), args.introspect_batch)
+        headers = {"X-Introspection-Secret": os.environ["SIMPLEAUTH_INTROSPECTION_SECRET"]}
+        requests = [
+            ("POST", "/introspect", {"json": {"tokens": [tokens[(i + j) % len(tokens)] for j in range(batch)]}, "headers": headers})
+            for i in range(n)
+        ]
+        results["introspect"] = await run_load(client, requests, c, 200)
+
+    if "show_users" in selected:
+        requests = [
+            ("GET", "/show-users", {"params": {"requester": "admin", "limit": 100}, "headers": admin_headers})
+            for _ in range(n)
+        ]
+        results["show_users"] = await run_load(client, requests, c, 200)
+
+    if "change_username" in selected:
+        requests = [
+            (
+                "POST",
+                "/change-username",
+                {
+                    "json": {"requester": username, "new_username": f"renamed{run_id}x{username}"},
+                    **bearer(active_tokens[username]),
+                },
+            )
+            for username in groups["rename"][:n]
+        ]
+        results["change_username"] = await run_load(client, requests, c, 200)
+
+    if "logout" in selected:
+        requests = [("POST", "/logout", bearer(active_tokens[username])) for username in groups["active"][:n]]
+        results["logout"] = await run_load(client, requests, c, 200)
+
+    return results
+
+
+async def run_inprocess(args, groups):
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_scenarios(client, args, groups)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(args, groups):
+    import httpx
+
+    port = _free_port()
+    # "serve" usa o launcher do projeto (app.serve), "uvicorn" o CLI puro
+    module = "app.serve" if args.server == "serve" else "uvicorn"
+    target = [] if args.server == "serve" else ["app.main:app"]
+    server = subprocess.Popen(
+        [sys.executable, "-m", module, *target, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/health/ready")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn did not start.")
+                await asyncio.sleep(0.2)
+            return await run_scenarios(client, args, groups)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, max_regression):
+    regressions = []
+    for scenario, result in report["results"].items():
+        before = baseline.get("results", {}).get(scenario)
+        if not before or not before.get("rps") or not result.get("rps"):
+            continue
+        rps_change = result["rps"] / before["rps"] - 1
+        p99_change = (result["p99_ms"] / before["p99_ms"] - 1) if before.get("p99_ms") and result.get("p99_ms") else 0
+        if rps_change < -max_regression or p99_change > max_regression:
+            regressions.append({"scenario": scenario, "rps_change": round(rps_change, 3), "p99_change": round(p99_change, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--server", choices=("inprocess", "uvicorn", "serve"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (uvicorn and serve modes).")
+    parser.add_argument("--seed-users", type=int, default=10000, help="Background rows in the users table.")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append")
+    parser.add_argument("--introspect-batch", type=int, default=50, help="Tokens per /introspect call.")
+    parser.add_argument("--backend", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--postgres-dsn", help="Connection string for --backend postgres.")
+    parser.add_argument("--db-path", help="SQLite file; defaults to a temporary file.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    parser.add_argument("--baseline", help="JSON report to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    args = parser.parse_args()
+
+    db_path = args.db_path or str(Path(tempfile.mkdtemp()) / "bench.db")
+    os.environ["SIMPLEAUTH_DB_PATH"] = db_path
+    os.environ["SIMPLEAUTH_STORAGE_BACKEND"] = args.backend
+    if args.postgres_dsn:
+        os.environ["SIMPLEAUTH_POSTGRES_DSN"] = args.postgres_dsn
+    # todo o tráfego sai do mesmo IP; o limite por IP mediria só o 429
+    os.environ.setdefault("SIMPLEAUTH_IP_LOGIN_LIMIT", "1000000000")
+    os.environ.setdefault("SIMPLEAUTH_INTROSPECTION_SECRET", "benchmark")
+    # contadores do limiter num arquivo da rodada: o uvicorn puro com vários
+    # workers não compartilharia o backend em memória, e sobras de uma rodada
+    # anterior bloqueariam os usuários de login_failure
+    os.environ.setdefault("SIMPLEAUTH_LIMITER_SQLITE_PATH", str(Path(db_path).with_suffix(".limiter.db")))
+    if args.server != "inprocess" and args.workers > 1:
+        os.environ.setdefault("SIMPLEAUTH_LIMITER_BACKEND", "sqlite")
+    sys.path.insert(0, str(ROOT))
+
+    groups = seed_database(args.seed_users, args.requests)
+    runner = run_inprocess if args.server == "inprocess" else run_uvicorn
+    results = asyncio.run(runner(args, groups))
+
+    report = {
+        "revision": git_revision(),
+        "config": {
+            "server": args.server,
+            "workers": args.workers if args.server != "inprocess" else None,
+            "seed_users": args.seed_users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "env": {key: value for key, value in os.environ.items() if key.startswith("SIMPLEAUTH_") and key not in {"SIMPLEAUTH_DB_PATH", "SIMPLEAUTH_POSTGRES_DSN", "SIMPLEAUTH_INTROSPECTION_SECRET"}},
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            report["regressions"] = compare(report, json.load(handle), args.max_regression)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Throughput scaling across worker counts.
+
+Runs benchmarks/run.py through the app.serve launcher once per worker count
+(fresh database each time) and prints requests per second per scenario, plus
+the speedup over the first count. Numbers depend on the host: run it on the
+machine you deploy to.
+
+    python benchmarks/scaling.py --workers 1 2 4 8 --requests 2000 --concurrency 64
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def run_once(workers, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "report.json"
+        command = [
+            sys.executable, str(ROOT / "benchmarks" / "run.py"),
+            "--server", "serve",
+            "--workers", str(workers),
+            "--seed-users", str(args.seed_users),
+            "--requests", str(args.requests),
+            "--concurrency", str(args.concurrency),
+            "--output", str(output),
+        ]
+        for scenario in args.scenario or ():
+            command += ["--scenario", scenario]
+        subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        return json.loads(output.read_text(encoding="utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seed-users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--scenario", action="append")
+    parser.add_argument("--output", help="Also write the JSON table to this file.")
+    args = parser.parse_args()
+
+    runs = {workers: run_once(workers, args)["results"] for workers in args.workers}
+    first = runs[args.workers[0]]
+    table = {}
+    for scenario in first:
+        table[scenario] = {
+            str(workers): {
+                "rps": results[scenario]["rps"],
+                "p99_ms": results[scenario]["p99_ms"],
+                "errors": results[scenario]["errors"],
+                "speedup": round(results[scenario]["rps"] / first[scenario]["rps"], 2) if first[scenario]["rps"] else None,
+            }
+            for workers, results in runs.items()
+        }
+
+    report = {"cpu_count": os.cpu_count(), "workers": args.workers, "results": table}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# o app lê a configuração do ambiente na importação: tudo aponta para um
+# diretório temporário antes de qualquer import de app.*
+_TMP = tempfile.mkdtemp(prefix="simpleauth-tests-")
+os.environ.setdefault("SIMPLEAUTH_DB_PATH", os.path.join(_TMP, "simpleauth.db"))
+os.environ.setdefault("SIMPLEAUTH_JWT_KEYS_DIR", os.path.join(_TMP, "keys"))
+os.environ.setdefault("SIMPLEAUTH_HASH_WORKERS", "0")
+os.environ.setdefault("SIMPLEAUTH_PBKDF2_ROUNDS", "1000")
+os.environ.setdefault("SIMPLEAUTH_SESSION_SWEEP_INTERVAL", "0")
+
+# Postgres de teste: um banco novo é criado (e apagado) por teste neste servidor
+POSTGRES_TEST_DSN = os.getenv("SIMPLEAUTH_TEST_POSTGRES_DSN", "")
+
+BACKENDS = ("sqlite", "postgres")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: long-running test, only runs with --run-slow")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-slow", action="store_true", help="Also run tests marked slow.")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+    skip = pytest.mark.skip(reason="slow test; use --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    # cada teste com um arquivo próprio; o pool global é refeito em cima dele
+    from app.storage import db
+
+    db.close_pool()
+    path = tmp_path / "simpleauth.db"
+    monkeypatch.setattr(db, "DB_PATH", path)
+    yield path
+    db.close_pool()
+
+
+@pytest.fixture
+def postgres_dsn():
+    if not POSTGRES_TEST_DSN:
+        pytest.skip("SIMPLEAUTH_TEST_POSTGRES_DSN not set")
+    psycopg = pytest.importorskip("psycopg")
+    from psycopg.conninfo import make_conninfo
+
+    name = f"simpleauth_test_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(POSTGRES_TEST_DSN, autocommit=True) as admin:
+        admin.execute(f"CREATE DATABASE {name}")
+    yield make_conninfo(POSTGRES_TEST_DSN, dbname=name)
+    with psycopg.connect(POSTGRES_TEST_DSN, autocommit=True) as admin:
+        admin.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+
+
+@pytest.fixture(params=BACKENDS)
+def repository(request):
+    if request.param == "sqlite":
+        from app.storage.sqlite_repository import SQLiteUserRepository
+
+        request.getfixturevalue("sqlite_db")
+        repo = SQLiteUserRepository()
+    else:
+        from app.storage.postgres_repository import PostgresUserRepository
+
+        repo = PostgresUserRepository(dsn=request.getfixturevalue("postgres_dsn"), min_size=1, max_size=4)
+    repo.init()
+    repo.start()
+    yield repo
+    repo.close()
+
+
+@pytest.fixture
+def client(sqlite_db):
+    # app inteiro sobre um banco novo; os singletons em memória (limiter,
+    # caches, época) voltam ao estado inicial para um teste não vazar no outro
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.security.limiter import login_limiter
+    from app.services import user_service
+
+    login_limiter.__init__()
+    user_service.session_cache.clear()
+    user_service.session_epoch.__init__(user_service.read_session_epoch)
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,140 @@
+import os
+import threading
+import uuid
+
+import pytest
+
+from app.security import limiter
+from app.security.limiter import MemoryLimiter, RedisLimiter, SQLiteLimiter
+
+# redis de verdade é opcional; sem ele o fakeredis (com Lua) faz o papel do servidor
+REDIS_TEST_URL = os.getenv("SIMPLEAUTH_TEST_REDIS_URL", "")
+
+BACKENDS = ("memory", "sqlite", "fakeredis", "redis")
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def small_limits(monkeypatch):
+    monkeypatch.setattr(limiter, "IP_LOGIN_LIMIT", 3)
+    monkeypatch.setattr(limiter, "IP_LOGIN_WINDOW", 60)
+    monkeypatch.setattr(limiter, "MAX_FAILED_LOGINS", 3)
+    monkeypatch.setattr(limiter, "FAILED_LOGIN_WINDOW", 900)
+    monkeypatch.setattr(limiter, "LOCKOUT_SECONDS", 180)
+
+
+@pytest.fixture(params=BACKENDS)
+def make_limiter(request, tmp_path):
+    # cada chamada devolve uma instância nova sobre o mesmo estado, como um
+    # worker a mais (exceto memory, que por definição não compartilha)
+    if request.param == "memory":
+        return lambda clock: MemoryLimiter(clock=clock)
+    if request.param == "sqlite":
+        path = str(tmp_path / "limiter.db")
+        return lambda clock: SQLiteLimiter(path, clock=clock)
+    if request.param == "fakeredis":
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        server = fakeredis.FakeServer()
+        return lambda clock: RedisLimiter(fakeredis.FakeRedis(server=server), clock=clock)
+    if not REDIS_TEST_URL:
+        pytest.skip("SIMPLEAUTH_TEST_REDIS_URL not set")
+    redis = pytest.importorskip("redis")
+    prefix = f"simpleauth-test:{uuid.uuid4().hex[:12]}"
+    return lambda clock: RedisLimiter(redis.Redis.from_url(REDIS_TEST_URL), prefix=prefix, clock=clock)
+
+
+def test_hit_ip_sliding_window(make_limiter):
+    clock = Clock()
+    login_limiter = make_limiter(clock)
+
+    assert [login_limiter.hit_ip("10.0.0.1") for _ in range(3)] == [0, 0, 0]
+    retry_after = login_limiter.hit_ip("10.0.0.1")
+    assert 0 < retry_after <= 61
+    # outro IP tem a própria janela
+    assert login_limiter.hit_ip("10.0.0.2") == 0
+
+    clock.now += 61
+    assert login_limiter.hit_ip("10.0.0.1") == 0
+
+
+def test_record_failure_locks_out_and_reset_clears(make_limiter):
+    login_limiter = make_limiter(Clock())
+
+    assert login_limiter.record_failure("alice") == (2, 0)
+    assert login_limiter.record_failure("alice") == (1, 0)
+    assert login_limiter.blocked_for("alice") == 0
+    assert login_limiter.record_failure("alice") == (0, 180)
+    assert 0 < login_limiter.blocked_for("alice") <= 180
+
+    login_limiter.reset("alice")
+    assert login_limiter.blocked_for("alice") == 0
+    assert login_limiter.record_failure("alice") == (2, 0)
+
+
+def test_old_failures_leave_the_window(make_limiter):
+    clock = Clock()
+    login_limiter = make_limiter(clock)
+
+    login_limiter.record_failure("bob")
+    login_limiter.record_failure("bob")
+    clock.now += 901
+    assert login_limiter.record_failure("bob") == (2, 0)
+
+
+def test_counters_are_shared_between_instances(make_limiter, request):
+    if request.node.callspec.params["make_limiter"] == "memory":
+        pytest.skip("memory backend is per process")
+    clock = Clock()
+    first, second = make_limiter(clock), make_limiter(clock)
+
+    first.record_failure("carol")
+    second.record_failure("carol")
+    assert first.record_failure("carol") == (0, 180)
+    assert second.blocked_for("carol") > 0
+
+    first.hit_ip("10.0.0.3")
+    second.hit_ip("10.0.0.3")
+    first.hit_ip("10.0.0.3")
+    assert second.hit_ip("10.0.0.3") > 0
+
+
+def test_concurrent_hits_never_pass_the_limit(make_limiter):
+    # conferir e registrar precisam ser um passo só: com 20 threads em
+    # instâncias diferentes, exatamente IP_LOGIN_LIMIT passam
+    clock = Clock()
+    instances = [make_limiter(clock) for _ in range(4)]
+    shared = isinstance(instances[0], (SQLiteLimiter, RedisLimiter))
+    if not shared:
+        instances = instances[:1]
+    results = []
+    barrier = threading.Barrier(20)
+
+    def hit(index):
+        barrier.wait()
+        results.append(instances[index % len(instances)].hit_ip("10.0.0.4"))
+
+    threads = [threading.Thread(target=hit, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(0) == 3
+
+
+def test_create_limiter_sqlite_uses_configured_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "shared.db")
+    monkeypatch.setattr(limiter, "LIMITER_SQLITE_PATH", path)
+    login_limiter = limiter.create_limiter("sqlite")
+    assert isinstance(login_limiter, SQLiteLimiter)
+    assert login_limiter.path == path
+    with pytest.raises(ValueError):
+        limiter.create_limiter("bogus")
+
@@ -0,0 +1,64 @@
+import sqlite3
+import time
+
+# a resposta para senha errada não pode depender do estado da conta:
+# usuário inexistente, logado ou bloqueado recebem o mesmo 401
+
+
+def _register(client, username, password="Secret123"):
+    assert client.post("/register", json={"username": username, "password": password}).status_code == 200
+
+
+def _login(client, username, password="Secret123"):
+    return client.post("/login", json={"username": username, "password": password})
+
+
+def test_login_success_returns_tokens(client):
+    _register(client, "alice")
+    response = _login(client, "alice")
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    assert client.get("/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_wrong_password_on_active_session_is_401(client):
+    _register(client, "bob")
+    assert _login(client, "bob").status_code == 200
+
+    wrong = _login(client, "bob", "Wrong1234")
+    unknown = _login(client, "ghost", "Wrong1234")
+    assert wrong.status_code == unknown.status_code == 401
+    assert wrong.json()["detail"].startswith("Incorrect username or password.")
+
+    # só quem acerta a senha descobre que a sessão está aberta
+    assert _login(client, "bob").status_code == 409
+
+
+def test_wrong_password_on_legacy_blocked_row_is_401(client, sqlite_db):
+    _register(client, "carol")
+    with sqlite3.connect(sqlite_db) as conn:
+        conn.execute("UPDATE users SET blocked_until_epoch = ? WHERE username = 'carol'", (int(time.time()) + 600,))
+
+    assert _login(client, "carol", "Wrong1234").status_code == 401
+    assert _login(client, "carol").status_code == 429
+
+
+def test_failures_from_unknown_and_existing_users_lock_out_alike(client):
+    _register(client, "dave")
+    for username in ("dave", "nobody"):
+        statuses = [_login(client, username, "Wrong1234").status_code for _ in range(3)]
+        assert statuses == [401, 401, 429]
+
+
+def test_refresh_after_session_ttl(client, monkeypatch):
+    from app.storage import sqlite_repository
+
+    # TTL zero: a sessão vence no ato; o refresh token dura os próprios dias
+    monkeypatch.setattr(sqlite_repository, "SESSION_TTL_MINUTES", 0)
+    _register(client, "dora")
+    tokens = _login(client, "dora").json()
+
+    response = client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    assert client.get("/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
@@ -0,0 +1,124 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.storage import migrations
+from app.storage.db import close_pool, connection
+from app.storage.migrations import LATEST_VERSION, MIGRATIONS, migrate
+from app.storage.repository import GLOBAL_EPOCH_SCOPE, ROLE_ADMIN, SESSION_TTL_MINUTES
+from benchmarks.bench_migrations import seed_legacy
+
+# as verificações do benchmarks/bench_migrations.py em forma de teste: um
+# banco no schema original (user_version 0, blocked_until em texto ISO)
+# migrado até a última versão
+
+PARTIAL_INDEXES = ("idx_users_active", "idx_users_session_expiry")
+
+
+def _seed(path, rows, blocked_every=10, active_every=4):
+    expected_blocked, blocked_epoch = seed_legacy(str(path), rows, blocked_every, active_every)
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO users (username, password, session_active) VALUES ('admin', 'x', 1)")
+    return expected_blocked, int(blocked_epoch)
+
+
+def _check_migrated(path, expected_blocked, blocked_epoch, started):
+    close_pool()
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+
+        # blocked_until: texto ISO (hora local) vira epoch em segundos
+        converted = conn.execute("SELECT COUNT(*) FROM users WHERE blocked_until_epoch IS NOT NULL").fetchone()[0]
+        assert converted == expected_blocked
+        assert conn.execute(
+            "SELECT DISTINCT blocked_until_epoch FROM users WHERE blocked_until_epoch IS NOT NULL"
+        ).fetchall() == [(blocked_epoch,)]
+
+        # sessões abertas ganham validade a partir da migração; as fechadas não
+        low = int(started + SESSION_TTL_MINUTES * 60)
+        high = int(time.time() + SESSION_TTL_MINUTES * 60)
+        without_expiry, out_of_range = conn.execute(
+            "SELECT SUM(session_expires_at IS NULL), SUM(session_expires_at NOT BETWEEN ? AND ?) "
+            "FROM users WHERE session_active = 1",
+            (low, high),
+        ).fetchone()
+        assert (without_expiry, out_of_range) == (0, 0)
+        assert conn.execute(
+            "SELECT COUNT(*) FROM users WHERE session_active = 0 AND session_expires_at IS NOT NULL"
+        ).fetchone()[0] == 0
+
+        # admin pelo nome vira admin pelo papel; mais ninguém ganha papel
+        assert conn.execute("SELECT username, roles FROM users WHERE roles != ''").fetchall() == [("admin", ROLE_ADMIN)]
+        assert conn.execute("SELECT scope, epoch FROM session_epochs").fetchall() == [(GLOBAL_EPOCH_SCOPE, 0)]
+        assert conn.execute("SELECT COUNT(*) FROM users WHERE session_epoch != 0").fetchone()[0] == 0
+
+        # o lockout por usuário saiu do banco: coluna em texto, contador e
+        # índice de bloqueados não sobram
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            assert not columns & {"blocked_until", "attempts"}
+
+        indexes = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'users'"))
+        assert "idx_users_blocked" not in indexes
+        for name in PARTIAL_INDEXES:
+            assert " WHERE " in indexes[name]
+        # a consulta de sessões ativas não varre a tabela; com session_active = 1
+        # o planner pode escolher qualquer um dos dois parciais
+        plans = {
+            "SELECT user_id FROM users WHERE session_active = 1": ("idx_users_active", "idx_users_session_expiry"),
+            "SELECT user_id FROM users WHERE session_active = 1 ORDER BY session_expires_at": (
+                "idx_users_session_expiry",
+            ),
+        }
+        for sql, expected in plans.items():
+            plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+            assert any(name in plan for name in expected), plan
+    finally:
+        conn.close()
+
+
+def test_legacy_database_migrates_to_latest(sqlite_db):
+    expected_blocked, blocked_epoch = _seed(sqlite_db, 500)
+    started = time.time()
+
+    # lotes pequenos para o backfill passar por várias transações
+    applied = migrate(batch_size=64)
+    assert [step["version"] for step in applied] == [migration.version for migration in MIGRATIONS]
+    _check_migrated(sqlite_db, expected_blocked, blocked_epoch, started)
+
+    assert migrate() == []
+
+
+def test_migrate_in_steps(sqlite_db):
+    expected_blocked, blocked_epoch = _seed(sqlite_db, 100)
+    started = time.time()
+
+    assert [step["version"] for step in migrate(target=3, batch_size=16)] == [1, 2, 3]
+    assert migrations.migration_status()["current"] == 3
+    assert [step["version"] for step in migrate(batch_size=16)] == list(range(4, LATEST_VERSION + 1))
+    _check_migrated(sqlite_db, expected_blocked, blocked_epoch, started)
+
+
+def test_each_migration_can_run_twice(sqlite_db):
+    # processo que cai depois de aplicar e antes de gravar a versão refaz o
+    # passo inteiro na próxima subida
+    expected_blocked, blocked_epoch = _seed(sqlite_db, 100)
+    started = time.time()
+    with connection() as conn:
+        for migration in MIGRATIONS:
+            migration.apply(conn, 16)
+            conn.commit()
+            migration.apply(conn, 16)
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+            conn.commit()
+    _check_migrated(sqlite_db, expected_blocked, blocked_epoch, started)
+
+
+@pytest.mark.slow
+def test_million_row_migration(sqlite_db):
+    expected_blocked, blocked_epoch = _seed(sqlite_db, 1_000_000, blocked_every=50, active_every=20)
+    started = time.time()
+    migrate()
+    _check_migrated(sqlite_db, expected_blocked, blocked_epoch, started)
@@ -0,0 +1,57 @@
+from app.security.password import build_context
+
+
+def _rounds(hashed: str) -> int:
+    return int(hashed.split("$")[2])
+
+
+def test_same_cost_is_not_rehashed():
+    context = build_context(pbkdf2_rounds=2000)
+    ok, new_hash = context.verify_and_update("Secret123", context.hash("Secret123"))
+    assert ok
+    assert new_hash is None
+
+
+def test_lower_cost_is_rehashed_up():
+    stored = build_context(pbkdf2_rounds=1000).hash("Secret123")
+    ok, new_hash = build_context(pbkdf2_rounds=2000).verify_and_update("Secret123", stored)
+    assert ok
+    assert _rounds(new_hash) == 2000
+
+
+def test_higher_cost_is_rehashed_down():
+    # custo baixado para caber na latência: o hash antigo acompanha
+    stored = build_context(pbkdf2_rounds=3000).hash("Secret123")
+    ok, new_hash = build_context(pbkdf2_rounds=2000).verify_and_update("Secret123", stored)
+    assert ok
+    assert _rounds(new_hash) == 2000
+
+
+def test_other_scheme_is_rehashed_to_default():
+    stored = build_context(scheme="bcrypt", bcrypt_rounds=4).hash("Secret123")
+    ok, new_hash = build_context(pbkdf2_rounds=2000).verify_and_update("Secret123", stored)
+    assert ok
+    assert new_hash.startswith("$pbkdf2-sha256$2000$")
+
+
+def test_wrong_password_never_rehashes():
+    stored = build_context(pbkdf2_rounds=3000).hash("Secret123")
+    assert build_context(pbkdf2_rounds=2000).verify_and_update("Wrong1234", stored) == (False, None)
+
+
+def test_dummy_hash_is_built_on_start_and_follows_the_policy(monkeypatch):
+    import asyncio
+
+    from app.security import password
+    from app.security.hashing import HashingService
+
+    monkeypatch.setattr(password, "pwd_context", build_context(pbkdf2_rounds=1000))
+    service = HashingService(workers=0)
+    service.start()
+    assert _rounds(service._dummy_hash) == 1000
+
+    # política trocada: a próxima verificação falsa já usa o custo novo
+    monkeypatch.setattr(password, "pwd_context", build_context(pbkdf2_rounds=2000))
+    assert asyncio.run(service.verify_dummy("Secret123")) is False
+    assert _rounds(service._dummy_hash) == 2000
+    service.shutdown()
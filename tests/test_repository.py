@@ -0,0 +1,278 @@
+import sys
+import time
+
+from app.storage.generations import SESSIONS, USERS
+from app.storage.repository import (
+    LOGIN_ACTIVE_SESSION,
+    LOGIN_NOT_FOUND,
+    LOGIN_SUCCESS,
+    REFRESH_INVALID,
+    REFRESH_REUSED,
+    REFRESH_SUCCESS,
+    ROLE_ADMIN,
+    parse_roles,
+)
+
+# o mesmo contrato para os dois backends: a fixture "repository" roda cada
+# teste no SQLite e, com SIMPLEAUTH_TEST_POSTGRES_DSN, num Postgres de verdade
+
+
+def _login(repository, username, refresh_hash=None, family="family"):
+    return repository.login_attempt(username, None, refresh_hash, family)
+
+
+def test_init_migrates_to_latest_and_seeds_admin(repository):
+    status = repository.migration_status()
+    assert status["current"] == status["latest"]
+    assert status["pending"] == []
+    # de novo: nada a aplicar
+    assert repository.migrate() == []
+
+    admin = repository.find_user("admin")
+    assert admin is not None
+    assert parse_roles(admin["roles"]) == (ROLE_ADMIN,)
+
+
+def test_migrate_to_target_then_latest(repository):
+    status = repository.migration_status()
+    # init já migrou: pedir uma versão antiga não desfaz nada
+    assert repository.migrate(target=1) == []
+    assert repository.migration_status()["current"] == status["latest"]
+
+
+def test_login_attempt_success_and_active_session(repository):
+    repository.create_user("alice", "hash")
+    sessions_before = repository.read_generation(SESSIONS)
+
+    _, initial_version = repository.load_session_state("alice")
+    result, generation = _login(repository, "alice", refresh_hash="r1")
+    assert result.status == LOGIN_SUCCESS
+    assert result.session_version == initial_version + 1
+    assert result.roles == ()
+    assert generation == sessions_before + 1
+    assert repository.load_session_state("alice") == (1, result.session_version)
+
+    result, generation = _login(repository, "alice")
+    assert result.status == LOGIN_ACTIVE_SESSION
+    assert generation is None
+
+
+def test_login_attempt_unknown_user(repository):
+    result, generation = _login(repository, "nobody")
+    assert result.status == LOGIN_NOT_FOUND
+    assert generation is None
+
+
+def test_login_attempt_stores_new_hash(repository):
+    repository.create_user("carol", "old-hash")
+    result, _ = repository.login_attempt("carol", "new-hash", None, "family")
+    assert result.status == LOGIN_SUCCESS
+    assert repository.find_user("carol")["password"] == "new-hash"
+
+
+def test_refresh_session_rotates_token(repository):
+    repository.create_user("dave", "hash")
+    login, _ = _login(repository, "dave", refresh_hash="r1")
+
+    result, generation = repository.refresh_session("r1", "r2")
+    assert result.status == REFRESH_SUCCESS
+    assert result.username == "dave"
+    assert result.session_version == login.session_version
+    assert generation is None
+
+    result, _ = repository.refresh_session("r2", "r3")
+    assert result.status == REFRESH_SUCCESS
+
+
+def test_refresh_session_reuse_closes_session(repository):
+    repository.create_user("erin", "hash")
+    login, _ = _login(repository, "erin", refresh_hash="r1")
+    assert repository.refresh_session("r1", "r2")[0].status == REFRESH_SUCCESS
+
+    # r1 já foi usado: a família inteira cai e a sessão é encerrada
+    result, generation = repository.refresh_session("r1", "r3")
+    assert result.status == REFRESH_REUSED
+    assert result.username == "erin"
+    assert generation is not None
+    active, version = repository.load_session_state("erin")
+    assert active == 0
+    assert version == login.session_version + 1
+
+    assert repository.refresh_session("r2", "r4")[0].status == REFRESH_INVALID
+    assert repository.refresh_session("unknown", "r5")[0].status == REFRESH_INVALID
+
+
+def test_refresh_session_after_logout_is_invalid(repository):
+    repository.create_user("frank", "hash")
+    _login(repository, "frank", refresh_hash="r1")
+    assert repository.deactivate_session("frank") is not None
+    assert repository.refresh_session("r1", "r2")[0].status == REFRESH_INVALID
+
+
+def test_expire_sessions_in_batches(repository):
+    names = [f"user{i}" for i in range(5)]
+    for name in names:
+        repository.create_user(name, "hash")
+        _login(repository, name, refresh_hash=f"refresh-{name}")
+    repository.create_user("idle", "hash")
+
+    # ninguém venceu ainda
+    assert repository.expire_sessions(int(time.time()), 10) == ([], None)
+
+    later = int(time.time()) + 365 * 86400
+    first, generation = repository.expire_sessions(later, 2)
+    assert len(first) == 2
+    assert generation is not None
+    rest, _ = repository.expire_sessions(later, 10)
+    assert sorted(first + rest) == names
+    assert repository.expire_sessions(later, 10) == ([], None)
+
+    for name in names:
+        assert repository.load_session_state(name)[0] == 0
+    # refresh tokens das sessões vencidas foram revogados
+    assert repository.refresh_session("refresh-user0", "new")[0].status == REFRESH_INVALID
+
+    # sessão vencida não bloqueia o login
+    assert _login(repository, "user0")[0].status == LOGIN_SUCCESS
+
+
+def test_refresh_outlives_session_ttl(repository, monkeypatch):
+    # TTL zero: a sessão já nasce vencida, o refresh token continua valendo
+    monkeypatch.setattr(sys.modules[type(repository).__module__], "SESSION_TTL_MINUTES", 0)
+    repository.create_user("lara", "hash")
+    login, _ = _login(repository, "lara", refresh_hash="r1")
+
+    result, generation = repository.refresh_session("r1", "r2")
+    assert result.status == REFRESH_SUCCESS
+    assert generation is None
+
+    # o sweeper desativa a linha mas mantém a versão e a família
+    usernames, _ = repository.expire_sessions(int(time.time()) + 1, 10)
+    assert usernames == ["lara"]
+    assert repository.load_session_state("lara") == (0, login.session_version)
+
+    result, generation = repository.refresh_session("r2", "r3")
+    assert result.status == REFRESH_SUCCESS
+    assert result.session_version == login.session_version
+    assert generation is not None
+    assert repository.load_session_state("lara") == (1, login.session_version)
+
+    # login por cima da sessão vencida encerra a família antiga
+    assert _login(repository, "lara", refresh_hash="r4")[0].status == LOGIN_SUCCESS
+    assert repository.refresh_session("r3", "r5")[0].status == REFRESH_INVALID
+
+
+def test_reused_refresh_token_closes_expired_session(repository, monkeypatch):
+    monkeypatch.setattr(sys.modules[type(repository).__module__], "SESSION_TTL_MINUTES", 0)
+    repository.create_user("mia", "hash")
+    login, _ = _login(repository, "mia", refresh_hash="r1")
+    assert repository.refresh_session("r1", "r2")[0].status == REFRESH_SUCCESS
+
+    result, generation = repository.refresh_session("r1", "r3")
+    assert result.status == REFRESH_REUSED
+    assert generation is not None
+    assert repository.load_session_state("mia") == (0, login.session_version + 1)
+    assert repository.refresh_session("r2", "r4")[0].status == REFRESH_INVALID
+
+
+def test_list_usernames_range(repository):
+    for name in ("ana", "anabel", "andre", "bruno", "carla"):
+        repository.create_user(name, "hash")
+
+    assert repository.list_usernames_range(None, None, None, 100) == [
+        "admin", "ana", "anabel", "andre", "bruno", "carla",
+    ]
+    assert repository.list_usernames_range(None, None, None, 2) == ["admin", "ana"]
+    assert repository.list_usernames_range("ana", None, None, 2) == ["anabel", "andre"]
+    # prefixo "an": lower = "an", upper = "ao"
+    assert repository.list_usernames_range(None, "an", "ao", 100) == ["ana", "anabel", "andre"]
+    assert repository.list_usernames_range("anabel", "an", "ao", 100) == ["andre"]
+    assert repository.list_usernames_range(None, "c", None, 100) == ["carla"]
+    assert repository.list_usernames_range("carla", None, None, 100) == []
+
+
+def test_prefix_range_skips_surrogates(repository):
+    from app.services.user_service import _prefix_upper_bound
+
+    # o próximo caractere depois de U+D7FF em UTF-8 é U+E000
+    assert _prefix_upper_bound("a\ud7ff") == "a\ue000"
+    assert _prefix_upper_bound("a\U0010ffff") == "b"
+    for name in ("a\ud7ff", "a\ud7ffz", "a\ue000", "b"):
+        repository.create_user(name, "hash")
+    assert repository.list_usernames_range(None, "a\ud7ff", _prefix_upper_bound("a\ud7ff"), 100) == [
+        "a\ud7ff", "a\ud7ffz",
+    ]
+
+
+def test_create_and_batch_insert_bump_users_generation(repository):
+    before = repository.read_generation(USERS)
+    repository.create_user("gina", "hash")
+    existing, generation = repository.insert_users_batch([("gina", "x"), ("hugo", "y")])
+    assert existing == {"gina"}
+    assert generation == before + 2
+    assert repository.find_user("hugo")["password"] == "y"
+
+
+def test_bump_session_epoch_revokes_open_sessions(repository):
+    repository.create_user("ivan", "hash")
+    _login(repository, "ivan", refresh_hash="r1")
+    epoch = repository.read_session_epoch()
+
+    assert repository.bump_session_epoch() == epoch + 1
+    assert repository.read_session_epoch() == epoch + 1
+    assert repository.refresh_session("r1", "r2")[0].status == REFRESH_INVALID
+
+    result, _ = _login(repository, "ivan")
+    assert result.status == LOGIN_SUCCESS
+    assert result.session_epoch == epoch + 1
+
+
+def test_update_roles_closes_session(repository):
+    repository.create_user("judy", "hash")
+    _login(repository, "judy")
+
+    assert repository.update_roles("judy", ROLE_ADMIN) is not None
+    assert repository.load_session_state("judy")[0] == 0
+    result, _ = _login(repository, "judy")
+    assert result.roles == (ROLE_ADMIN,)
+    assert repository.update_roles("nobody", ROLE_ADMIN) is None
+
+
+def test_update_username_and_delete(repository):
+    repository.create_user("kate", "hash")
+    assert repository.update_username("kate", "katie") is not None
+    assert repository.find_user("kate") is None
+    assert repository.update_username("kate", "other") is None
+
+    assert repository.delete_user("katie") is not None
+    assert repository.find_user("katie") is None
+    assert repository.delete_user("katie") is None
+
+
+def test_scan_usernames_and_session_states(repository):
+    repository.insert_users_batch([(f"scan{i:03d}", "hash") for i in range(20)])
+    _login(repository, "scan000")
+    seen = {}
+
+    def consume(total, usernames):
+        seen["total"] = total
+        seen["names"] = list(usernames)
+
+    generation = repository.scan_usernames(consume)
+    assert generation == repository.read_generation(USERS)
+    assert seen["total"] == 21
+    assert sorted(seen["names"]) == ["admin"] + [f"scan{i:03d}" for i in range(20)]
+
+    states = repository.load_session_states(["scan000", "scan001", "missing"])
+    assert set(states) == {"scan000", "scan001"}
+    assert states["scan000"][0] == 1
+    assert states["scan001"][0] == 0
+
+
+def test_fetch_export_batch_pages_by_id(repository):
+    repository.insert_users_batch([(f"exp{i}", f"hash{i}") for i in range(5)])
+    first = repository.fetch_export_batch(0, 3)
+    second = repository.fetch_export_batch(first[-1]["user_id"], 10)
+    names = [row["username"] for row in first + second]
+    assert names == ["admin"] + [f"exp{i}" for i in range(5)]
+    assert second[-1]["password"] == "hash4"
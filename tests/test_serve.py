@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from app import serve
+
+
+class FakeSupervisor:
+    seen = {}
+
+    def __init__(self, config, sockets, workers):
+        self.workers = workers
+
+    def run(self):
+        FakeSupervisor.seen = {
+            "backend": os.environ.get("SIMPLEAUTH_LIMITER_BACKEND"),
+            "path": os.environ.get("SIMPLEAUTH_LIMITER_SQLITE_PATH"),
+        }
+        return 0
+
+
+@pytest.fixture
+def launcher(tmp_path, monkeypatch, sqlite_db):
+    monkeypatch.setattr(serve, "Supervisor", FakeSupervisor)
+    for name in ("SIMPLEAUTH_LIMITER_BACKEND", "SIMPLEAUTH_LIMITER_SQLITE_PATH", "SIMPLEAUTH_INVALIDATION_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    # main() grava no ambiente para os workers herdarem; o monkeypatch desfaz
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    return lambda *args: serve.main(["--uds", str(tmp_path / "serve.sock"), *args])
+
+
+def test_memory_limiter_refused_with_several_workers(launcher, monkeypatch):
+    monkeypatch.setenv("SIMPLEAUTH_LIMITER_BACKEND", "memory")
+    with pytest.raises(SystemExit) as exc:
+        launcher("--workers", "2")
+    assert exc.value.code == 2
+    # com um worker não há o que dividir
+    assert launcher("--workers", "1") == 0
+
+
+def test_several_workers_default_to_shared_sqlite_limiter(launcher):
+    assert launcher("--workers", "2") == 0
+    assert FakeSupervisor.seen["backend"] == "sqlite"
+    path = FakeSupervisor.seen["path"]
+    assert path.endswith("limiter.db")
+    # o diretório temporário sai junto com o servidor
+    assert not os.path.exists(os.path.dirname(path))
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from app.security.hashing import hashing_service
+from app.security.password import build_context, pwd_context
+from app.services import user_transfer
+from app.services.user_transfer import import_lines, validate_record
+
+GOOD_HASH = build_context(pbkdf2_rounds=1000).hash("Secret123")
+ARGON2_HASH = "$argon2id$v=19$m=65536,t=2,p=2$c29tZXNhbHQ$RdescudvJCsgt3ub+b+dWRWJTmaaJObG"
+
+
+def _admin_headers(client):
+    token = client.post("/login", json={"username": "admin", "password": "54321"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _import(client, rows):
+    body = "".join(json.dumps(row) + "\n" for row in rows)
+    response = client.post("/admin/import-users", content=body, headers=_admin_headers(client))
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize("password_hash", [
+    "$pbkdf2-sha256$garbage",
+    GOOD_HASH[:-10],
+    GOOD_HASH.replace("$1000$", "$x$"),
+    "$2b$04$tooshort",
+    "not-a-hash",
+    12345,
+])
+def test_validate_record_rejects_malformed_hash(password_hash):
+    with pytest.raises(ValueError):
+        validate_record({"username": "alice", "password_hash": password_hash})
+
+
+def test_validate_record_rejects_scheme_without_backend():
+    if pwd_context.handler("argon2").has_backend():
+        pytest.skip("argon2 backend installed")
+    with pytest.raises(ValueError, match="not installed"):
+        validate_record({"username": "alice", "password_hash": ARGON2_HASH})
+
+
+def test_validate_record_keeps_hash_and_defers_plaintext():
+    assert validate_record({"username": "alice", "password_hash": GOOD_HASH}) == ("alice", GOOD_HASH, None)
+    # o hash da senha em texto fica para quem chama
+    assert validate_record({"username": "bob", "password": "Secret123"}) == ("bob", None, "Secret123")
+
+
+def test_import_lines_reports_bad_rows(sqlite_db):
+    from app.services.user_service import find_user_by_username, repository
+
+    repository.init()
+    rows = [
+        {"username": "alice", "password_hash": GOOD_HASH},
+        {"username": "bob", "password_hash": "$pbkdf2-sha256$garbage"},
+        {"username": "carol", "password": "Secret123"},
+        {"username": "alice", "password": "Secret123"},
+    ]
+    report = import_lines([json.dumps(row) for row in rows], "ndjson")
+    assert report.imported == 2
+    assert [(error["line"], error["username"]) for error in report.errors] == [(2, "bob"), (4, "alice")]
+    assert pwd_context.verify("Secret123", find_user_by_username("carol")["password"])
+
+
+def test_api_import_hashes_plaintext_through_pool(client):
+    before = hashing_service.stats()["completed"]
+    report = _import(client, [
+        {"username": "alice", "password": "Secret123"},
+        {"username": "bob", "password_hash": "$pbkdf2-sha256$garbage"},
+        {"username": "carol", "password_hash": GOOD_HASH},
+    ])
+    assert report["imported"] == 2
+    assert [error["line"] for error in report["errors"]] == [2]
+    assert hashing_service.stats()["completed"] >= before + 1
+    assert client.post("/login", json={"username": "alice", "password": "Secret123"}).status_code == 200
+    assert client.post("/login", json={"username": "carol", "password": "Secret123"}).status_code == 200
+
+
+def test_api_import_caps_plaintext_rows(client, monkeypatch):
+    monkeypatch.setattr(user_transfer, "IMPORT_MAX_PLAINTEXT", 2)
+    report = _import(client, [{"username": f"user{i}", "password": "Secret123"} for i in range(4)]
+                     + [{"username": "hashed", "password_hash": GOOD_HASH}])
+    assert report["imported"] == 3
+    assert [error["line"] for error in report["errors"]] == [3, 4]
+
+
+def test_api_import_reports_busy_hashing_per_row(client, monkeypatch):
+    headers = _admin_headers(client)
+    monkeypatch.setattr(hashing_service, "max_pending", 0)
+    body = json.dumps({"username": "alice", "password": "Secret123"}) + "\n"
+    response = client.post("/admin/import-users", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["errors"][0]["error"].startswith("Password hashing is busy")